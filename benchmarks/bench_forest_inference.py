@@ -0,0 +1,85 @@
+"""
+Microbenchmark: sklearn predict_proba vs the compiled array forest.
+
+Uses models/random_forest_model.pkl when present, otherwise fits a forest
+with the production hyperparameters (100 trees, depth 10) on synthetic data.
+
+Usage:
+    python benchmarks/bench_forest_inference.py [--iterations 2000]
+"""
+import argparse
+import os
+import sys
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from src.forest_inference import compile_forest  # noqa: E402
+
+FEATURES = ['purchase_value', 'source_encoded', 'browser_encoded',
+            'sex_encoded', 'age', 'time_since_signup', 'user_transaction_count']
+MODEL_PATH = "models/random_forest_model.pkl"
+
+
+def build_model(n_rows: int = 20000):
+    if os.path.exists(MODEL_PATH):
+        return joblib.load(MODEL_PATH)
+    rng = np.random.default_rng(42)
+    X = pd.DataFrame(rng.normal(size=(n_rows, len(FEATURES))), columns=FEATURES)
+    y = ((X['time_since_signup'] < -1) | (rng.random(n_rows) < 0.05)).astype(int)
+    return RandomForestClassifier(n_estimators=100, max_depth=10, random_state=42, n_jobs=-1).fit(X, y)
+
+
+def time_calls(fn, rows, iterations):
+    latencies = np.empty(iterations)
+    for i in range(iterations):
+        row = rows[i % len(rows)]
+        start = time.perf_counter()
+        fn(row)
+        latencies[i] = time.perf_counter() - start
+    return latencies * 1e6
+
+
+def report(name, latencies):
+    print(f"{name:<28} p50={np.percentile(latencies, 50):9.1f}us  "
+          f"p99={np.percentile(latencies, 99):9.1f}us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    model = build_model()
+    compiled = compile_forest(model)
+    names = list(model.feature_names_in_)
+
+    rng = np.random.default_rng(7)
+    frames = [pd.DataFrame(rng.normal(size=(1, len(names))), columns=names) for _ in range(256)]
+    batch = pd.DataFrame(rng.normal(size=(args.batch_size, len(names))), columns=names)
+
+    assert np.array_equal(compiled.predict_proba(batch), model.predict_proba(batch))
+
+    print(f"Single row ({args.iterations} calls)")
+    sk = time_calls(model.predict_proba, frames, args.iterations)
+    cf = time_calls(compiled.predict_proba, frames, args.iterations)
+    report("  sklearn predict_proba", sk)
+    report("  compiled predict_proba", cf)
+    print(f"  p50 speedup: {np.percentile(sk, 50) / np.percentile(cf, 50):.1f}x")
+
+    iterations = max(args.iterations // 20, 10)
+    print(f"Batch of {args.batch_size} ({iterations} calls)")
+    sk = time_calls(model.predict_proba, [batch], iterations)
+    cf = time_calls(compiled.predict_proba, [batch], iterations)
+    report("  sklearn predict_proba", sk)
+    report("  compiled predict_proba", cf)
+    print(f"  p50 speedup: {np.percentile(sk, 50) / np.percentile(cf, 50):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
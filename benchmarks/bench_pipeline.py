@@ -0,0 +1,217 @@
+"""
+Pipeline scaling benchmark on synthetic data.
+
+Generates a seeded, schema-faithful Fraud_Data.csv / IpAddress_to_Country.csv
+pair for each size (src/synthetic_data.py, cached under --data-dir), then
+runs the training pipeline stages on it in a fresh process per size and
+records, per stage, wall time, rows out and peak resident memory. The
+report also fits a scaling exponent per stage between consecutive sizes
+(1.0 = linear) and flags stages that grow super-linearly.
+
+Usage:
+    python benchmarks/bench_pipeline.py --sizes 100000,1000000,10000000
+    python benchmarks/bench_pipeline.py --sizes 100000,400000 --stages clean_data,map_ip_to_country \\
+        --fraud-rate 0.05 --output reports/pipeline_benchmark.json
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, REPO_ROOT)
+
+STAGES = ["load", "clean_data", "convert_to_datetime", "map_ip_to_country", "create_time_features",
+          "create_transaction_velocity", "create_entity_link_features", "scale_and_encode",
+          "handle_imbalance"]
+
+# Exponent above which a stage is reported as scaling super-linearly
+SUPERLINEAR_EXPONENT = 1.2
+
+
+def _rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 ** 2
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class PeakRSS:
+    """Samples this process's RSS in a background thread while the block runs."""
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.start_mb = self.peak_mb = 0.0
+        self._stop = threading.Event()
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak_mb = max(self.peak_mb, _rss_mb())
+
+    def __enter__(self):
+        self.start_mb = self.peak_mb = _rss_mb()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak_mb = max(self.peak_mb, _rss_mb())
+
+
+def run_pipeline(fraud_csv, ip_csv, stages=STAGES, imbalance="smote"):
+    """
+    Run the pipeline stages in order and measure the selected ones.
+
+    Stages before the last selected one always run (later stages need
+    their output) but only selected stages are reported.
+    """
+    from src.entity_links import EntityLinkIndex
+    from src.feature_engineering import (create_entity_link_features, create_time_features,
+                                         create_transaction_velocity)
+    from src.model_training import handle_imbalance, select_features
+    from src.preprocessing import clean_data, convert_to_datetime, map_ip_to_country, scale_and_encode
+    from src.schema import drop_merge_only, read_fraud_csv, read_ip_csv
+    from src.velocity import VelocityStore
+
+    steps = {
+        "load": lambda _: (read_fraud_csv(fraud_csv), read_ip_csv(ip_csv)),
+        "clean_data": lambda s: (clean_data(s[0]), s[1]),
+        "convert_to_datetime": lambda s: (convert_to_datetime(s[0], ["signup_time", "purchase_time"]), s[1]),
+        "map_ip_to_country": lambda s: (map_ip_to_country(s[0], s[1]), None),
+        "create_time_features": lambda s: (drop_merge_only(create_time_features(s[0]), "create_time_features"),
+                                           None),
+        "create_transaction_velocity": lambda s: (create_transaction_velocity(s[0], VelocityStore()), None),
+        "create_entity_link_features": lambda s: (create_entity_link_features(s[0], EntityLinkIndex()), None),
+        "scale_and_encode": lambda s: (scale_and_encode(s[0]), None),
+        "handle_imbalance": lambda s: handle_imbalance(*select_features(s[0], "class"), strategy=imbalance)[:2],
+    }
+    last = max(STAGES.index(stage) for stage in stages)
+    state, results = None, []
+    for stage in STAGES[:last + 1]:
+        with PeakRSS() as memory:
+            start = time.perf_counter()
+            state = steps[stage](state)
+            seconds = time.perf_counter() - start
+        if stage in stages:
+            results.append({"stage": stage, "seconds": round(seconds, 4), "rows_out": int(len(state[0])),
+                            "peak_rss_mb": round(memory.peak_mb, 1),
+                            "rss_growth_mb": round(memory.peak_mb - memory.start_mb, 1)})
+            logging.info(f"{stage}: {seconds:.2f}s, peak RSS {memory.peak_mb:.0f} MB")
+    return results
+
+
+def scaling_exponents(results):
+    """
+    Per stage, log(time ratio) / log(size ratio) between consecutive sizes.
+
+    1.0 is linear; the stage is flagged when the exponent between the two
+    largest sizes exceeds SUPERLINEAR_EXPONENT.
+    """
+    by_stage = {}
+    for row in results:
+        by_stage.setdefault(row["stage"], []).append(row)
+    summary = []
+    for stage, rows in by_stage.items():
+        rows = sorted(rows, key=lambda r: r["n_rows"])
+        pairs = []
+        for a, b in zip(rows, rows[1:]):
+            if a["seconds"] > 0 and b["seconds"] > 0 and b["n_rows"] > a["n_rows"]:
+                pairs.append({"from_rows": a["n_rows"], "to_rows": b["n_rows"],
+                              "time_exponent": round(math.log(b["seconds"] / a["seconds"])
+                                                     / math.log(b["n_rows"] / a["n_rows"]), 3)})
+        summary.append({"stage": stage, "exponents": pairs,
+                        "superlinear": bool(pairs) and pairs[-1]["time_exponent"] > SUPERLINEAR_EXPONENT})
+    return summary
+
+
+def dataset_dir(data_dir, n_rows, fraud_rate, seed):
+    return os.path.join(data_dir, f"n{n_rows}_fraud{fraud_rate}_seed{seed}")
+
+
+def ensure_dataset(data_dir, n_rows, fraud_rate, seed):
+    """Generate the synthetic CSVs for one size unless they are already cached."""
+    from src.synthetic_data import write_dataset
+    out = dataset_dir(data_dir, n_rows, fraud_rate, seed)
+    fraud_csv = os.path.join(out, "Fraud_Data.csv")
+    ip_csv = os.path.join(out, "IpAddress_to_Country.csv")
+    if not (os.path.exists(fraud_csv) and os.path.exists(ip_csv)):
+        start = time.perf_counter()
+        write_dataset(out, n_rows, fraud_rate, seed)
+        logging.info(f"Generated {n_rows} rows in {time.perf_counter() - start:.1f}s")
+    return fraud_csv, ip_csv
+
+
+def run_size(n_rows, args):
+    """Benchmark one size in a fresh interpreter, so peak memory is not inherited from earlier sizes."""
+    fraud_csv, ip_csv = ensure_dataset(args.data_dir, n_rows, args.fraud_rate, args.seed)
+    if args.in_process:
+        rows = run_pipeline(fraud_csv, ip_csv, args.stages, args.imbalance)
+    else:
+        cmd = [sys.executable, os.path.abspath(__file__), "--worker", fraud_csv, ip_csv,
+               "--stages", ",".join(args.stages), "--imbalance", args.imbalance]
+        out = subprocess.run(cmd, check=True, stdout=subprocess.PIPE, text=True, cwd=REPO_ROOT).stdout
+        rows = json.loads(out.strip().splitlines()[-1])
+    return [{"n_rows": n_rows, **row} for row in rows]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fraud-Guard pipeline scaling benchmark")
+    parser.add_argument("--sizes", default="100000,1000000",
+                        help="Comma-separated transaction counts (e.g. 100000,1000000,10000000,50000000)")
+    parser.add_argument("--fraud-rate", type=float, default=0.094, help="Share of fraudulent transactions")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--stages", default=",".join(STAGES), help="Comma-separated stages to report")
+    parser.add_argument("--imbalance", default="smote", help="Strategy for the handle_imbalance stage")
+    parser.add_argument("--data-dir", default="data/synthetic", help="Cache of generated datasets")
+    parser.add_argument("--output", default="reports/pipeline_benchmark.json", help="JSON report file")
+    parser.add_argument("--in-process", action="store_true",
+                        help="Run every size in this process (faster, but peak memory carries over)")
+    parser.add_argument("--worker", nargs=2, metavar=("FRAUD_CSV", "IP_CSV"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    args.stages = [s for s in args.stages.split(",") if s]
+    unknown = set(args.stages) - set(STAGES)
+    if unknown:
+        parser.error(f"Unknown stages {sorted(unknown)} (choose from {STAGES})")
+
+    if args.worker:
+        logging.basicConfig(level=logging.WARNING)
+        print(json.dumps(run_pipeline(*args.worker, args.stages, args.imbalance)))
+        return None
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    results = []
+    for n_rows in sorted(int(s) for s in args.sizes.split(",") if s):
+        results += run_size(n_rows, args)
+
+    import numpy as np
+    import pandas as pd
+    report = {
+        "config": {"sizes": sorted({r["n_rows"] for r in results}), "fraud_rate": args.fraud_rate,
+                   "seed": args.seed, "stages": args.stages, "imbalance": args.imbalance,
+                   "isolated_processes": not args.in_process},
+        "environment": {"python": platform.python_version(), "platform": platform.platform(),
+                        "cpu_count": os.cpu_count(), "numpy": np.__version__, "pandas": pd.__version__},
+        "results": results,
+        "scaling": scaling_exponents(results),
+    }
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(pd.DataFrame(results).to_string(index=False))
+    flagged = [s["stage"] for s in report["scaling"] if s["superlinear"]]
+    print(f"Super-linear stages: {', '.join(flagged) if flagged else 'none'}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Startup benchmark: time-to-first-prediction and per-worker memory.
+
+Starts N worker processes at once for each model-loading mode (pickle:
+joblib-load the sklearn forest; mmap: memory-map the compiled arrays),
+and reports, per worker, the time from interpreter start to the first
+successful /predict, plus resident (RSS) and proportional (PSS, shared
+pages split between processes) memory while all workers are alive.
+
+Uses models/ from the repository when a trained forest exists there,
+otherwise a synthetic 100-tree, depth-10 forest in a temporary directory.
+
+Usage:
+    python benchmarks/bench_startup.py [--workers 4]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+CHILD = r"""
+import json, sys, time
+start = time.perf_counter()
+import serve_model
+client = serve_model.app.test_client()
+response = client.post("/predict", json={"purchase_value": 50, "age": 30})
+assert response.status_code == 200, response.get_data(as_text=True)
+elapsed = time.perf_counter() - start
+print(json.dumps({"time_to_first_prediction_s": elapsed}), flush=True)
+sys.stdin.readline()  # wait until every worker is up before measuring memory
+
+def kb(path, field):
+    try:
+        with open(path) as f:
+            for line in f:
+                if line.startswith(field):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+
+print(json.dumps({"rss_mb": (kb("/proc/self/status", "VmRSS:") or 0) / 1024,
+                  "pss_mb": (kb("/proc/self/smaps_rollup", "Pss:") or 0) / 1024}), flush=True)
+"""
+
+
+def prepare_models(workdir: str) -> str:
+    """Return a directory containing models/ with both the pickle and the compiled arrays."""
+    sys.path.insert(0, REPO_ROOT)
+    import joblib
+    from src.forest_inference import compile_forest, save_forest_arrays
+
+    repo_models = os.path.join(REPO_ROOT, "models")
+    if os.path.exists(os.path.join(repo_models, "random_forest_model.pkl")):
+        model = joblib.load(os.path.join(repo_models, "random_forest_model.pkl"))
+    else:
+        import pandas as pd
+        from sklearn.ensemble import RandomForestClassifier
+        features = ['purchase_value', 'source_encoded', 'browser_encoded', 'sex_encoded',
+                    'age', 'time_since_signup', 'user_transaction_count']
+        rng = np.random.default_rng(42)
+        X = pd.DataFrame(rng.normal(size=(50000, len(features))), columns=features)
+        y = ((X['time_since_signup'] < -1) | (rng.random(len(X)) < 0.05)).astype(int)
+        model = RandomForestClassifier(n_estimators=100, max_depth=10, random_state=42, n_jobs=-1).fit(X, y)
+
+    os.makedirs(os.path.join(workdir, "models"), exist_ok=True)
+    joblib.dump(model, os.path.join(workdir, "models", "random_forest_model.pkl"))
+    save_forest_arrays(compile_forest(model), os.path.join(workdir, "models", "random_forest_compiled"))
+    return workdir
+
+
+def run_mode(mode: str, workers: int, workdir: str) -> dict:
+    env = {**os.environ, "FRAUD_GUARD_MODEL_MODE": mode, "PYTHONPATH": REPO_ROOT}
+    procs = [subprocess.Popen([sys.executable, "-c", CHILD], cwd=workdir, env=env, text=True,
+                              stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+             for _ in range(workers)]
+
+    startup = [json.loads(p.stdout.readline()) for p in procs]
+    for p in procs:
+        p.stdin.write("\n")
+        p.stdin.flush()
+    memory = [json.loads(p.stdout.readline()) for p in procs]
+    for p in procs:
+        p.wait()
+
+    ttfp = [s["time_to_first_prediction_s"] for s in startup]
+    return {
+        "mode": mode,
+        "workers": workers,
+        "time_to_first_prediction_s": {"mean": float(np.mean(ttfp)), "max": float(np.max(ttfp))},
+        "rss_mb_per_worker": float(np.mean([m["rss_mb"] for m in memory])),
+        "pss_mb_per_worker": float(np.mean([m["pss_mb"] for m in memory])),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fraud-Guard API startup benchmark")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--output", help="Optional JSON results file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        prepare_models(workdir)
+        results = [run_mode(mode, args.workers, workdir) for mode in ("pickle", "mmap")]
+
+    for r in results:
+        print(f"{r['mode']:<7} workers={r['workers']}  "
+              f"ttfp mean={r['time_to_first_prediction_s']['mean']:.2f}s "
+              f"max={r['time_to_first_prediction_s']['max']:.2f}s  "
+              f"RSS={r['rss_mb_per_worker']:.1f}MB  PSS={r['pss_mb_per_worker']:.1f}MB")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+"""
+Replay-based load test and latency benchmark for the Fraud-Guard API.
+
+Replays a JSONL traffic file (one payload per line, or {"path": ..., "payload": ...})
+or synthetic transactions against:
+  * http      - a serve_model server started locally (or --url for a running one)
+  * inprocess - Flask's test client, which removes network/WSGI-server overhead
+                so framework time can be separated from model time
+
+Load is applied either at a fixed concurrency (closed loop) or at a fixed
+request rate (open loop; latency is measured from each request's scheduled
+send time, so a stalled server cannot hide queueing delay).
+
+Usage:
+    python benchmarks/load_test.py --mode inprocess --concurrency 8 --requests 2000
+    python benchmarks/load_test.py --mode http --rate 200 --duration 30 --traffic traffic.jsonl
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+DEFAULT_PATH = "/predict"
+
+Request = Tuple[str, Any]
+
+
+def load_traffic(path: str, limit: Optional[int] = None) -> List[Request]:
+    """Read (endpoint path, payload) pairs from a JSONL traffic capture."""
+    requests_: List[Request] = []
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if isinstance(entry, dict) and "payload" in entry:
+                requests_.append((entry.get("path", DEFAULT_PATH), entry["payload"]))
+            else:
+                requests_.append((DEFAULT_PATH, entry))
+            if limit and len(requests_) >= limit:
+                break
+    if not requests_:
+        raise ValueError(f"No requests found in {path}")
+    return requests_
+
+
+def synthetic_traffic(n: int = 1000, seed: int = 42) -> List[Request]:
+    """Schema-faithful synthetic /predict payloads."""
+    rng = np.random.default_rng(seed)
+    browsers = ['Chrome', 'FireFox', 'IE', 'Opera', 'Safari']
+    sources = ['Ads', 'Direct', 'SEO']
+    return [(DEFAULT_PATH, {
+        "purchase_value": int(rng.integers(9, 155)),
+        "age": int(rng.integers(18, 77)),
+        "browser": browsers[rng.integers(len(browsers))],
+        "source": sources[rng.integers(len(sources))],
+        "sex": "M" if rng.random() < 0.58 else "F",
+        "time_diff": float(rng.exponential(4_000_000)),
+        "user_id": int(rng.integers(1, 400_000)),
+        "device_id": f"D{rng.integers(0, 130_000):012d}",
+        "ip_address": float(rng.uniform(5e4, 4.3e9)),
+    }) for _ in range(n)]
+
+
+class HttpTarget:
+    """Sends requests over HTTP with one pooled session per thread."""
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url.rstrip("/")
+        self._local = threading.local()
+
+    def send(self, path: str, payload: Any) -> int:
+        import requests
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session.post(self.base_url + path, json=payload, timeout=30).status_code
+
+
+class InProcessTarget:
+    """Calls the Flask app directly through one test client per thread."""
+
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+
+    def send(self, path: str, payload: Any) -> int:
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        return client.post(path, json=payload).status_code
+
+
+def _timed(target, request: Request, scheduled: float) -> Tuple[float, Any]:
+    try:
+        status = target.send(*request)
+    except Exception as e:
+        status = type(e).__name__
+    return time.perf_counter() - scheduled, status
+
+
+def run_closed_loop(target, traffic: List[Request], concurrency: int,
+                    n_requests: Optional[int], duration: Optional[float]) -> Dict[str, Any]:
+    """Keep `concurrency` requests in flight until n_requests are sent or duration elapses."""
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    lock = threading.Lock()
+    counter = iter(range(n_requests if n_requests else sys.maxsize))
+    start = time.perf_counter()
+    deadline = start + duration if duration else float("inf")
+
+    def worker():
+        while time.perf_counter() < deadline:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            latency, status = _timed(target, traffic[i % len(traffic)], time.perf_counter())
+            with lock:
+                latencies.append(latency)
+                statuses[status] += 1
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return summarize(latencies, statuses, time.perf_counter() - start)
+
+
+def run_open_loop(target, traffic: List[Request], rate: float, duration: float,
+                  max_in_flight: int = 256) -> Dict[str, Any]:
+    """Send requests on a fixed schedule of `rate` per second for `duration` seconds."""
+    n_requests = int(rate * duration)
+    start = time.perf_counter()
+    futures = []
+    with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+        for i in range(n_requests):
+            scheduled = start + i / rate
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            futures.append(pool.submit(_timed, target, traffic[i % len(traffic)], scheduled))
+        results = [f.result() for f in futures]
+
+    statuses = Counter(status for _, status in results)
+    summary = summarize([latency for latency, _ in results], statuses, time.perf_counter() - start)
+    summary["target_rate_rps"] = rate
+    return summary
+
+
+def summarize(latencies: List[float], statuses: Counter, wall_seconds: float) -> Dict[str, Any]:
+    """Throughput, latency percentiles (ms) and error rate."""
+    ms = np.asarray(latencies) * 1000.0
+    total = len(latencies)
+    errors = sum(count for status, count in statuses.items() if status != 200)
+    pct = (lambda q: round(float(np.percentile(ms, q)), 3)) if total else (lambda q: None)
+    return {
+        "requests": total,
+        "duration_s": round(wall_seconds, 3),
+        "throughput_rps": round(total / wall_seconds, 2) if wall_seconds > 0 else 0.0,
+        "latency_ms": {
+            "p50": pct(50), "p95": pct(95), "p99": pct(99),
+            "max": round(float(ms.max()), 3) if total else None,
+            "mean": round(float(ms.mean()), 3) if total else None,
+        },
+        "errors": errors,
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "status_counts": {str(k): v for k, v in statuses.items()},
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_local_server(port: int, timeout: float = 60.0) -> subprocess.Popen:
+    """Start serve_model with a threaded WSGI server and wait for /health."""
+    import requests
+    code = ("from werkzeug.serving import run_simple; import serve_model; "
+            f"run_simple('127.0.0.1', {port}, serve_model.app, threaded=True)")
+    proc = subprocess.Popen([sys.executable, "-c", code], cwd=REPO_ROOT,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/health", timeout=1).ok:
+                return proc
+        except requests.ConnectionError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("serve_model did not become healthy in time")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fraud-Guard API load test")
+    parser.add_argument("--mode", choices=["http", "inprocess"], default="inprocess")
+    parser.add_argument("--url", help="Target an already running server instead of starting one")
+    parser.add_argument("--traffic", help="JSONL traffic file (synthetic payloads if omitted)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Closed-loop in-flight requests")
+    parser.add_argument("--rate", type=float, help="Open-loop requests per second (overrides --concurrency)")
+    parser.add_argument("--requests", type=int, default=2000, help="Closed-loop request count")
+    parser.add_argument("--duration", type=float, help="Run time in seconds (required with --rate)")
+    parser.add_argument("--output", default="bench_results.json", help="JSON results file")
+    args = parser.parse_args(argv)
+
+    traffic = load_traffic(args.traffic) if args.traffic else synthetic_traffic()
+    server = None
+    if args.mode == "inprocess":
+        sys.path.insert(0, REPO_ROOT)
+        import serve_model
+        target = InProcessTarget(serve_model.app)
+    elif args.url:
+        target = HttpTarget(args.url)
+    else:
+        port = _free_port()
+        server = start_local_server(port)
+        target = HttpTarget(f"http://127.0.0.1:{port}")
+
+    try:
+        _timed(target, traffic[0], time.perf_counter())  # warm-up
+        if args.rate:
+            results = run_open_loop(target, traffic, args.rate, args.duration or 10.0)
+        else:
+            results = run_closed_loop(target, traffic, args.concurrency,
+                                      None if args.duration else args.requests, args.duration)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    results.update({"mode": args.mode, "traffic": args.traffic or "synthetic",
+                    "concurrency": None if args.rate else args.concurrency})
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(json.dumps(results, indent=2))
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,20 @@
+import os
+
 import streamlit as st
 import requests
 import pandas as pd
 import plotly.express as px # Great for interactive charts
+from requests.adapters import HTTPAdapter
+
+from src.rollups import latest_day, load_rollup_tables
+from src.shap_store import ShapStore
+
+API_URL = os.environ.get("FRAUD_GUARD_API_URL", "http://127.0.0.1:5000")
+ROLLUP_PATH = os.environ.get("FRAUD_GUARD_ROLLUP_PATH", "data/rollups/rollups.pkl")
+# Seconds before cached rollup tables are re-read from disk
+ROLLUP_TTL = int(os.environ.get("FRAUD_GUARD_DASHBOARD_TTL", "60"))
+# SHAP store written by main.py (test set) or explain.py (any transaction file)
+SHAP_STORE = os.environ.get("FRAUD_GUARD_SHAP_STORE", "reports/shap/holdout")
 
 # Page Config
 st.set_page_config(page_title="Fraud-Guard Admin", layout="wide")
@@ -14,15 +27,65 @@ st.markdown("""
     </style>
     """, unsafe_allow_html=True)
 
+
+
+@st.cache_resource
+def http_session():
+    """One pooled keep-alive session for all probes, shared across reruns."""
+    session = requests.Session()
+    session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=8))
+    session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=8))
+    return session
+
+
+@st.cache_data(ttl=ROLLUP_TTL, show_spinner=False)
+def load_rollups(path, mtime):
+    # mtime is part of the cache key, so a refreshed store is picked up right away
+    return load_rollup_tables(path)
+
+
+def rollups():
+    if not os.path.exists(ROLLUP_PATH):
+        return None
+    return load_rollups(ROLLUP_PATH, os.path.getmtime(ROLLUP_PATH))
+
+
+@st.cache_data(show_spinner=False)
+def load_shap_importance(path, mtime):
+    store = ShapStore(path)
+    return len(store), store.mean_abs().rename_axis('Feature').reset_index(name='Mean |SHAP|')
+
+
+def shap_importance():
+    meta = os.path.join(SHAP_STORE, "meta.json")
+    if not os.path.exists(meta):
+        return None
+    try:
+        return load_shap_importance(SHAP_STORE, os.path.getmtime(meta))
+    except ValueError:  # store still being written
+        return None
+
+
 st.title("🛡️ Fraud-Guard: Interactive Fraud Analytics")
 
 # --- 1. BUSINESS IMPACT METRICS ---
-# These simulate business value for your Week 12 report
+# Totals over all scored history, from the rollup tables written by `score.py --rollups`
+history = rollups()
 col_m1, col_m2, col_m3, col_m4 = st.columns(4)
-col_m1.metric("Total Transactions", "151,112", "+12%")
-col_m2.metric("Detected Fraud", "14,151", "9.3%", delta_color="inverse")
-col_m3.metric("Fraud Cases Prevented", "8,402")
-col_m4.metric("Estimated Savings", "$420,100", "+$15k")
+if history is None:
+    st.info(f"No rollups at {ROLLUP_PATH} yet. Score transactions with "
+            "`python score.py INPUT scores.csv --keep-columns user_id,purchase_time,purchase_value,"
+            "country,source,browser --rollups` to populate the dashboard.")
+else:
+    totals = history['totals']
+    # Most recent dated bucket ('Unknown' collects rows without a parseable purchase_time)
+    latest = latest_day(history['day'])
+    col_m1.metric("Total Transactions", f"{totals['transactions']:,.0f}",
+                  f"+{latest[1]['transactions']:,.0f} on {latest[0]}" if latest is not None else None)
+    col_m2.metric("Flagged as Fraud", f"{totals['flagged']:,.0f}", f"{totals['fraud_rate']:.1%}",
+                  delta_color="inverse")
+    col_m3.metric("Confirmed Fraud (labelled)", f"{totals['labelled_fraud']:,.0f}")
+    col_m4.metric("Value at Risk", f"${totals['value_at_risk']:,.0f}")
 
 st.divider()
 
@@ -56,7 +119,7 @@ with col_result:
                 "user_transaction_count": 1
             }
             try:
-                res = requests.post("http://127.0.0.1:5000/predict", json=payload)
+                res = http_session().post(f"{API_URL}/predict", json=payload, timeout=5)
                 data = res.json()
                 
                 if data['prediction'] == 1:
@@ -76,20 +139,50 @@ st.divider()
 
 # --- 3. DATA EXPLORATION & VISUALIZATIONS ---
 st.header("📊 Global Fraud Insights")
-tab1, tab2 = st.tabs(["Explainability (SHAP)", "Geography & Trends"])
+tab1, tab2, tab3 = st.tabs(["Explainability (SHAP)", "Geography & Trends", "Channels"])
 
 with tab1:
     st.image("reports/figures/shap_summary_plot.png", use_container_width=True)
     st.write("**Insight:** Features on the right (red/pink) push the model toward a Fraud prediction.")
+    population = shap_importance()
+    if population is not None:
+        n_rows, importance = population
+        fig = px.bar(importance.iloc[::-1], x='Mean |SHAP|', y='Feature', orientation='h',
+                     title=f"Feature Impact over {n_rows:,} Transactions")
+        st.plotly_chart(fig, use_container_width=True)
 
 with tab2:
-    # Creating a dummy dataframe to show how interactivity works
-    # In your real case, you'd load your 'Fraud_Data.csv' here
-    chart_data = pd.DataFrame({
-        'Country': ['USA', 'China', 'Japan', 'Ethiopia', 'UK'],
-        'Fraud_Count': [450, 320, 150, 80, 210]
-    })
-    fig = px.bar(chart_data, x='Country', y='Fraud_Count', title="Top Countries by Fraud Volume", color='Fraud_Count')
-    st.plotly_chart(fig, use_container_width=True)
-
-st.caption("Fraud-Guard v1.0 | Data Updated: 2026-02-19")
\ No newline at end of file
+    if history is None or history['day'].empty:
+        st.write("No scored transactions yet.")
+    else:
+        days = history['day'].reset_index().rename(columns={'key': 'Day'})
+        days['Day'] = pd.to_datetime(days['Day'], errors='coerce')
+        days = days.dropna(subset=['Day'])
+        start, end = days['Day'].min().date(), days['Day'].max().date()
+        window = st.slider("Date range", min_value=start, max_value=end, value=(start, end))
+        days = days[(days['Day'].dt.date >= window[0]) & (days['Day'].dt.date <= window[1])]
+        fig = px.line(days, x='Day', y=['fraud_rate', 'mean_probability'], title="Daily Fraud Rate")
+        st.plotly_chart(fig, use_container_width=True)
+        fig = px.bar(days, x='Day', y='value_at_risk', title="Daily Value at Risk ($)")
+        st.plotly_chart(fig, use_container_width=True)
+
+        top_n = st.slider("Countries shown", 5, 50, 15)
+        countries = (history['country'].reset_index().rename(columns={'key': 'Country'})
+                     .nlargest(top_n, 'flagged'))
+        fig = px.bar(countries, x='Country', y='flagged', color='fraud_rate',
+                     hover_data=['transactions', 'value_at_risk'], title="Top Countries by Fraud Volume")
+        st.plotly_chart(fig, use_container_width=True)
+
+with tab3:
+    if history is not None:
+        col_s, col_b = st.columns(2)
+        for col, dim, title in ((col_s, 'source', "Fraud Rate by Source"), (col_b, 'browser', "Fraud Rate by Browser")):
+            table = history[dim].reset_index().rename(columns={'key': dim.title()})
+            fig = px.bar(table, x=dim.title(), y='fraud_rate', hover_data=['transactions', 'flagged', 'value_at_risk'],
+                         title=title)
+            col.plotly_chart(fig, use_container_width=True)
+
+if history is not None and len(history['day']):
+    st.caption(f"Fraud-Guard v1.0 | Scored history: {history['day'].index[0]} to {history['day'].index[-1]}")
+else:
+    st.caption("Fraud-Guard v1.0")
\ No newline at end of file
@@ -0,0 +1,50 @@
+"""
+Offline SHAP values for every transaction in a file.
+
+Usage:
+    python explain.py data/raw/Fraud_Data.csv reports/shap/fraud_data [--jobs 8]
+    python explain.py history.parquet reports/shap/history --model models/random_forest_model.pkl
+
+Values are written to a memory-mapped store (see src/shap_store.py) with
+input row numbers as row ids, matching the `row` column of score.py
+output. Rerunning the same command after an interruption continues from
+the last completed chunk (pass --restart to start over).
+"""
+import argparse
+import json
+import logging
+
+from src.shap_store import explain_file
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Fraud-Guard offline SHAP explanations")
+    parser.add_argument('input', help="CSV or Parquet transactions file")
+    parser.add_argument('store', help="Output directory of the SHAP store")
+    parser.add_argument('--model', default='models/random_forest_model.pkl', help="Pickled forest")
+    parser.add_argument('--feature-transform', default='models/feature_transform.pkl')
+    parser.add_argument('--ip-index', default='models/ip_country_index.npz')
+    parser.add_argument('--chunksize', type=int, default=2000, help="Rows per SHAP task")
+    parser.add_argument('--jobs', type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument('--no-velocity', action='store_true',
+                        help="Do not replay velocity and entity-link features (e.g. for files not in time order)")
+    parser.add_argument('--restart', action='store_true', help="Ignore any completed chunks")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    store = explain_file(args.input, args.store, model_path=args.model,
+                         transform_path=args.feature_transform, ip_index_path=args.ip_index,
+                         chunksize=args.chunksize, n_jobs=args.jobs, velocity=not args.no_velocity,
+                         resume=not args.restart)
+    summary = {'rows': len(store), 'base_value': store.base_value,
+               'mean_abs_shap': store.mean_abs().round(6).to_dict()}
+    print(json.dumps(summary, indent=2))
+    return summary
+
+
+if __name__ == "__main__":
+    main()
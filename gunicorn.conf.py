@@ -0,0 +1,35 @@
+# Gunicorn settings for the Fraud-Guard API: gunicorn -c gunicorn.conf.py serve_model:app
+import os
+import shutil
+import tempfile
+
+bind = os.environ.get("FRAUD_GUARD_BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("FRAUD_GUARD_WORKERS", 2))
+threads = int(os.environ.get("FRAUD_GUARD_THREADS", 8))
+
+# Import serve_model (and load the model) once in the master before forking, so
+# workers start instantly and share the model pages copy-on-write. With the
+# memory-mapped compiled forest the tree arrays are shared even without preload.
+preload_app = os.environ.get("FRAUD_GUARD_PRELOAD", "1") == "1"
+
+# Workers write their drift profiles here, so GET /drift on any worker reports
+# the traffic of all of them. Cleared at startup; one directory per bind port.
+drift_dir = os.environ.setdefault(
+    "FRAUD_GUARD_DRIFT_DIR", os.path.join(tempfile.gettempdir(), f"fraud_guard_drift_{bind.rsplit(':', 1)[-1]}"))
+
+
+def on_starting(server):
+    shutil.rmtree(drift_dir, ignore_errors=True)
+
+
+def post_fork(server, worker):
+    # Threads do not survive fork, so each worker starts its own model watcher
+    # (FRAUD_GUARD_RELOAD_INTERVAL > 0) and swaps in new artifacts independently.
+    import serve_model
+    serve_model.start_model_watcher()
+
+
+def worker_exit(server, worker):
+    # Keep the rows this worker saw in the shared drift profile
+    import serve_model
+    serve_model.drift_monitor.flush()
@@ -1,10 +1,25 @@
+import argparse
+import json
 import pandas as pd
 import logging
 import os
 from src.preprocessing import clean_data, convert_to_datetime, map_ip_to_country, scale_and_encode
-from src.feature_engineering import create_time_features, create_transaction_velocity
+from sklearn.ensemble import RandomForestClassifier
+from src.ip_index import IpCountryIndex
+from src.velocity import VelocityStore
+from src.entity_links import EntityLinkIndex
+from src.feature_store import model_frame, stream_model_features, stream_preprocess
+from src.stage_cache import StageCache
+from src.schema import MemoryReport, drop_merge_only, read_fraud_csv, read_ip_csv
+from src.forest_inference import compile_forest, save_forest_arrays
+from src.model_search import successive_halving
+from src.feature_engineering import create_entity_link_features, create_time_features, create_transaction_velocity
+from src.imbalance import STRATEGIES, compare_strategies
+from src.compaction import compact_model
+from src.drift import FeatureProfile
 from src.model_training import (
-    handle_imbalance, 
+    FEATURE_COLS,
+    select_features, 
     prepare_train_test_split, 
     train_baseline_model,
     train_ensemble_model,
@@ -17,23 +32,96 @@ from src.explainability import plot_feature_importance, run_shap_analysis
 # Set up logging for the main execution 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def main():
+FRAUD_CSV = 'data/raw/Fraud_Data.csv'
+IP_CSV = 'data/raw/IpAddress_to_Country.csv'
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Fraud-Guard training pipeline")
+    parser.add_argument('--streaming', action='store_true',
+                        help="Preprocess the raw CSV in chunks into an on-disk feature store")
+    parser.add_argument('--chunksize', type=int, default=200_000,
+                        help="Rows per chunk in streaming mode")
+    parser.add_argument('--feature-store', default='data/processed/feature_store',
+                        help="Feature store directory used in streaming mode")
+    parser.add_argument('--force-stage', action='append', default=[], metavar='STAGE',
+                        help="Recompute a cached stage (repeatable; 'all' for every stage)")
+    parser.add_argument('--no-cache', action='store_true', help="Disable the stage cache")
+    parser.add_argument('--cache-dir', default='.cache/stages', help="Stage cache directory")
+    parser.add_argument('--cache-max-gb', type=float, default=2.0,
+                        help="Evict least recently used stage outputs above this size")
+    parser.add_argument('--search', action='store_true',
+                        help="Tune the Random Forest with a resumable successive-halving search")
+    parser.add_argument('--search-jobs', type=int, default=None,
+                        help="Worker processes for the search and cross-validation (default: all cores)")
+    parser.add_argument('--search-dir', default='.cache/search', help="Search state directory")
+    parser.add_argument('--imbalance', choices=sorted(STRATEGIES), default='smote',
+                        help="Class-imbalance strategy, applied inside training splits/folds only")
+    parser.add_argument('--compare-imbalance', action='store_true',
+                        help="Report fit time, peak memory and AUC-PR for every imbalance strategy")
+    parser.add_argument('--compact', action='store_true',
+                        help="Prune the forest to the fewest trees within --compact-tolerance and report the gain")
+    parser.add_argument('--compact-tolerance', type=float, default=0.005,
+                        help="Allowed holdout AUC-PR drop for the pruned forest")
+    parser.add_argument('--distill', choices=['gbm', 'tree'],
+                        help="Also distill the forest into a gradient-boosted or single-tree model")
+    parser.add_argument('--shap-jobs', type=int, default=None,
+                        help="Worker processes for the test-set SHAP values (default: all cores)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    cache = StageCache(args.cache_dir, max_bytes=int(args.cache_max_gb * 1024 ** 3),
+                       force=args.force_stage, enabled=not args.no_cache)
+
     # --- 1. Load & Initial Preprocessing ---
     logging.info("Loading datasets...")
-    fraud_data = pd.read_csv('data/raw/Fraud_Data.csv')
-    ip_data = pd.read_csv('data/raw/IpAddress_to_Country.csv')
-    
-    fraud_data = clean_data(fraud_data)
-    fraud_data = convert_to_datetime(fraud_data, ['signup_time', 'purchase_time'])
-    fraud_data = map_ip_to_country(fraud_data, ip_data)
-
-    # --- 2. Feature Engineering & Transformation ---
-    fraud_data = create_time_features(fraud_data)
-    fraud_data = create_transaction_velocity(fraud_data)
-    fraud_data = scale_and_encode(fraud_data)
-
-    # --- 3. Handle Imbalance (SMOTE) ---
-    X, y = handle_imbalance(fraud_data, 'class')
+    memory = MemoryReport()
+    ip_data = read_ip_csv(IP_CSV)
+    # Sorted-array IP index, reused by the API for live country lookups
+    ip_index = IpCountryIndex.from_frame(ip_data)
+    ip_index.save('models/ip_country_index.npz')
+
+    # Velocity store state after the replay seeds the API's live counters;
+    # same for the device/IP sharing index
+    velocity_store = VelocityStore()
+    entity_links = EntityLinkIndex()
+
+    if args.streaming:
+        # Every step up to the model matrix runs per chunk against the on-disk
+        # columnar store: peak memory follows --chunksize (plus the velocity /
+        # link state and 8 bytes per row for the time order). The frame below
+        # is backed by the memory-mapped columns; the train/test split,
+        # resampling and model fits still hold the training rows in memory.
+        store = stream_preprocess(FRAUD_CSV, ip_index, args.feature_store, chunksize=args.chunksize)
+        feature_transform = stream_model_features(store, velocity_store, entity_links, chunksize=args.chunksize)
+        fraud_data = memory.record('stream_model_features', model_frame(store, FEATURE_COLS + ['class']))
+    else:
+        # Declared dtypes: categoricals for repeated strings, narrow integers
+        fraud_data = memory.record('load', read_fraud_csv(FRAUD_CSV))
+        fraud_data = memory.record('clean_data', cache.run('clean_data', clean_data, fraud_data))
+        fraud_data = convert_to_datetime(fraud_data, ['signup_time', 'purchase_time'])
+        fraud_data = memory.record('map_ip_to_country',
+                                   cache.run('map_ip_to_country', map_ip_to_country, fraud_data, ip_index))
+        fraud_data = cache.run('create_time_features', create_time_features, fraud_data)
+        # signup_time is only needed for time_since_signup
+        fraud_data = memory.record('create_time_features',
+                                   drop_merge_only(fraud_data, 'create_time_features'))
+
+        # --- 2. Feature Engineering & Transformation ---
+        fraud_data = memory.record('create_transaction_velocity',
+                                   create_transaction_velocity(fraud_data, velocity_store))
+        fraud_data = memory.record('create_entity_link_features',
+                                   create_entity_link_features(fraud_data, entity_links))
+        fraud_data, feature_transform = cache.run('scale_and_encode', scale_and_encode,
+                                                  fraud_data, return_transform=True)
+        memory.record('scale_and_encode', fraud_data)
+    memory.save('reports/memory_report.json')
+    print(memory.to_frame().to_string(index=False))
+
+    # --- 3. Model Inputs (imbalance is handled per training split, not here) ---
+    X, y = select_features(fraud_data, 'class')
 
     print("\n" + "="*30)
     print("TASK 1 COMPLETE")
@@ -44,17 +132,54 @@ def main():
     X_train, X_test, y_train, y_test = prepare_train_test_split(X, y)
 
     # --- 5. Task 2: Baseline Model Training ---
-    baseline_model = train_baseline_model(X_train, y_train, X_test, y_test)
+    baseline_model = cache.run('train_baseline_model', train_baseline_model, X_train, y_train, X_test, y_test,
+                               imbalance=args.imbalance)
+
+    if args.compare_imbalance:
+        report = compare_strategies(RandomForestClassifier(n_estimators=100, max_depth=10, random_state=42, n_jobs=-1),
+                                    X_train, y_train, X_test, y_test)
+        os.makedirs('reports', exist_ok=True)
+        with open('reports/imbalance_strategies.json', 'w') as f:
+            json.dump(report, f, indent=2)
+        print(pd.DataFrame(report).to_string(index=False))
 
     # --- 6. Task 2: Ensemble Model Training (Random Forest) ---
-    ensemble_model = train_ensemble_model(X_train, y_train, X_test, y_test)
+    rf_params = None
+    if args.search:
+        # Interrupted searches resume from the fold fits recorded under --search-dir
+        search = successive_halving(X_train, y_train, n_jobs=args.search_jobs, search_dir=args.search_dir,
+                                    imbalance=args.imbalance)
+        rf_params = search['best_params']
+    ensemble_model = cache.run('train_ensemble_model', train_ensemble_model, X_train, y_train, X_test, y_test,
+                               params=rf_params, imbalance=args.imbalance)
 
     # --- 7. Task 2: Cross-Validation ---
-    cv_scores = perform_cross_validation(ensemble_model, X, y)
+    cv_scores = cache.run('perform_cross_validation', perform_cross_validation, ensemble_model, X, y,
+                          n_jobs=args.search_jobs, imbalance=args.imbalance)
 
     # --- 8. Save Models ---
     save_model(baseline_model, 'baseline_logistic_model.pkl')
     save_model(ensemble_model, 'random_forest_model.pkl')
+    # Memory-mappable node arrays shared by all API worker processes, published
+    # together with the fitted encoders/scaler so the API applies the same transformation
+    save_forest_arrays(compile_forest(ensemble_model), 'models/random_forest_compiled', feature_transform)
+    # Standalone copy for the pickled model and other consumers
+    save_model(feature_transform, 'feature_transform.pkl')
+    save_model(velocity_store, 'velocity_store.pkl')
+    # Flat-array snapshot, restored by the API at startup
+    entity_links.save('models/entity_links.npz')
+    # Training feature distribution; the API compares live traffic against it (GET /drift)
+    FeatureProfile.from_reference(X_train.to_numpy(), X_train.columns).save('models/drift_reference.npz')
+
+    if args.compact:
+        # Trees are chosen on one half of the test split and reported on the other
+        X_select, X_report, y_select, y_report = prepare_train_test_split(X_test, y_test, test_size=0.5)
+        report = compact_model(ensemble_model, X_train, X_select, y_select, X_report, y_report,
+                               tolerance=args.compact_tolerance, distill_kind=args.distill)
+        os.makedirs('reports', exist_ok=True)
+        with open('reports/compaction_report.json', 'w') as f:
+            json.dump(report, f, indent=2)
+        print(pd.DataFrame(report).to_string(index=False))
 
     print("\n" + "="*30)
     print("ALL MODELING TASKS COMPLETE")
@@ -68,7 +193,8 @@ def main():
     plot_feature_importance(ensemble_model, feature_names)
 
     # Note: We now pass y_test to help find specific TP, FP, FN cases
-    run_shap_analysis(ensemble_model, X_test, y_test)
+    # SHAP values for the whole test set are stored in reports/shap/holdout/
+    run_shap_analysis(ensemble_model, X_test, y_test, n_jobs=args.shap_jobs)
 
     print("\n" + "="*30)
     print("TASK 3: GLOBAL EXPLAINABILITY COMPLETE")
@@ -1,24 +1,107 @@
 import logging
+import hashlib
+import itertools
+import json
 import joblib
 import os
-import pandas as pd
-from flask import Flask, request, jsonify
+import time
+import numpy as np
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Dict, List, Tuple
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
+from src.forest_inference import CompiledForest, bundled_transform_path, compile_forest, load_forest_arrays
+from src.feature_transform import FeatureTransform, load_feature_transform
+from src.ip_index import IpCountryIndex
+from src.velocity import ENTITIES, VelocityStore, to_epoch_seconds
+from src.entity_links import EntityLinkIndex
+from src.batching import MicroBatcher
+from src.reason_codes import ReasonCodeExplainer
+from src.model_reload import ModelReloader, ServingModel
+from src.drift import DriftMonitor
+from src.binary_format import BINARY_TYPES, ColumnarPayload, encode_response
+from src.prediction_cache import PredictionCache, SharedPredictionStore, feature_key, payload_key
+from src.metrics import MetricsRegistry, timed
+from src.async_logging import Sampler, configure_queue_logging
 
 # Initialize Flask App
 app = Flask(__name__)
 CORS(app)
 
-# Logging configuration for production-grade traceability
-logging.basicConfig(
-    level=logging.INFO, 
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
+# Logging configuration for production-grade traceability.
+# Records go through a queue so request threads never block on log I/O,
+# and request payloads are only logged for a sampled fraction of calls.
+configure_queue_logging(level=logging.INFO)
+log_payload = Sampler(float(os.environ.get("FRAUD_GUARD_LOG_PAYLOAD_SAMPLE_RATE", 0.01)))
 
-MODEL_PATH = "models/random_forest_model.pkl"
+# Prometheus metrics exposed on /metrics
+metrics = MetricsRegistry()
+REQUESTS = metrics.counter("fraud_guard_requests_total", "HTTP requests handled.",
+                           ["endpoint", "status"])
+ERRORS = metrics.counter("fraud_guard_errors_total", "Requests that returned a 4xx/5xx status.",
+                         ["endpoint", "status"])
+ROWS_SCORED = metrics.counter("fraud_guard_rows_scored_total", "Transactions scored.",
+                              ["endpoint", "model_version"])
+REQUEST_LATENCY = metrics.histogram("fraud_guard_request_latency_seconds", "End-to-end request latency.",
+                                    ["endpoint", "model_version"])
+STAGE_LATENCY = metrics.histogram("fraud_guard_stage_latency_seconds",
+                                  "Latency per request stage (decode, transform, predict or explain, serialize).",
+                                  ["endpoint", "stage", "model_version"])
+MODEL_INFO = metrics.gauge("fraud_guard_model_info", "Currently loaded model artifact.",
+                           ["model_version", "engine"])
+MICROBATCH_SIZE = metrics.gauge("fraud_guard_microbatch_mean_batch_size",
+                                "Mean achieved micro-batch size since startup.")
+
+# Override to serve another artifact, e.g. the output of main.py --compact
+MODEL_PATH = os.environ.get("FRAUD_GUARD_MODEL_PATH", "models/random_forest_model.pkl")
+COMPILED_MODEL_DIR = os.environ.get("FRAUD_GUARD_COMPILED_MODEL_DIR", "models/random_forest_compiled")
+
+# auto: memory-map COMPILED_MODEL_DIR when present, else unpickle MODEL_PATH
+# mmap / pickle: force one of the two
+MODEL_MODE = os.environ.get("FRAUD_GUARD_MODEL_MODE", "auto")
+FEATURE_TRANSFORM_PATH = "models/feature_transform.pkl"
+IP_INDEX_PATH = "models/ip_country_index.npz"
+VELOCITY_STORE_PATH = "models/velocity_store.pkl"
+ENTITY_LINKS_PATH = os.environ.get("FRAUD_GUARD_ENTITY_LINKS_PATH", "models/entity_links.npz")
+
+# auto: exact TreeSHAP when the sklearn forest is in memory, path attributions otherwise
+# shap: load the pickled forest for TreeSHAP even in mmap mode; path / off: as named
+EXPLAINER_MODE = os.environ.get("FRAUD_GUARD_EXPLAINER", "auto")
+EXPLAIN_CACHE_SIZE = int(os.environ.get("FRAUD_GUARD_EXPLAIN_CACHE_SIZE", 4096))
+EXPLAIN_TOP_K = int(os.environ.get("FRAUD_GUARD_EXPLAIN_TOP_K", 3))
+EXPLAIN_BUDGET_MS = (float(os.environ["FRAUD_GUARD_EXPLAIN_BUDGET_MS"])
+                     if os.environ.get("FRAUD_GUARD_EXPLAIN_BUDGET_MS") else None)
+
+# Seconds between checks for a new model artifact (0 disables the watcher)
+RELOAD_INTERVAL = float(os.environ.get("FRAUD_GUARD_RELOAD_INTERVAL", 0))
+# Shared secret for POST /admin/reload; the endpoint is disabled when unset
+RELOAD_TOKEN = os.environ.get("FRAUD_GUARD_RELOAD_TOKEN")
+
+# Feature profile of the training data, written by main.py
+DRIFT_REFERENCE_PATH = os.environ.get("FRAUD_GUARD_DRIFT_REFERENCE_PATH", "models/drift_reference.npz")
+# Directory where worker processes share their live profiles (set by gunicorn.conf.py; empty: this process only)
+DRIFT_DIR = os.environ.get("FRAUD_GUARD_DRIFT_DIR", "")
+DRIFT_FLUSH_INTERVAL = float(os.environ.get("FRAUD_GUARD_DRIFT_FLUSH_INTERVAL", 10))
+DRIFT_MIN_ROWS = int(os.environ.get("FRAUD_GUARD_DRIFT_MIN_ROWS", 100))
 
 def load_model():
     """Load trained model and log expected features."""
+    if MODEL_MODE != "pickle" and os.path.isdir(COMPILED_MODEL_DIR):
+        try:
+            # Read-only memory map: pre-forked workers share these pages
+            model = load_forest_arrays(COMPILED_MODEL_DIR)
+            logging.info(f"✅ Compiled model memory-mapped from {COMPILED_MODEL_DIR}")
+            logging.info(f"Model expects features: {list(model.feature_names_in_)}")
+            return model
+        except Exception as e:
+            logging.error(f"Error memory-mapping compiled model: {e}")
+            if MODEL_MODE == "mmap":
+                # Forced mmap mode never unpickles the full forest
+                return None
+    elif MODEL_MODE == "mmap":
+        logging.error(f"Compiled model not found at {COMPILED_MODEL_DIR}")
+        return None
+
     if not os.path.exists(MODEL_PATH):
         logging.error(f"Model file not found at {MODEL_PATH}")
         return None
@@ -39,79 +122,654 @@ def load_model():
         logging.error(f"Error loading model: {e}")
         return None
 
-# Load model once during server startup
-model = load_model()
+def load_compiled_model(model):
+    """Compile the forest into array form for low-latency scoring, if enabled."""
+    if isinstance(model, CompiledForest):
+        return model
+    if model is None or os.environ.get("FRAUD_GUARD_COMPILED_FOREST", "1") != "1":
+        return None
+    try:
+        return compile_forest(model)
+    except (TypeError, ValueError) as e:
+        logging.warning(f"Falling back to sklearn scoring: {e}")
+        return None
+
+def build_feature_transform(model) -> FeatureTransform:
+    """
+    Load the fitted encoders/scaler saved with the model and compile them
+    against the model's feature order. A compiled forest uses the transform
+    published in its own version directory; other models, or versions saved
+    without one, use FEATURE_TRANSFORM_PATH. Falls back to a pass-through
+    transform (raw values, integer category codes) when no artifact is available.
+    """
+    path = (bundled_transform_path(model.source) if getattr(model, "source", None) else None) \
+        or FEATURE_TRANSFORM_PATH
+    transform = None
+    if os.path.exists(path):
+        transform = load_feature_transform(path)
+    if transform is None:
+        logging.warning(f"No usable feature transform at {path}; "
+                        "scoring raw request values.")
+        transform = FeatureTransform.identity()
+
+    feature_names = list(getattr(model, "feature_names_in_", []))
+    return transform.compile(feature_names)
+
+def load_ip_index():
+    """Load the sorted-array IP-to-country index saved by main.py."""
+    if not os.path.exists(IP_INDEX_PATH):
+        logging.warning(f"IP country index not found at {IP_INDEX_PATH}; country lookup disabled.")
+        return None
+    return IpCountryIndex.load(IP_INDEX_PATH)
+
+def load_velocity_store() -> VelocityStore:
+    """Restore the velocity counters left by the training replay, or start empty."""
+    if os.path.exists(VELOCITY_STORE_PATH):
+        store = joblib.load(VELOCITY_STORE_PATH)
+        logging.info(f"Velocity store restored with {len(store)} active keys")
+        return store
+    logging.warning(f"Velocity store not found at {VELOCITY_STORE_PATH}; starting empty.")
+    return VelocityStore()
+
+def load_entity_links() -> EntityLinkIndex:
+    """Restore the user/device/IP link index snapshot left by the training replay, or start empty."""
+    if os.path.exists(ENTITY_LINKS_PATH):
+        start = time.perf_counter()
+        index = EntityLinkIndex.load(ENTITY_LINKS_PATH)
+        logging.info(f"Entity link index restored with {len(index)} nodes "
+                     f"in {time.perf_counter() - start:.2f}s")
+        return index
+    logging.warning(f"Entity link index not found at {ENTITY_LINKS_PATH}; starting empty.")
+    return EntityLinkIndex()
+
+def build_explainer(model, compiled_model):
+    """Build the reason-code explainer once, so /explain never constructs a TreeExplainer per call."""
+    if compiled_model is None or EXPLAINER_MODE == "off":
+        return None
+    sklearn_model = None if isinstance(model, CompiledForest) else model
+    if EXPLAINER_MODE == "shap" and sklearn_model is None and os.path.exists(MODEL_PATH):
+        sklearn_model = joblib.load(MODEL_PATH)
+    if EXPLAINER_MODE == "path":
+        sklearn_model = None
+    try:
+        return ReasonCodeExplainer(compiled_model, sklearn_model, cache_size=EXPLAIN_CACHE_SIZE)
+    except Exception as e:
+        logging.warning(f"TreeExplainer unavailable ({e}); using path attributions")
+        return ReasonCodeExplainer(compiled_model, cache_size=EXPLAIN_CACHE_SIZE)
+
+def artifact_version(path: str) -> str:
+    """
+    Short identifier for a model artifact, from FRAUD_GUARD_MODEL_VERSION or
+    from the names, sizes and modification times of its files.
+    """
+    if os.environ.get("FRAUD_GUARD_MODEL_VERSION"):
+        return os.environ["FRAUD_GUARD_MODEL_VERSION"]
+    return artifact_fingerprint(path)
+
+def artifact_fingerprint(path: str) -> str:
+    """
+    Hash of the resolved location and the names, sizes and modification
+    times of an artifact's files (compiled arrays are swapped in as a new
+    version directory, so this changes once per save).
+    """
+    if not os.path.exists(path):
+        return "none"
+    path = os.path.realpath(path)
+    files = [path] if os.path.isfile(path) else sorted(
+        os.path.join(path, name) for name in os.listdir(path))
+    h = hashlib.sha256(path.encode())
+    for file in files:
+        stat = os.stat(file)
+        h.update(f"{os.path.basename(file)}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return h.hexdigest()[:12]
+
+def model_artifact_path() -> str:
+    """The artifact load_model() will read: the compiled directory unless pickles are forced."""
+    if MODEL_MODE != "pickle" and os.path.isdir(COMPILED_MODEL_DIR):
+        return COMPILED_MODEL_DIR
+    return MODEL_PATH
+
+_load_generation = itertools.count(1)
+
+def build_serving_model() -> ServingModel:
+    """Load the model artifact and everything derived from it (compiled arrays, transform, explainer)."""
+    # Prediction cache keys carry the fingerprint of the model and transform
+    # files (unlike artifact_version, it cannot be pinned by FRAUD_GUARD_MODEL_VERSION),
+    # so workers that loaded the same files share entries. If the files
+    # changed during the load, the fingerprint may not describe what was read,
+    # and the namespace is made unique to this load instead.
+    fingerprint = watched_version()
+    model = load_model()
+    compiled_model = load_compiled_model(model)
+    feature_transform = build_feature_transform(model)
+    if watched_version() != fingerprint:
+        fingerprint = f"{watched_version()}#{os.getpid()}.{next(_load_generation)}"
+    source = COMPILED_MODEL_DIR if isinstance(model, CompiledForest) else MODEL_PATH
+    return ServingModel(model, compiled_model, feature_transform, build_explainer(model, compiled_model),
+                        artifact_version(source), source, cache_namespace=fingerprint)
+
+def watched_version() -> str:
+    """Changes whenever the model artifact or the feature transform saved with it changes."""
+    path = model_artifact_path()
+    if path == COMPILED_MODEL_DIR and bundled_transform_path(path):
+        # Arrays and transform are published together, in one version directory
+        return artifact_fingerprint(path)
+    return f"{artifact_fingerprint(path)}/{artifact_fingerprint(FEATURE_TRANSFORM_PATH)}"
+
+def activate(candidate: ServingModel) -> None:
+    """Swap the serving model; one reference assignment, so requests never see a mix."""
+    global active
+    active = candidate
+    # Keys of the previous model's entries carry its namespace and can no longer
+    # hit; drop them locally (shared entries age out with their TTL)
+    prediction_cache.clear()
+
+# Load model once during server startup; the reloader swaps in new versions later
+active = build_serving_model()
+ip_index = load_ip_index()
+velocity_store = load_velocity_store()
+entity_links = load_entity_links()
+drift_monitor = DriftMonitor(DRIFT_REFERENCE_PATH, DRIFT_DIR or None, DRIFT_FLUSH_INTERVAL, DRIFT_MIN_ROWS)
+reloader = ModelReloader(build_serving_model, watched_version, lambda: active, activate,
+                         interval=RELOAD_INTERVAL)
+
+def start_model_watcher() -> None:
+    """Start polling for new model artifacts in this process (gunicorn calls it after fork)."""
+    if RELOAD_INTERVAL > 0:
+        reloader.start()
 
 @app.route('/health', methods=['GET'])
 def health_check():
     """Endpoint for monitoring service health."""
+    current = active
     return jsonify({
         "status": "healthy",
-        "model_loaded": model is not None,
+        "model_loaded": current.model is not None,
+        "feature_transform_loaded": current.feature_transform.is_fitted,
+        "ip_index_loaded": ip_index is not None,
+        "velocity_keys": len(velocity_store),
+        "entity_link_nodes": len(entity_links),
+        "micro_batching": micro_batcher.stats() if micro_batcher is not None else None,
+        "explainer": current.explainer.stats() if current.explainer is not None else None,
+        "model_version": current.version,
+        "model": current.info(),
+        "model_reload": reloader.stats(),
+        "drift": drift_monitor.stats(),
+        "prediction_cache": prediction_cache.stats(),
         "service": "Fraud-Guard API"
     })
 
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus scrape endpoint (per worker process)."""
+    current = active
+    MODEL_INFO.clear()
+    if current.model is not None:
+        MODEL_INFO.set(1, model_version=current.version, engine=current.engine)
+    if micro_batcher is not None:
+        MICROBATCH_SIZE.set(micro_batcher.stats()["mean_batch_size"])
+    return Response(metrics.render(), content_type=MetricsRegistry.CONTENT_TYPE)
+
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+
+@app.after_request
+def record_request_metrics(response):
+    endpoint = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    if endpoint != "/metrics":
+        status = str(response.status_code)
+        REQUESTS.inc(endpoint=endpoint, status=status)
+        if response.status_code >= 400:
+            ERRORS.inc(endpoint=endpoint, status=status)
+        REQUEST_LATENCY.observe(time.perf_counter() - g.request_start,
+                                endpoint=endpoint, model_version=active.version)
+    return response
+
+
+@app.route('/drift', methods=['GET'])
+def drift_report():
+    """
+    PSI and KS drift scores of the scored features against the training profile.
+    Merges the live profiles of all workers sharing FRAUD_GUARD_DRIFT_DIR.
+    """
+    return jsonify(drift_monitor.report())
+
+
+@app.route('/admin/reload', methods=['POST'])
+def reload_model():
+    """
+    Check for a new model artifact now and activate it if it passes validation.
+    Only this worker process reloads; the watcher covers the others.
+    Requires the FRAUD_GUARD_RELOAD_TOKEN value in the X-Reload-Token header.
+    """
+    if not RELOAD_TOKEN:
+        return jsonify({"error": "Reload endpoint disabled (set FRAUD_GUARD_RELOAD_TOKEN)"}), 404
+    if request.headers.get("X-Reload-Token") != RELOAD_TOKEN:
+        return jsonify({"error": "Invalid reload token"}), 403
+    result = reloader.check(force=request.args.get("force") == "1")
+    return jsonify(result), 409 if result["status"] == "rejected" else 200
+
+# Upper bound on rows accepted by /predict/batch in a single request
+MAX_BATCH_SIZE = int(os.environ.get("FRAUD_GUARD_MAX_BATCH_SIZE", 1000))
+
+# Upper bound on rows in one binary (columnar) /predict/batch request
+MAX_BINARY_ROWS = int(os.environ.get("FRAUD_GUARD_MAX_BINARY_ROWS", 100_000))
+
+# Cache of /predict scores for repeated transactions (size 0 disables it)
+PREDICTION_CACHE_SIZE = int(os.environ.get("FRAUD_GUARD_PREDICTION_CACHE_SIZE", 10000))
+PREDICTION_CACHE_TTL = float(os.environ.get("FRAUD_GUARD_PREDICTION_CACHE_TTL", 30))
+# File shared by the workers (e.g. /dev/shm/fraud_guard_predictions); empty keeps the cache per process
+PREDICTION_CACHE_SHARED = os.environ.get("FRAUD_GUARD_PREDICTION_CACHE_SHARED", "")
+PREDICTION_CACHE_SHARED_SLOTS = int(os.environ.get("FRAUD_GUARD_PREDICTION_CACHE_SHARED_SLOTS", 65536))
+
+
+def build_prediction_cache() -> PredictionCache:
+    shared = None
+    if PREDICTION_CACHE_SHARED and PREDICTION_CACHE_SIZE > 0:
+        try:
+            shared = SharedPredictionStore(PREDICTION_CACHE_SHARED, PREDICTION_CACHE_SHARED_SLOTS)
+        except OSError as e:
+            logging.error(f"Shared prediction cache unavailable at {PREDICTION_CACHE_SHARED}: {e}")
+    return PredictionCache(PREDICTION_CACHE_SIZE, PREDICTION_CACHE_TTL, shared)
+
+
+prediction_cache = build_prediction_cache()
+
+# Optional micro-batching of concurrent /predict calls (off by default)
+MICROBATCH_ENABLED = os.environ.get("FRAUD_GUARD_MICROBATCH", "0") == "1"
+MICROBATCH_MAX_WAIT_MS = float(os.environ.get("FRAUD_GUARD_MICROBATCH_MAX_WAIT_MS", 2.0))
+MICROBATCH_MAX_SIZE = int(os.environ.get("FRAUD_GUARD_MICROBATCH_MAX_SIZE", 64))
+
+
+def resolve_country(record: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Add the country for the record's ip_address (O(log n) index lookup).
+    Records that already carry a country, or have no ip_address, are returned unchanged.
+    """
+    if ip_index is None or "ip_address" not in record or "country" in record:
+        return record
+    return {**record, "country": ip_index.lookup_one(record["ip_address"])}
+
+
+def check_entities(record: Dict[str, Any]) -> None:
+    """Reject entity values that cannot key the live state (lists, objects) with a ValueError."""
+    for column in ENTITIES:
+        value = record.get(column)
+        if value is not None and not isinstance(value, (str, int, float)):
+            raise ValueError(f"{column} must be a string or a number, got {type(value).__name__}")
+
+
+def apply_velocity(record: Dict[str, Any], record_event: bool = False) -> Dict[str, Any]:
+    """
+    Add the velocity features of this transaction, exactly as the training
+    replay computed them, from the live counters (O(1)). Records without
+    user_id, device_id or ip_address are returned unchanged.
+    With record_event=True the transaction is also counted.
+    """
+    if not any(column in record for column in ENTITIES):
+        return record
+    check_entities(record)
+    ts = to_epoch_seconds(record.get("purchase_time", time.time()))
+    features = (velocity_store.update(record, ts) if record_event
+                else velocity_store.peek(record, ts))
+    if "user_id" in record:
+        features["user_transaction_count"] = features["user_txn_7d"] + 1
+    return {**record, **features}
+
+
+def apply_entity_links(record: Dict[str, Any], record_event: bool = False) -> Dict[str, Any]:
+    """
+    Add users-per-device/IP, devices-per-user and cluster size from the live
+    index (amortised O(1)). With record_event=True the user is also linked
+    to its device and IP.
+    """
+    if not any(column in record for column in ENTITIES):
+        return record
+    check_entities(record)
+    features = entity_links.update(record) if record_event else entity_links.peek(record)
+    return {**record, **features}
+
+
+def enrich_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Add every server-side feature: country, velocity and entity links.
+
+    The live state is only read; call record_transaction once the row has
+    been accepted, so rejected rows are never counted.
+    """
+    return apply_entity_links(apply_velocity(resolve_country(record)))
+
+
+def record_transaction(record: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Count an accepted (enriched) record in the velocity store and entity
+    links, and return it with the features recorded for it. They differ
+    from the enrich_record ones only if a concurrent request for the same
+    entities was recorded in between.
+    """
+    return apply_entity_links(apply_velocity(record, record_event=True), record_event=True)
+
+
+def transform_accepted(feature_transform: FeatureTransform, record: Dict[str, Any]) -> Tuple[Dict[str, Any], np.ndarray]:
+    """
+    Enrich and transform a request record, then record it as a transaction.
+
+    Raises:
+        ValueError: When the record is rejected; nothing is recorded then.
+
+    Returns:
+        Tuple of (enriched record, model-ready row).
+    """
+    enriched = enrich_record(record)
+    row = feature_transform.transform_record(enriched)
+    recorded = record_transaction(enriched)
+    if recorded != enriched:
+        row = feature_transform.transform_record(recorded)
+    return recorded, row
+
+
+def format_result(prediction: Any, probability: float) -> Dict[str, Any]:
+    """Build the JSON-serialisable result for a single scored row."""
+    return {
+        "prediction": int(prediction),
+        "fraud_probability": round(float(probability), 4),
+        "class_label": "Fraud" if prediction == 1 else "Legitimate",
+        "status": "success"
+    }
+
+
+def score_matrix(X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Score a model-ready feature matrix with the active model (see ServingModel.score_matrix)."""
+    return active.score_matrix(X)
+
+
+micro_batcher = (MicroBatcher(score_matrix, MICROBATCH_MAX_WAIT_MS, MICROBATCH_MAX_SIZE)
+                 if MICROBATCH_ENABLED else None)
+
+
+def score_row(row: np.ndarray) -> Tuple[Any, float]:
+    """Score one row, through the micro-batcher when it is enabled."""
+    if micro_batcher is not None:
+        return micro_batcher.submit(row)
+    predictions, probabilities = score_matrix(row[np.newaxis, :])
+    return predictions[0], probabilities[0]
+
+
+def parse_batch_payload() -> List[Any]:
+    """
+    Read the /predict/batch body as a JSON array or as NDJSON.
+
+    NDJSON lines that fail to decode are kept as exceptions so they can be
+    reported per row instead of rejecting the whole batch.
+
+    Raises:
+        ValueError: If the body is empty or is not a JSON array / NDJSON stream.
+    """
+    body = request.get_data(as_text=True).strip()
+    if not body:
+        raise ValueError("Empty request body")
+
+    is_ndjson = "ndjson" in (request.content_type or "") or not body.startswith("[")
+    if not is_ndjson:
+        records = json.loads(body)
+        if not isinstance(records, list):
+            raise ValueError("Expected a JSON array of transactions")
+        return records
+
+    records: List[Any] = []
+    for line_no, line in enumerate(body.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            records.append(json.loads(line))
+        except json.JSONDecodeError as e:
+            records.append(ValueError(f"Invalid JSON on line {line_no}: {e.msg}"))
+    return records
+
+
 @app.route('/predict', methods=['POST'])
 def predict():
     """
     Endpoint for real-time fraud prediction.
     Performs dynamic schema alignment to ensure feature parity.
     """
-    if model is None:
+    current = active
+    if current.model is None:
         return jsonify({"error": "Model not loaded"}), 500
 
+    labels = {"endpoint": "/predict", "model_version": current.version}
+    sampled = log_payload()
     try:
-        data = request.get_json()
+        with timed(STAGE_LATENCY, stage="decode", **labels):
+            data = request.get_json()
         if not data:
             return jsonify({"error": "No JSON payload provided"}), 400
 
-        logging.info(f"Incoming request: {data}")
+        if sampled:
+            logging.info(f"Incoming request: {data}")
 
-        # 1. Convert incoming JSON to DataFrame
-        input_df = pd.DataFrame([data])
+        # An exact resubmission (gateway retry) is answered before enrichment,
+        # so it is not recorded as another transaction in the velocity state.
+        # Payloads without purchase_time or request_id get no key (see payload_key)
+        request_key = payload_key(data, current.cache_namespace) if prediction_cache.enabled else None
+        # A miss here is not counted: the feature-vector lookup below settles this request
+        cached = prediction_cache.get(request_key, final=False)
+        if cached is None:
+            # 1-3. Resolve country, encode, scale and align EXACTLY with training features
+            with timed(STAGE_LATENCY, stage="transform", **labels):
+                data, row = transform_accepted(current.feature_transform, data)
+                drift_monitor.observe(row)
 
-        # 2. Rename incoming fields to match the training schema
-        rename_map = {
-            "browser": "browser_encoded",
-            "sex": "sex_encoded",
-            "source": "source_encoded",
-            "time_diff": "time_since_signup"
-        }
-        input_df.rename(columns=rename_map, inplace=True)
+            logging.debug(f"Aligned features for model: {current.feature_transform.feature_names}")
 
-        # 3. Align EXACTLY with training features (Schema Alignment)
-        if hasattr(model, "feature_names_in_"):
-            expected_features = list(model.feature_names_in_)
+            row_key = feature_key(row, current.cache_namespace) if prediction_cache.enabled else None
+            cached = prediction_cache.get(row_key)
+            if cached is None:
+                # 4. Perform Prediction (single forest pass, possibly shared with concurrent requests)
+                with timed(STAGE_LATENCY, stage="predict", **labels):
+                    cached = score_row(row)
+                ROWS_SCORED.inc(**labels)
+                prediction_cache.put(row_key, cached)
+            prediction_cache.put(request_key, cached)
+        else:
+            data = resolve_country(data)
+        prediction, probability = cached
 
-            # Add missing columns with default value 0
-            for col in expected_features:
-                if col not in input_df.columns:
-                    input_df[col] = 0
+        with timed(STAGE_LATENCY, stage="serialize", **labels):
+            result = format_result(prediction, probability)
+            if "country" in data:
+                result["country"] = data["country"]
+            response = jsonify(result)
 
-            # Reorder and filter columns to match training exactly
-            input_df = input_df[expected_features]
-        
-        logging.info(f"Aligned features for model: {list(input_df.columns)}")
+        if sampled:
+            logging.info(f"Prediction result: {result['class_label']} (Prob: {result['fraud_probability']})")
+        return response
 
-        # 4. Perform Prediction
-        prediction = model.predict(input_df)[0]
-        # Probability of class 1 (Fraud)
-        probability = model.predict_proba(input_df)[0][1]
+    except FutureTimeoutError:
+        # Scoring queue backed up: a server-side overload, not a bad request
+        logging.error(f"Prediction timed out waiting for the micro-batcher "
+                      f"(queue depth {micro_batcher.stats()['queue_depth']})")
+        return jsonify({"error": "Server overloaded", "message": "Scoring timed out; retry later"}), 503, \
+            {"Retry-After": "1"}
+    except Exception as e:
+        logging.error(f"Prediction error: {str(e)}")
+        return jsonify({"error": "Prediction failed", "message": str(e)}), 400
 
-        result = {
-            "prediction": int(prediction),
-            "fraud_probability": round(float(probability), 4),
-            "class_label": "Fraud" if prediction == 1 else "Legitimate",
-            "status": "success"
-        }
 
-        logging.info(f"Prediction result: {result['class_label']} (Prob: {result['fraud_probability']})")
-        return jsonify(result)
+@app.route('/predict/batch', methods=['POST'])
+def predict_batch():
+    """
+    Endpoint for scoring bursts of transactions in one call.
+    Accepts a JSON array or an NDJSON body (or a binary columnar body, see
+    predict_binary). Rows are transformed into one
+    feature matrix and predict_proba runs once per batch; invalid rows are reported
+    individually without failing the rest of the batch.
+    """
+    current = active
+    if current.model is None:
+        return jsonify({"error": "Model not loaded"}), 500
+
+    labels = {"endpoint": "/predict/batch", "model_version": current.version}
+    if request.mimetype in BINARY_TYPES:
+        return predict_binary(current, labels)
+    try:
+        with timed(STAGE_LATENCY, stage="decode", **labels):
+            records = parse_batch_payload()
+    except ValueError as e:
+        return jsonify({"error": "Invalid batch payload", "message": str(e)}), 400
+
+    if not records:
+        return jsonify({"error": "No transactions provided"}), 400
+    if len(records) > MAX_BATCH_SIZE:
+        return jsonify({
+            "error": "Batch too large",
+            "message": f"{len(records)} rows exceeds the limit of {MAX_BATCH_SIZE}"
+        }), 413
+
+    results: List[Dict[str, Any]] = [{} for _ in records]
+    valid_positions: List[int] = []
+    valid_records: List[Dict[str, Any]] = []
+
+    for i, record in enumerate(records):
+        if isinstance(record, Exception):
+            results[i] = {"index": i, "status": "error", "error": str(record)}
+        elif not isinstance(record, dict) or not record:
+            results[i] = {"index": i, "status": "error", "error": "Row must be a non-empty JSON object"}
+        else:
+            valid_positions.append(i)
+            valid_records.append(record)
+
+    # Transform row by row so one bad row does not fail the batch
+    good_positions: List[int] = []
+    rows: List[np.ndarray] = []
+    with timed(STAGE_LATENCY, stage="transform", **labels):
+        for pos, record in zip(valid_positions, valid_records):
+            try:
+                rows.append(transform_accepted(current.feature_transform, record)[1])
+                good_positions.append(pos)
+            except ValueError as e:
+                results[pos] = {"index": pos, "status": "error", "error": str(e)}
+
+    if rows:
+        try:
+            X = np.vstack(rows)
+            drift_monitor.observe(X)
+            with timed(STAGE_LATENCY, stage="predict", **labels):
+                predictions, probabilities = current.score_matrix(X)
+            ROWS_SCORED.inc(len(rows), **labels)
+        except Exception as e:
+            logging.error(f"Batch prediction error: {str(e)}")
+            return jsonify({"error": "Prediction failed", "message": str(e)}), 400
+
+        for pos, pred, prob in zip(good_positions, predictions, probabilities):
+            results[pos] = {"index": pos, **format_result(pred, prob)}
+
+    n_failed = sum(1 for r in results if r["status"] == "error")
+    n_succeeded = len(results) - n_failed
+    logging.debug(f"Batch scored: {n_succeeded} succeeded, {n_failed} failed")
+
+    with timed(STAGE_LATENCY, stage="serialize", **labels):
+        return jsonify({
+            "status": "success" if n_failed == 0 else ("partial" if n_succeeded else "failed"),
+            "n_received": len(results),
+            "n_succeeded": n_succeeded,
+            "n_failed": n_failed,
+            "results": results
+        })
+
+def predict_binary(current: ServingModel, labels: Dict[str, str]):
+    """
+    /predict/batch for columnar binary bodies (see src/binary_format.py).
+
+    Columns map straight into the feature matrix with vectorized NumPy (no
+    per-row objects); a model-space float32 matrix in feature order is scored
+    in place. Rows are not enriched (no IP lookup, velocity or entity links),
+    so send those features as columns. Scores come back in the request's
+    format, with NaN / -1 for rows that had invalid values.
+    """
+    content_type = request.mimetype
+    try:
+        with timed(STAGE_LATENCY, stage="decode", **labels):
+            payload = ColumnarPayload.decode(request.get_data(cache=False), content_type)
+    except ImportError as e:
+        return jsonify({"error": "Unsupported payload", "message": str(e)}), 415
+    except ValueError as e:
+        return jsonify({"error": "Invalid binary payload", "message": str(e)}), 400
+    if payload.n_rows > MAX_BINARY_ROWS:
+        return jsonify({
+            "error": "Batch too large",
+            "message": f"{payload.n_rows} rows exceeds the limit of {MAX_BINARY_ROWS}"
+        }), 413
 
+    try:
+        with timed(STAGE_LATENCY, stage="transform", **labels):
+            X, valid = payload.feature_matrix(current.feature_transform)
+            if not valid.all():
+                X = X[valid]
+        probabilities = np.full(payload.n_rows, np.nan, dtype=np.float32)
+        predictions = np.full(payload.n_rows, -1, dtype=np.int64)
+        if len(X):
+            drift_monitor.observe(X)
+            with timed(STAGE_LATENCY, stage="predict", **labels):
+                predictions[valid], probabilities[valid] = current.score_matrix(X)
+            ROWS_SCORED.inc(len(X), **labels)
     except Exception as e:
-        logging.error(f"Prediction error: {str(e)}")
+        logging.error(f"Binary batch prediction error: {str(e)}")
         return jsonify({"error": "Prediction failed", "message": str(e)}), 400
 
+    with timed(STAGE_LATENCY, stage="serialize", **labels):
+        return Response(encode_response(content_type, probabilities, predictions), content_type=content_type)
+
+
+@app.route('/explain', methods=['POST'])
+def explain():
+    """
+    Reason codes for one transaction (JSON object) or several (JSON array).
+
+    Query parameters: top_k (features per row) and budget_ms (latency budget;
+    rows that would exceed it get path attributions instead of TreeSHAP).
+    Explaining a transaction does not update the velocity counters.
+    """
+    current = active
+    if current.explainer is None:
+        return jsonify({"error": "Explainer not available"}), 500
+
+    labels = {"endpoint": "/explain", "model_version": current.version}
+    try:
+        top_k = int(request.args.get("top_k", EXPLAIN_TOP_K))
+        budget_ms = request.args.get("budget_ms", EXPLAIN_BUDGET_MS)
+        budget_ms = float(budget_ms) if budget_ms is not None else None
+        with timed(STAGE_LATENCY, stage="decode", **labels):
+            data = request.get_json()
+        if not data:
+            return jsonify({"error": "No JSON payload provided"}), 400
+
+        single = isinstance(data, dict)
+        records = [data] if single else data
+        if not isinstance(records, list) or not all(isinstance(r, dict) for r in records):
+            return jsonify({"error": "Expected a JSON object or an array of objects"}), 400
+        if len(records) > MAX_BATCH_SIZE:
+            return jsonify({"error": f"Batch too large: {len(records)} records "
+                                     f"(max {MAX_BATCH_SIZE})"}), 413
+
+        with timed(STAGE_LATENCY, stage="transform", **labels):
+            X = np.vstack([current.feature_transform.transform_record(enrich_record(record))
+                           for record in records])
+        with timed(STAGE_LATENCY, stage="explain", **labels):
+            explanations = current.explainer.explain(X, top_k=top_k, budget_ms=budget_ms)
+        with timed(STAGE_LATENCY, stage="serialize", **labels):
+            return jsonify(explanations[0] if single else {"results": explanations})
+
+    except Exception as e:
+        logging.error(f"Explanation error: {str(e)}")
+        return jsonify({"error": str(e), "status": "failed"}), 400
+
+
 if __name__ == "__main__":
+    start_model_watcher()
     # Running on 0.0.0.0 allows access from outside the container (for Task 4 Dockerization)
     app.run(host="0.0.0.0", port=5000, debug=True)
\ No newline at end of file
@@ -0,0 +1,58 @@
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import random
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+_handler = None
+_listener = None
+
+
+def _start_listener(target: logging.Handler) -> None:
+    global _listener
+    _handler.queue = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(_handler.queue, target, respect_handler_level=True)
+    _listener.start()
+
+
+def configure_queue_logging(level: int = logging.INFO, fmt: str = LOG_FORMAT) -> None:
+    """
+    Route root logging through a QueueHandler so request threads only enqueue
+    records; a background listener does the formatting and I/O.
+
+    Safe to call more than once. Forked children (e.g. gunicorn workers after
+    preload) start their own listener, since threads do not survive fork.
+    """
+    global _handler
+    if _handler is not None:
+        return
+
+    target = logging.StreamHandler()
+    target.setFormatter(logging.Formatter(fmt))
+
+    _handler = logging.handlers.QueueHandler(queue.SimpleQueue())
+    root = logging.getLogger()
+    # Replace plain console handlers (e.g. from basicConfig); leave others attached
+    for existing in list(root.handlers):
+        if type(existing) is logging.StreamHandler:
+            root.removeHandler(existing)
+    root.addHandler(_handler)
+    root.setLevel(level)
+
+    _start_listener(target)
+    atexit.register(lambda: _listener.stop())
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(after_in_child=lambda: _start_listener(target))
+
+
+class Sampler:
+    """Decides whether an individual request's payload is logged."""
+
+    def __init__(self, rate: float):
+        self.rate = max(0.0, min(rate, 1.0))
+
+    def __call__(self) -> bool:
+        return self.rate >= 1.0 or (self.rate > 0.0 and random.random() < self.rate)
@@ -0,0 +1,123 @@
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Tuple
+
+import numpy as np
+
+ScoreFn = Callable[[np.ndarray], Tuple[np.ndarray, np.ndarray]]
+
+
+class MicroBatcher:
+    """
+    Collects single-row scoring requests from concurrent handlers into small
+    batches scored by one background thread.
+
+    The scorer thread waits for a first row, then keeps collecting until
+    max_batch_size rows are queued or max_wait_ms has passed, and scores the
+    batch with one vectorized call. Each caller blocks only on its own result.
+    The thread starts lazily on first use so pre-forked workers each get one.
+    """
+
+    def __init__(self, score_fn: ScoreFn, max_wait_ms: float = 2.0, max_batch_size: int = 64):
+        self.score_fn = score_fn
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self._queue: "queue.Queue[Tuple[np.ndarray, Future]]" = queue.Queue()
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.batches = 0
+        self.rows = 0
+        self.max_seen = 0
+        self.size_histogram: Dict[int, int] = {}
+
+    def submit(self, row: np.ndarray, timeout: float = 5.0) -> Tuple[Any, float]:
+        """
+        Score one feature row through the shared batch.
+
+        Returns:
+            Tuple of (predicted label, fraud probability) for the row.
+
+        Raises:
+            concurrent.futures.TimeoutError: If the row was not scored within
+                timeout seconds; it is then dropped from the queue.
+        """
+        self._ensure_started()
+        future: Future = Future()
+        self._queue.put((row, future))
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            # Nobody waits for it any more; the scorer thread skips cancelled rows
+            future.cancel()
+            raise
+
+    def _ensure_started(self) -> None:
+        # A thread started before fork does not exist in the child; restart per process
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+                self._thread.start()
+                logging.info(f"Micro-batcher started (max_wait={self.max_wait * 1000:.1f}ms, "
+                             f"max_batch_size={self.max_batch_size})")
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = [(row, future) for row, future in self._collect() if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            futures = [future for _, future in batch]
+            try:
+                predictions, probabilities = self.score_fn(np.vstack([row for row, _ in batch]))
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                continue
+
+            for future, pred, prob in zip(futures, predictions, probabilities):
+                future.set_result((pred, prob))
+            self._record(len(batch))
+
+    def _record(self, size: int) -> None:
+        # Power-of-two buckets keep the histogram small
+        bucket = 1 << (size - 1).bit_length()
+        with self._stats_lock:
+            self.batches += 1
+            self.rows += size
+            self.max_seen = max(self.max_seen, size)
+            self.size_histogram[bucket] = self.size_histogram.get(bucket, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Achieved batch sizes since startup."""
+        with self._stats_lock:
+            return {
+                "max_wait_ms": self.max_wait * 1000,
+                "max_batch_size": self.max_batch_size,
+                "batches": self.batches,
+                "rows": self.rows,
+                "mean_batch_size": round(self.rows / self.batches, 2) if self.batches else 0.0,
+                "max_batch_size_seen": self.max_seen,
+                "batch_size_histogram": {f"<={k}": v for k, v in sorted(self.size_histogram.items())},
+                "queue_depth": self._queue.qsize(),
+            }
@@ -0,0 +1,166 @@
+import struct
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Fixed-layout float32 matrix: header, UTF-8 column names, padding to a
+# 4-byte boundary, then n_rows x n_cols little-endian float32 values, row-major
+MATRIX_TYPE = 'application/x-fraud-guard-matrix'
+# Arrow IPC stream of numeric columns (requires pyarrow)
+ARROW_STREAM_TYPE = 'application/vnd.apache.arrow.stream'
+BINARY_TYPES = (MATRIX_TYPE, ARROW_STREAM_TYPE)
+
+MAGIC = b'FGM1'
+# magic, flags, n_rows, n_cols, length of the column-name block
+_HEADER = struct.Struct('<4sIIII')
+# Values are already encoded and scaled (model space), e.g. from the feature store
+FLAG_MODEL_SPACE = 1
+# Arrow schema metadata equivalent of FLAG_MODEL_SPACE
+ARROW_SPACE_KEY = b'fraud_guard.space'
+
+RESPONSE_COLUMNS = ['fraud_probability', 'prediction']
+
+
+def encode_matrix(X: np.ndarray, columns: Sequence[str], model_space: bool = False) -> bytes:
+    """
+    Serialize a numeric matrix in the fixed layout (used by clients and for responses).
+
+    Args:
+        X: Array of shape (n_rows, len(columns)).
+        columns: Column names, e.g. request fields or the model's feature names.
+        model_space: Mark the values as already encoded and scaled.
+    """
+    X = np.ascontiguousarray(X, dtype='<f4')
+    if X.ndim != 2 or X.shape[1] != len(columns):
+        raise ValueError(f"Expected a matrix with {len(columns)} columns, got shape {X.shape}")
+    names = '\n'.join(columns).encode('utf-8')
+    padding = -(_HEADER.size + len(names)) % 4
+    header = _HEADER.pack(MAGIC, FLAG_MODEL_SPACE if model_space else 0, X.shape[0], X.shape[1], len(names))
+    return header + names + b'\0' * padding + X.tobytes()
+
+
+def decode_matrix(body: bytes) -> Tuple[np.ndarray, list, bool]:
+    """
+    Parse a fixed-layout payload without copying the values.
+
+    Returns:
+        Tuple of (read-only float32 view of shape (n_rows, n_cols) into body,
+        column names, model_space flag).
+
+    Raises:
+        ValueError: If the header or the payload size is inconsistent.
+    """
+    if len(body) < _HEADER.size:
+        raise ValueError("Payload shorter than the matrix header")
+    magic, flags, n_rows, n_cols, names_len = _HEADER.unpack_from(body)
+    if magic != MAGIC:
+        raise ValueError(f"Bad magic {magic!r}, expected {MAGIC!r}")
+    names_end = _HEADER.size + names_len
+    offset = names_end + (-names_end % 4)
+    if len(body) != offset + 4 * n_rows * n_cols:
+        raise ValueError(f"Payload is {len(body)} bytes; header describes {n_rows}x{n_cols} float32 values")
+    columns = body[_HEADER.size:names_end].decode('utf-8').split('\n') if n_cols else []
+    if len(columns) != n_cols or len(set(columns)) != n_cols:
+        raise ValueError(f"Header names {len(columns)} columns for {n_cols} (names must be unique)")
+    X = np.frombuffer(body, dtype='<f4', count=n_rows * n_cols, offset=offset).reshape(n_rows, n_cols)
+    return X, columns, bool(flags & FLAG_MODEL_SPACE)
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.ipc  # noqa: F401
+    except ImportError as e:
+        raise ImportError("Arrow payloads require pyarrow (pip install pyarrow)") from e
+    return pa
+
+
+def decode_arrow(body: bytes) -> Tuple[Dict[str, np.ndarray], int, bool]:
+    """
+    Read an Arrow IPC stream of numeric columns.
+
+    Returns:
+        Tuple of (column name -> values, row count, model_space flag).
+    """
+    pa = _pyarrow()
+    try:
+        table = pa.ipc.open_stream(body).read_all()
+    except pa.ArrowInvalid as e:
+        raise ValueError(f"Invalid Arrow stream: {e}") from e
+    model_space = (table.schema.metadata or {}).get(ARROW_SPACE_KEY) == b'model'
+    columns = {}
+    for name in table.column_names:
+        column = table.column(name)
+        if not (pa.types.is_integer(column.type) or pa.types.is_floating(column.type)):
+            raise ValueError(f"Column {name} must be numeric (send categorical codes), got {column.type}")
+        # Nulls become NaN, which marks the row invalid
+        columns[name] = column.to_numpy(zero_copy_only=False).astype(np.float64, copy=False)
+    return columns, table.num_rows, model_space
+
+
+class ColumnarPayload:
+    """
+    A decoded binary request: numeric columns by name, plus the row-major
+    matrix when the payload was in the fixed layout.
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray], n_rows: int, model_space: bool,
+                 matrix: Optional[np.ndarray] = None, order: Optional[Sequence[str]] = None):
+        self.columns = columns
+        self.n_rows = n_rows
+        self.model_space = model_space
+        self.matrix = matrix
+        self.order = list(order) if order is not None else list(columns)
+
+    @classmethod
+    def decode(cls, body: bytes, content_type: str) -> "ColumnarPayload":
+        """
+        Raises:
+            ValueError: On a malformed payload or an unsupported content type.
+            ImportError: For Arrow payloads when pyarrow is not installed.
+        """
+        if content_type == MATRIX_TYPE:
+            X, names, model_space = decode_matrix(body)
+            return cls({name: X[:, j] for j, name in enumerate(names)}, X.shape[0], model_space, X, names)
+        if content_type == ARROW_STREAM_TYPE:
+            columns, n_rows, model_space = decode_arrow(body)
+            return cls(columns, n_rows, model_space)
+        raise ValueError(f"Unsupported content type {content_type!r}")
+
+    def feature_matrix(self, transform) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Model-ready float32 matrix and valid-row mask.
+
+        A model-space fixed-layout payload whose columns are the model's
+        features in order is returned as is (no copy). Other model-space
+        payloads are only reordered; request-space payloads go through
+        FeatureTransform.transform_columns.
+
+        Raises:
+            ValueError: If a model-space payload does not carry exactly the model's features.
+        """
+        names = transform.feature_names
+        if not self.model_space:
+            return transform.transform_columns(self.columns, self.n_rows)
+        if set(self.order) != set(names):
+            missing = [f for f in names if f not in self.columns]
+            extra = [f for f in self.order if f not in names]
+            raise ValueError(f"Model-space payload must carry the model features: missing {missing}, unexpected {extra}")
+        if self.matrix is not None and self.order == list(names):
+            X = self.matrix
+        else:
+            X = np.column_stack([self.columns[name] for name in names]).astype(np.float32, copy=False)
+        return X, np.isfinite(X).all(axis=1)
+
+
+def encode_response(content_type: str, probabilities: np.ndarray, predictions: np.ndarray) -> bytes:
+    """Scores in the request's binary format: fraud_probability (NaN for invalid rows) and prediction (-1)."""
+    if content_type == ARROW_STREAM_TYPE:
+        pa = _pyarrow()
+        batch = pa.RecordBatch.from_arrays(
+            [pa.array(probabilities.astype(np.float32)), pa.array(predictions.astype(np.int8))], names=RESPONSE_COLUMNS)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, batch.schema) as writer:
+            writer.write_batch(batch)
+        return sink.getvalue().to_pybytes()
+    return encode_matrix(np.column_stack([probabilities, predictions]), RESPONSE_COLUMNS)
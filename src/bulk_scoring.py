@@ -0,0 +1,326 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, Optional, Sequence
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from src.feature_transform import FeatureTransform, load_feature_transform
+from src.forest_inference import CompiledForest, bundled_transform_path, load_forest_arrays
+from src.ip_index import IpCountryIndex, ip_series_to_int
+from src.schema import FRAUD_DTYPES, FRAUD_DATETIME_COLS
+from src.entity_links import LINK_FEATURES, EntityLinkIndex, replay_links
+from src.velocity import VELOCITY_FEATURES, VelocityStore, replay_velocity
+
+# Bump when the progress file layout changes
+PROGRESS_VERSION = 1
+
+# Per-process scoring state, set once by _init_worker
+_WORKER: Dict[str, Any] = {}
+
+
+def _is_parquet(path: str) -> bool:
+    return path.endswith(('.parquet', '.pq'))
+
+
+def read_chunks(path: str, chunksize: int, skip_rows: int = 0,
+                columns: Optional[Sequence[str]] = None) -> Iterator[pd.DataFrame]:
+    """
+    Stream a CSV or Parquet transaction file in chunks of chunksize rows.
+
+    String columns of CSV files are read as the categoricals declared in
+    src.schema; numeric columns keep their inferred type, since the input
+    may already hold scaled features or missing values. skip_rows rows at the start are skipped, for resuming.
+    """
+    if _is_parquet(path):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Reading Parquet requires pyarrow (pip install pyarrow)") from e
+        parquet = pq.ParquetFile(path)
+        seen = 0
+        for batch in parquet.iter_batches(batch_size=chunksize, columns=columns):
+            if seen + batch.num_rows <= skip_rows:
+                seen += batch.num_rows
+                continue
+            chunk = batch.to_pandas()
+            if seen < skip_rows:
+                chunk = chunk.iloc[skip_rows - seen:]
+            seen += batch.num_rows
+            yield chunk.reset_index(drop=True)
+        return
+
+    header = pd.read_csv(path, nrows=0).columns
+    usecols = list(columns) if columns is not None else None
+    present = set(usecols or header)
+    # A callable, not a range: pandas turns a list-like skiprows into a set of every row number
+    skiprows = (lambda i: 0 < i <= skip_rows) if skip_rows else None
+    reader = pd.read_csv(path, chunksize=chunksize, skiprows=skiprows, usecols=usecols,
+                         dtype={c: t for c, t in FRAUD_DTYPES.items() if c in present and t == 'category'},
+                         parse_dates=[c for c in FRAUD_DATETIME_COLS if c in present])
+    for chunk in reader:
+        yield chunk.reset_index(drop=True)
+
+
+def _init_worker(model_path: str, transform_path: Optional[str], ip_index_path: Optional[str]) -> None:
+    """Load the model, feature transform and IP index once per worker process."""
+    # Compiled arrays are memory-mapped, so all workers share one copy of the trees
+    model = load_forest_arrays(model_path) if os.path.isdir(model_path) else joblib.load(model_path)
+    transform = load_feature_transform(transform_path) if transform_path and os.path.exists(transform_path) else None
+    _WORKER['model'] = model
+    _WORKER['transform'] = (transform or FeatureTransform.identity()).compile(list(model.feature_names_in_))
+    _WORKER['ip_index'] = (IpCountryIndex.load(ip_index_path)
+                           if ip_index_path and os.path.exists(ip_index_path) else None)
+
+
+def prepare_features(chunk: pd.DataFrame, ip_index: Optional[IpCountryIndex]) -> pd.DataFrame:
+    """Order-independent feature steps from src/ (country lookup, time since signup)."""
+    if ip_index is not None and 'country' not in chunk.columns and 'ip_address' in chunk.columns:
+        chunk['country'] = ip_index.lookup(ip_series_to_int(chunk['ip_address']))
+    if 'time_since_signup' not in chunk.columns and {'signup_time', 'purchase_time'} <= set(chunk.columns):
+        chunk['time_since_signup'] = (pd.to_datetime(chunk['purchase_time'])
+                                      - pd.to_datetime(chunk['signup_time'])).dt.total_seconds()
+    if 'user_transaction_count' not in chunk.columns and 'user_txn_7d' in chunk.columns:
+        chunk['user_transaction_count'] = chunk['user_txn_7d'] + 1
+    return chunk
+
+
+def score_chunk(chunk: pd.DataFrame, keep_columns: Sequence[str], first_row: int) -> pd.DataFrame:
+    """
+    Score one chunk in a worker: feature steps, transform, one predict_proba pass.
+
+    Rows whose features cannot be built get an empty probability and an
+    error message instead of failing the chunk.
+    """
+    model = _WORKER['model']
+    chunk = prepare_features(chunk, _WORKER['ip_index'])
+    X, valid = _WORKER['transform'].transform_frame(chunk)
+
+    probability = np.full(len(chunk), np.nan)
+    prediction = np.full(len(chunk), -1, dtype=np.int64)
+    if valid.any():
+        fraud_col = list(model.classes_).index(1)
+        if isinstance(model, CompiledForest):
+            proba = model.predict_proba(X[valid])
+        else:
+            proba = model.predict_proba(pd.DataFrame(X[valid], columns=model.feature_names_in_))
+        probability[valid] = proba[:, fraud_col]
+        prediction[valid] = np.asarray(model.classes_)[np.argmax(proba, axis=1)]
+
+    out = pd.DataFrame({'row': np.arange(first_row, first_row + len(chunk))})
+    for col in keep_columns:
+        if col in chunk.columns:
+            out[col] = chunk[col].to_numpy()
+    out['fraud_probability'] = probability
+    out['prediction'] = prediction
+    out['error'] = np.where(valid, '', 'invalid or missing feature values')
+    return out
+
+
+class _Progress:
+    """Resume point: chunks completed, rows written and the output size at that moment."""
+
+    def __init__(self, path: str, settings: Dict[str, Any]):
+        self.path = path
+        self.settings = settings
+        self.chunks = 0
+        self.rows = 0
+        self.output_bytes = 0
+
+    def load(self) -> bool:
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path) as f:
+            state = json.load(f)
+        saved = state.get('settings') or {}
+        if state.get('version') != PROGRESS_VERSION or saved != self.settings:
+            changed = sorted(k for k in set(saved) | set(self.settings) if saved.get(k) != self.settings.get(k))
+            raise ValueError(f"{self.path} was written with different settings ({', '.join(changed)}); "
+                             "rerun with --restart (resume=False) to start over")
+        self.chunks, self.rows, self.output_bytes = state['chunks'], state['rows'], state['output_bytes']
+        return True
+
+    def save(self) -> None:
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'version': PROGRESS_VERSION, 'settings': self.settings, 'chunks': self.chunks,
+                       'rows': self.rows, 'output_bytes': self.output_bytes}, f)
+        os.replace(tmp, self.path)
+
+
+def _file_digest(path: Optional[str]) -> Optional[str]:
+    """Content hash of an artifact file, or None when there is none."""
+    if not path or not os.path.exists(path):
+        return None
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _model_identity(model_path: str) -> Optional[str]:
+    """
+    Which model scored the rows: the versioned directory a compiled forest
+    path resolves to (save_forest_arrays repoints it on every save), or
+    the content hash of a pickle.
+    """
+    return os.path.realpath(model_path) if os.path.isdir(model_path) else _file_digest(model_path)
+
+
+def _model_features(model_path: str) -> set:
+    model = load_forest_arrays(model_path) if os.path.isdir(model_path) else joblib.load(model_path)
+    return set(model.feature_names_in_)
+
+
+def score_file(input_path: str, output_path: str, model_path: str = 'models/random_forest_compiled',
+               transform_path: Optional[str] = 'models/feature_transform.pkl',
+               ip_index_path: Optional[str] = 'models/ip_country_index.npz',
+               chunksize: int = 200_000, n_jobs: Optional[int] = None,
+               keep_columns: Sequence[str] = ('user_id',), velocity: bool = True,
+               resume: bool = True) -> Dict[str, Any]:
+    """
+    Score a large transaction file chunk by chunk across a process pool.
+
+    Chunks are read in order by this process, which also replays them
+    through a VelocityStore and an EntityLinkIndex (these features depend
+    on every earlier transaction, so the file should be in purchase_time
+    order). Workers
+    load the model once, build the remaining features with the same code
+    as training and serving, and score each chunk in one pass. Results are
+    appended to the output in input order as chunks finish; after each one
+    a progress file records the position, so a rerun continues from the
+    last completed chunk (replaying skipped rows through the velocity store
+    and link index to restore their state, in the same read pass).
+
+    Args:
+        input_path: CSV or Parquet transactions file.
+        output_path: CSV file, or a directory of Parquet parts when it ends in .parquet.
+        model_path: Compiled forest directory (memory-mapped) or a pickled model.
+        transform_path, ip_index_path: Artifacts saved by main.py. A compiled
+            forest saved with its transform uses that one instead.
+        chunksize: Rows per chunk.
+        n_jobs: Worker processes (default: all cores; 1 scores in-process).
+        keep_columns: Input columns copied to the output next to the scores.
+        velocity: Compute velocity and entity-link features when the model uses them.
+        resume: Continue from the progress file if one exists.
+
+    Returns:
+        Dict: Rows and chunks scored, rows skipped by resuming, invalid rows and throughput.
+    """
+    parquet_out = _is_parquet(output_path)
+    if os.path.isdir(model_path):
+        # Pin the current version for the whole run, with the transform published in it
+        model_path = os.path.realpath(model_path)
+        transform_path = bundled_transform_path(model_path) or transform_path
+    # Anything that changes the scores of rows already written; a mismatch refuses to resume
+    settings = {'input': os.path.abspath(input_path), 'chunksize': chunksize,
+                'model': _model_identity(model_path), 'keep_columns': list(keep_columns),
+                'velocity': velocity, 'feature_transform': _file_digest(transform_path)}
+    progress = _Progress(output_path.rstrip('/') + '.progress.json', settings)
+    resumed = resume and progress.load()
+    if not resumed:
+        progress.save()
+
+    header = next(read_chunks(input_path, 1)).columns
+    store = links = None
+    if velocity:
+        features = _model_features(model_path)
+        if features & set(VELOCITY_FEATURES):
+            if 'purchase_time' in header:
+                store = VelocityStore()
+            else:
+                logging.warning("No purchase_time column; velocity features will be missing (0.0)")
+        if features & set(LINK_FEATURES):
+            links = EntityLinkIndex()
+
+    def replay(chunk: pd.DataFrame) -> None:
+        if store is not None:
+            velocity_frame = replay_velocity(chunk, store)
+            chunk[velocity_frame.columns] = velocity_frame
+        if links is not None:
+            link_frame = replay_links(chunk, links)
+            chunk[link_frame.columns] = link_frame
+
+    if parquet_out:
+        os.makedirs(output_path, exist_ok=True)
+        for name in os.listdir(output_path):
+            # Parts past the resume point are from an unfinished or earlier run
+            if name.startswith('part-') and int(name[5:11]) >= progress.chunks:
+                os.remove(os.path.join(output_path, name))
+        out_file = None
+    else:
+        out_file = open(output_path, 'r+b' if resumed and os.path.exists(output_path) else 'wb')
+        out_file.truncate(progress.output_bytes)
+        out_file.seek(progress.output_bytes)
+
+    n_jobs = n_jobs or os.cpu_count() or 1
+    initargs = (model_path, transform_path, ip_index_path)
+    pool = ProcessPoolExecutor(n_jobs, initializer=_init_worker, initargs=initargs) if n_jobs > 1 else None
+    if pool is None:
+        _init_worker(*initargs)
+
+    start = time.perf_counter()
+    skipped = progress.rows
+    invalid = 0
+    pending: deque = deque()
+
+    def write_next() -> None:
+        nonlocal invalid
+        result = pending.popleft().result() if pool is not None else pending.popleft()
+        if parquet_out:
+            result.to_parquet(os.path.join(output_path, f'part-{progress.chunks:06d}.parquet'), index=False)
+        else:
+            result.to_csv(out_file, header=progress.output_bytes == 0, index=False)
+            out_file.flush()
+            os.fsync(out_file.fileno())
+            progress.output_bytes = out_file.tell()
+        invalid += int((result['error'] != '').sum())
+        progress.chunks += 1
+        progress.rows += len(result)
+        progress.save()
+        logging.info(f"Scored chunk {progress.chunks}: {progress.rows} rows written")
+
+    try:
+        # When resuming with velocity or links, the file is read from the start and
+        # the rows already scored only restore the sequential state at the resume point
+        first_row = 0 if store is not None or links is not None else progress.rows
+        for chunk in read_chunks(input_path, chunksize, skip_rows=first_row):
+            if first_row < progress.rows:
+                done = chunk.iloc[:progress.rows - first_row].copy()
+                replay(done)
+                first_row += len(done)
+                chunk = chunk.iloc[len(done):].reset_index(drop=True)
+                if chunk.empty:
+                    continue
+            replay(chunk)
+            if pool is not None:
+                pending.append(pool.submit(score_chunk, chunk, keep_columns, first_row))
+                # Bound the chunks held in memory; results are written strictly in order
+                while len(pending) >= 2 * n_jobs:
+                    write_next()
+            else:
+                pending.append(score_chunk(chunk, keep_columns, first_row))
+                write_next()
+            first_row += len(chunk)
+        while pending:
+            write_next()
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        if out_file is not None:
+            out_file.close()
+
+    elapsed = time.perf_counter() - start
+    scored = progress.rows - skipped
+    summary = {'rows_scored': scored, 'rows_skipped_on_resume': skipped, 'chunks': progress.chunks,
+               'invalid_rows': invalid, 'seconds': round(elapsed, 3),
+               'rows_per_second': round(scored / elapsed, 1) if elapsed > 0 else None}
+    logging.info(f"Bulk scoring complete: {summary}")
+    return summary
@@ -0,0 +1,218 @@
+import copy
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import joblib
+import numpy as np
+from sklearn.base import BaseEstimator, ClassifierMixin
+from sklearn.metrics import auc, precision_recall_curve
+
+from src.forest_inference import CompiledForest, compile_forest, load_forest_arrays, save_forest_arrays
+
+
+def auc_pr(y_true: Any, scores: np.ndarray) -> float:
+    """Area under the precision-recall curve, as reported by model_training."""
+    precision, recall, _ = precision_recall_curve(y_true, scores)
+    return float(auc(recall, precision))
+
+
+def tree_probabilities(compiled: CompiledForest, X: Any) -> np.ndarray:
+    """Fraud probability of every tree for every row, shape (n_trees, n_rows)."""
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    fraud_col = list(compiled.classes_).index(1)
+    return compiled.value[compiled.apply(X), fraud_col]
+
+
+def select_trees(model: Any, X_holdout: Any, y_holdout: Any, tolerance: float = 0.005) -> Tuple[List[int], Dict[str, Any]]:
+    """
+    Smallest greedy tree subset whose AUC-PR is within `tolerance` of the full forest.
+
+    Trees are added one at a time, each time taking the tree that gives the
+    highest holdout AUC-PR for the averaged subset, and the search stops as
+    soon as the subset is within tolerance of the full forest.
+
+    Args:
+        model: Fitted RandomForestClassifier.
+        X_holdout, y_holdout: Rows not used to fit the forest.
+        tolerance: Allowed AUC-PR drop versus the full forest.
+
+    Returns:
+        Tuple of (indices into model.estimators_, summary dict).
+    """
+    y = np.asarray(y_holdout)
+    per_tree = tree_probabilities(compile_forest(model), X_holdout)
+    full_score = auc_pr(y, per_tree.mean(axis=0))
+    target = full_score - tolerance
+
+    chosen: List[int] = []
+    remaining = list(range(len(per_tree)))
+    running_sum = np.zeros(per_tree.shape[1])
+    score = 0.0
+    while remaining:
+        candidates = [auc_pr(y, (running_sum + per_tree[t]) / (len(chosen) + 1)) for t in remaining]
+        best = int(np.argmax(candidates))
+        score = candidates[best]
+        tree = remaining.pop(best)
+        chosen.append(tree)
+        running_sum += per_tree[tree]
+        if score >= target:
+            break
+
+    logging.info(f"Selected {len(chosen)}/{len(per_tree)} trees: AUC-PR {score:.4f} "
+                 f"(full forest {full_score:.4f}, tolerance {tolerance})")
+    return chosen, {'n_trees': len(chosen), 'n_trees_original': len(per_tree),
+                    'auc_pr': score, 'auc_pr_original': full_score}
+
+
+def prune_forest(model: Any, trees: List[int]) -> Any:
+    """Copy of a fitted forest that keeps only the given trees (in that order)."""
+    pruned = copy.copy(model)
+    pruned.estimators_ = [model.estimators_[i] for i in trees]
+    pruned.n_estimators = len(pruned.estimators_)
+    return pruned
+
+
+class DistilledClassifier(ClassifierMixin, BaseEstimator):
+    """
+    A regressor trained on a teacher's fraud probabilities, exposed as a
+    binary classifier (predict_proba, classes_, feature_names_in_) so the
+    API can serve it like the forest.
+    """
+
+    def __init__(self, student: Any = None):
+        self.student = student
+
+    def fit(self, X: Any, teacher_proba: np.ndarray) -> 'DistilledClassifier':
+        self.student.fit(X, teacher_proba)
+        self.classes_ = np.array([0, 1])
+        self.n_features_in_ = self.student.n_features_in_
+        if hasattr(self.student, 'feature_names_in_'):
+            self.feature_names_in_ = self.student.feature_names_in_
+        return self
+
+    def predict_proba(self, X: Any) -> np.ndarray:
+        fraud = np.clip(self.student.predict(X), 0.0, 1.0)
+        return np.column_stack([1.0 - fraud, fraud])
+
+    def predict(self, X: Any) -> np.ndarray:
+        return self.classes_[(self.predict_proba(X)[:, 1] > 0.5).astype(int)]
+
+
+def distill(model: Any, X_train: Any, kind: str = 'gbm', random_state: int = 42) -> DistilledClassifier:
+    """
+    Fit a smaller model on the forest's predicted fraud probabilities.
+
+    Args:
+        model: Teacher (fitted forest).
+        X_train: Rows to transfer on (the forest's training rows are fine:
+            the student learns the teacher's function, not the labels).
+        kind: 'gbm' (shallow histogram gradient boosting) or 'tree' (one
+            depth-8 regression tree).
+    """
+    if kind == 'gbm':
+        from sklearn.ensemble import HistGradientBoostingRegressor
+        student = HistGradientBoostingRegressor(max_iter=100, max_depth=4, learning_rate=0.1,
+                                                random_state=random_state)
+    elif kind == 'tree':
+        from sklearn.tree import DecisionTreeRegressor
+        student = DecisionTreeRegressor(max_depth=8, min_samples_leaf=20, random_state=random_state)
+    else:
+        raise ValueError(f"Unknown distillation target '{kind}' (choose 'gbm' or 'tree')")
+
+    fraud_col = list(model.classes_).index(1)
+    logging.info(f"Distilling forest into a {type(student).__name__}...")
+    return DistilledClassifier(student).fit(X_train, model.predict_proba(X_train)[:, fraud_col])
+
+
+def _size_on_disk(path: str) -> int:
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+    return os.path.getsize(path)
+
+
+def _load(path: str) -> Any:
+    return load_forest_arrays(path) if os.path.isdir(path) else joblib.load(path)
+
+
+def benchmark_artifact(path: str, X_holdout: Any, y_holdout: Any, n_latency: int = 500) -> Dict[str, Any]:
+    """
+    Size on disk, load time, single-row latency and holdout AUC-PR of a saved model.
+
+    Directories are compiled forest arrays (memory-mapped, as served);
+    files are joblib pickles scored with their own predict_proba.
+    """
+    start = time.perf_counter()
+    model = _load(path)
+    load_seconds = time.perf_counter() - start
+
+    X = np.ascontiguousarray(X_holdout, dtype=np.float64)
+    fraud_col = list(model.classes_).index(1)
+    if isinstance(model, CompiledForest) or not hasattr(model, 'feature_names_in_'):
+        score = lambda rows: model.predict_proba(rows)[:, fraud_col]  # noqa: E731
+    else:
+        import pandas as pd
+        columns = model.feature_names_in_
+        score = lambda rows: model.predict_proba(pd.DataFrame(rows, columns=columns))[:, fraud_col]  # noqa: E731
+
+    latencies = []
+    for row in X[:n_latency]:
+        t0 = time.perf_counter()
+        score(row[np.newaxis, :])
+        latencies.append(time.perf_counter() - t0)
+    latencies_ms = np.asarray(latencies) * 1000.0
+
+    return {
+        'artifact': path,
+        'size_mb': round(_size_on_disk(path) / 1024 ** 2, 3),
+        'load_seconds': round(load_seconds, 4),
+        'p50_latency_ms': round(float(np.percentile(latencies_ms, 50)), 4),
+        'p99_latency_ms': round(float(np.percentile(latencies_ms, 99)), 4),
+        'auc_pr': round(auc_pr(y_holdout, score(X)), 4),
+    }
+
+
+def compact_model(model: Any, X_train: Any, X_select: Any, y_select: Any, X_report: Any, y_report: Any,
+                  out_dir: str = 'models/compact', tolerance: float = 0.005,
+                  distill_kind: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Prune (and optionally distill) a trained forest and compare the artifacts.
+
+    Trees are selected on (X_select, y_select); the report is measured on
+    the separate (X_report, y_report) rows. Writes to out_dir:
+      * random_forest_pruned.pkl and random_forest_pruned_compiled/ (servable
+        arrays, like models/random_forest_compiled)
+      * distilled_<kind>.pkl when distill_kind is given
+    and returns one report row per artifact, the original forest included.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    original_pkl = os.path.join(out_dir, 'random_forest_original.pkl')
+    original_dir = os.path.join(out_dir, 'random_forest_original_compiled')
+    joblib.dump(model, original_pkl)
+    save_forest_arrays(compile_forest(model), original_dir)
+
+    trees, summary = select_trees(model, X_select, y_select, tolerance)
+    pruned = prune_forest(model, trees)
+    pruned_pkl = os.path.join(out_dir, 'random_forest_pruned.pkl')
+    pruned_dir = os.path.join(out_dir, 'random_forest_pruned_compiled')
+    joblib.dump(pruned, pruned_pkl)
+    save_forest_arrays(compile_forest(pruned), pruned_dir)
+
+    artifacts = [('original', 'pickle', original_pkl), ('original', 'compiled', original_dir),
+                 ('pruned', 'pickle', pruned_pkl), ('pruned', 'compiled', pruned_dir)]
+    if distill_kind:
+        distilled_pkl = os.path.join(out_dir, f'distilled_{distill_kind}.pkl')
+        joblib.dump(distill(model, X_train, distill_kind), distilled_pkl)
+        artifacts.append((f'distilled_{distill_kind}', 'pickle', distilled_pkl))
+
+    report = []
+    for name, engine, path in artifacts:
+        row = {'model': name, 'engine': engine, **benchmark_artifact(path, X_report, y_report)}
+        if name == 'pruned':
+            row['n_trees'] = summary['n_trees']
+        elif name == 'original':
+            row['n_trees'] = summary['n_trees_original']
+        report.append(row)
+        logging.info(f"Compaction report: {row}")
+    return report
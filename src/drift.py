@@ -0,0 +1,326 @@
+import glob
+import hashlib
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+
+# Bins per feature; discrete features with fewer distinct values get one bin per value
+DRIFT_BINS = 20
+
+# Conventional PSI bands: below MODERATE is stable, above SIGNIFICANT needs attention
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = 0.25
+
+# Rows compared against the edges at once in FeatureProfile.update
+UPDATE_BLOCK_ROWS = 8192
+
+# Floor for empty bin shares in PSI, so a bin seen on one side only stays finite
+PSI_EPSILON = 1e-4
+
+
+def _bin_edges(column: np.ndarray, bins: int) -> np.ndarray:
+    """Interior bin edges for one reference column, padded with +inf to bins - 1 entries."""
+    column = column[np.isfinite(column)]
+    distinct = np.unique(column)
+    if len(distinct) <= bins:
+        # One bin per observed value (category codes, counts)
+        edges = (distinct[:-1] + distinct[1:]) / 2.0
+    else:
+        edges = np.unique(np.quantile(column, np.linspace(0, 1, bins + 1)[1:-1]))
+    padded = np.full(bins - 1, np.inf)
+    padded[:len(edges)] = edges
+    return padded
+
+
+class FeatureProfile:
+    """
+    Fixed-size streaming sketch of a feature matrix.
+
+    Each feature has bins - 1 interior edges, fixed when the profile is
+    built from the training data, and a row of bin counts (the first and
+    last bins are open-ended). Folding rows in is one vectorized compare
+    and bincount, memory does not grow with traffic, and two profiles with
+    the same edges merge by adding counts, so per-worker profiles combine
+    exactly. Quantiles are read off the cumulative counts.
+    """
+
+    def __init__(self, feature_names: Sequence[str], edges: np.ndarray, counts: Optional[np.ndarray] = None,
+                 sums: Optional[np.ndarray] = None):
+        self.feature_names = list(feature_names)
+        self.edges = np.asarray(edges, dtype=np.float64)
+        n_features, n_edges = self.edges.shape
+        self.counts = (np.zeros((n_features, n_edges + 1), dtype=np.int64) if counts is None
+                       else np.asarray(counts, dtype=np.int64))
+        self.sums = np.zeros(n_features) if sums is None else np.asarray(sums, dtype=np.float64)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_reference(cls, X: np.ndarray, feature_names: Sequence[str], bins: int = DRIFT_BINS) -> "FeatureProfile":
+        """
+        Build edges from the reference (training) matrix and count it.
+
+        Args:
+            X: Model-ready feature matrix, columns in feature_names order.
+            feature_names: Feature names (the model's feature_names_in_).
+            bins: Bins per feature.
+        """
+        X = np.asarray(X, dtype=np.float64)
+        edges = np.vstack([_bin_edges(X[:, j], bins) for j in range(X.shape[1])])
+        profile = cls(feature_names, edges)
+        profile.update(X)
+        return profile
+
+    @property
+    def n_rows(self) -> int:
+        return int(self.counts[0].sum()) if len(self.counts) else 0
+
+    @property
+    def signature(self) -> str:
+        """Hash of the feature names and edges; only profiles with equal signatures can be merged."""
+        digest = hashlib.sha1(repr(self.feature_names).encode())
+        digest.update(self.edges.tobytes())
+        return digest.hexdigest()[:16]
+
+    def empty_like(self) -> "FeatureProfile":
+        return FeatureProfile(self.feature_names, self.edges)
+
+    def update(self, X: np.ndarray) -> None:
+        """Fold rows of a model-ready feature matrix (or a single row) into the counts."""
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X[np.newaxis, :]
+        n_features, n_bins = self.counts.shape
+        offsets = np.arange(n_features) * n_bins
+        delta = np.zeros(n_features * n_bins, dtype=np.int64)
+        # Blocks bound the (rows, features, edges) comparison for large reference matrices
+        for start in range(0, len(X), UPDATE_BLOCK_ROWS):
+            block = X[start:start + UPDATE_BLOCK_ROWS]
+            # Bin index = number of edges at or below the value
+            bins = (self.edges[np.newaxis, :, :] <= block[:, :, np.newaxis]).sum(axis=2)
+            delta += np.bincount((offsets + bins).ravel(), minlength=n_features * n_bins)
+        delta = delta.reshape(n_features, n_bins)
+        sums = X.sum(axis=0)
+        with self._lock:
+            self.counts += delta
+            self.sums += sums
+
+    def merge(self, other: "FeatureProfile") -> "FeatureProfile":
+        """Add another profile's counts into this one (same edges required)."""
+        if other.signature != self.signature:
+            raise ValueError("Profiles were built with different features or bin edges")
+        with self._lock:
+            self.counts += other.counts
+            self.sums += other.sums
+        return self
+
+    def snapshot(self) -> "FeatureProfile":
+        with self._lock:
+            return FeatureProfile(self.feature_names, self.edges, self.counts.copy(), self.sums.copy())
+
+    def means(self) -> np.ndarray:
+        return self.sums / max(self.n_rows, 1)
+
+    def quantiles(self, q: Sequence[float]) -> np.ndarray:
+        """
+        Approximate quantiles per feature, interpolated within bins.
+
+        Open-ended bins are clamped to their finite edge, so values in the
+        tails are reported at the outermost edge.
+
+        Returns:
+            Array of shape (n_features, len(q)).
+        """
+        out = np.full((len(self.feature_names), len(q)), np.nan)
+        for j, counts in enumerate(self.counts):
+            finite = self.edges[j][np.isfinite(self.edges[j])]
+            total = counts.sum()
+            if total == 0 or len(finite) == 0:
+                continue
+            # Bin i spans [edge i-1, edge i); clamp the open ends to the outer edges
+            lower = np.concatenate([[finite[0]], finite])
+            upper = np.concatenate([finite, [finite[-1]]])
+            cumulative = np.cumsum(counts[:len(finite) + 1]) / total
+            for k, quantile in enumerate(q):
+                i = min(int(np.searchsorted(cumulative, quantile)), len(finite))
+                before = cumulative[i - 1] if i else 0.0
+                share = (quantile - before) / max(cumulative[i] - before, 1e-12)
+                out[j, k] = lower[i] + min(max(share, 0.0), 1.0) * (upper[i] - lower[i])
+        return out
+
+    def save(self, path: str) -> None:
+        """Write the profile to an .npz file (via a temporary file, so readers never see a partial one)."""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp = f'{path}.{os.getpid()}.tmp.npz'
+        with self._lock:
+            np.savez(tmp, feature_names=np.array(self.feature_names, dtype=str), edges=self.edges,
+                     counts=self.counts, sums=self.sums)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "FeatureProfile":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data['feature_names'].tolist(), data['edges'], data['counts'], data['sums'])
+
+
+def psi(expected: np.ndarray, actual: np.ndarray) -> float:
+    """Population stability index between two count vectors over the same bins."""
+    e = np.maximum(expected / max(expected.sum(), 1), PSI_EPSILON)
+    a = np.maximum(actual / max(actual.sum(), 1), PSI_EPSILON)
+    return float(np.sum((a - e) * np.log(a / e)))
+
+
+def ks_statistic(expected: np.ndarray, actual: np.ndarray) -> float:
+    """Largest gap between the two cumulative distributions, evaluated at the bin edges."""
+    e = np.cumsum(expected) / max(expected.sum(), 1)
+    a = np.cumsum(actual) / max(actual.sum(), 1)
+    return float(np.max(np.abs(a - e)))
+
+
+def compare_profiles(reference: FeatureProfile, live: FeatureProfile, min_rows: int = 100) -> Dict[str, Any]:
+    """
+    PSI and binned KS per feature between a reference and a live profile.
+
+    Returns:
+        Dict with the row counts, overall status and per-feature scores;
+        status is 'insufficient_data' until live has min_rows rows.
+    """
+    if live.signature != reference.signature:
+        raise ValueError("Live profile was not built from this reference")
+    ref_means, live_means = reference.means(), live.means()
+    features: Dict[str, Dict[str, Any]] = {}
+    for j, name in enumerate(reference.feature_names):
+        score = psi(reference.counts[j], live.counts[j])
+        features[name] = {
+            "psi": round(score, 4),
+            "ks": round(ks_statistic(reference.counts[j], live.counts[j]), 4),
+            "reference_mean": round(float(ref_means[j]), 4),
+            "live_mean": round(float(live_means[j]), 4),
+            "status": ("drift" if score >= PSI_SIGNIFICANT else "warning" if score >= PSI_MODERATE else "stable"),
+        }
+    if live.n_rows < min_rows:
+        status = "insufficient_data"
+    elif any(f["status"] == "drift" for f in features.values()):
+        status = "drift"
+    elif any(f["status"] == "warning" for f in features.values()):
+        status = "warning"
+    else:
+        status = "stable"
+    return {
+        "status": status,
+        "reference_rows": reference.n_rows,
+        "live_rows": live.n_rows,
+        "max_psi": max((f["psi"] for f in features.values()), default=0.0),
+        "drifted_features": sorted((n for n, f in features.items() if f["status"] == "drift"),
+                                   key=lambda n: -features[n]["psi"]),
+        "features": features,
+    }
+
+
+class DriftMonitor:
+    """
+    Live feature profile of one API process, compared against the training reference.
+
+    Every scored row is folded into an in-memory FeatureProfile; no raw
+    payloads are kept. When shared_dir is set, the process writes its
+    profile there every flush_interval seconds (from the request path,
+    never more often), and report() merges the profiles of all processes
+    that share the directory, e.g. the gunicorn workers of one host.
+    Profiles built on other reference edges (an older model) are skipped.
+    """
+
+    def __init__(self, reference_path: str, shared_dir: Optional[str] = None, flush_interval: float = 10.0,
+                 min_rows: int = 100):
+        self.reference_path = reference_path
+        self.shared_dir = shared_dir
+        self.flush_interval = flush_interval
+        self.min_rows = min_rows
+        self.reference: Optional[FeatureProfile] = None
+        self.live: Optional[FeatureProfile] = None
+        self._reference_mtime: Optional[float] = None
+        self._last_flush = time.monotonic()
+        self._flush_lock = threading.Lock()
+        self._load_reference()
+
+    def _load_reference(self) -> None:
+        """(Re)load the reference when the file changed, e.g. after retraining; live counts restart."""
+        try:
+            mtime = os.path.getmtime(self.reference_path)
+        except OSError:
+            return
+        if mtime == self._reference_mtime:
+            return
+        try:
+            reference = FeatureProfile.load(self.reference_path)
+        except Exception as e:
+            logging.error(f"Could not load drift reference {self.reference_path}: {e}")
+            return
+        self._reference_mtime = mtime
+        if self.reference is None or reference.signature != self.reference.signature:
+            self.live = reference.empty_like()
+        self.reference = reference
+        logging.info(f"Drift reference loaded: {reference.n_rows} rows, {len(reference.feature_names)} features")
+
+    @property
+    def enabled(self) -> bool:
+        return self.reference is not None
+
+    def _snapshot_path(self) -> str:
+        return os.path.join(self.shared_dir, f'worker-{os.getpid()}.npz')
+
+    def observe(self, X: np.ndarray) -> None:
+        """Fold scored rows (model-ready features) into the live profile."""
+        live = self.live
+        if live is None or np.shape(X)[-1] != len(live.feature_names):
+            return
+        live.update(X)
+        if self.shared_dir and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write this process's live profile to the shared directory."""
+        if not self.shared_dir or self.live is None:
+            return
+        if not self._flush_lock.acquire(blocking=False):
+            return  # another thread is already writing it
+        try:
+            self._last_flush = time.monotonic()
+            self.live.save(self._snapshot_path())
+        except OSError as e:
+            logging.error(f"Could not write drift profile: {e}")
+        finally:
+            self._flush_lock.release()
+
+    def merged(self) -> Optional[FeatureProfile]:
+        """Live profile of this process plus the latest snapshots of every other process."""
+        if self.live is None:
+            return None
+        merged = self.live.snapshot()
+        if not self.shared_dir:
+            return merged
+        own = self._snapshot_path()
+        for path in glob.glob(os.path.join(self.shared_dir, 'worker-*.npz')):
+            if path == own:
+                continue
+            try:
+                merged.merge(FeatureProfile.load(path))
+            except ValueError:
+                continue  # built on another reference
+            except Exception as e:
+                logging.warning(f"Skipping unreadable drift profile {path}: {e}")
+        return merged
+
+    def report(self) -> Dict[str, Any]:
+        self._load_reference()
+        if self.reference is None:
+            return {"status": "no_reference", "reference_path": self.reference_path}
+        self.flush()
+        return compare_profiles(self.reference, self.merged(), self.min_rows)
+
+    def stats(self) -> Dict[str, Any]:
+        live = self.live
+        return {"enabled": self.enabled, "live_rows": live.n_rows if live is not None else 0,
+                "shared_dir": self.shared_dir}
@@ -0,0 +1,217 @@
+import logging
+import os
+import threading
+from typing import TYPE_CHECKING, Any, Dict, List, Mapping, Optional, Set
+
+import numpy as np
+
+# pandas is only needed for the training replay; live updates stay pandas-free
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Node kinds, by the transaction column that names them
+KINDS: Dict[str, int] = {'user_id': 0, 'device_id': 1, 'ip_address': 2}
+
+# Feature columns produced by EntityLinkIndex.update, in a stable order
+LINK_FEATURES: List[str] = ['users_per_device', 'users_per_ip', 'devices_per_user', 'cluster_size']
+
+# Node ids are packed into one int per (device or IP, user) pair
+_PAIR_SHIFT = 32
+
+
+def _present(value: Any) -> bool:
+    return value is not None and not (isinstance(value, float) and np.isnan(value))
+
+
+class EntityLinkIndex:
+    """
+    Incremental links between users and the devices and IPs they transact from.
+
+    Every user, device and IP is a node; a transaction links its user to
+    its device and IP. Distinct (device, user) and (IP, user) pairs are
+    kept in a set, so users-per-device/IP and devices-per-user are exact
+    counters bumped in O(1) the first time a pair is seen. Connected
+    clusters are tracked with union-find (union by size, path halving), so
+    the size of a user's cluster (distinct users reachable through shared
+    devices or IPs) is amortised O(1) as well.
+
+    Features include the transaction being scored, which is known at
+    scoring time, and nothing later: replaying history in time order gives
+    the values the API computes live. Links are never forgotten.
+    """
+
+    def __init__(self):
+        self._ids: Dict[tuple, int] = {}
+        self._parent: List[int] = []
+        # Distinct users in the cluster; only meaningful at a root
+        self._users: List[int] = []
+        # Distinct linked users (device/IP nodes) or devices (user nodes)
+        self._degree: List[int] = []
+        self._pairs: Set[int] = set()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._parent)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _node(self, column: str, value: Any) -> int:
+        key = (KINDS[column], str(value))
+        node = self._ids.get(key)
+        if node is None:
+            node = self._ids[key] = len(self._parent)
+            self._parent.append(node)
+            self._users.append(1 if column == 'user_id' else 0)
+            self._degree.append(0)
+        return node
+
+    def _find(self, node: int) -> int:
+        parent = self._parent
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    def _union(self, a: int, b: int) -> None:
+        a, b = self._find(a), self._find(b)
+        if a == b:
+            return
+        if self._users[a] < self._users[b]:
+            a, b = b, a
+        self._parent[b] = a
+        self._users[a] += self._users[b]
+
+    def update(self, entities: Mapping[str, Any]) -> Dict[str, float]:
+        """
+        Link one transaction's user to its device and IP and return its features.
+
+        Args:
+            entities: Mapping with any of user_id, device_id, ip_address.
+
+        Returns:
+            Dict[str, float]: users_per_device, users_per_ip, devices_per_user
+            and cluster_size after this transaction (0 for missing entities).
+        """
+        with self._lock:
+            if not _present(entities.get('user_id')):
+                return self._features(entities)
+            user = self._node('user_id', entities['user_id'])
+            for column in ('device_id', 'ip_address'):
+                if not _present(entities.get(column)):
+                    continue
+                other = self._node(column, entities[column])
+                pair = (other << _PAIR_SHIFT) | user
+                if pair not in self._pairs:
+                    self._pairs.add(pair)
+                    self._degree[other] += 1
+                    if column == 'device_id':
+                        self._degree[user] += 1
+                    self._union(user, other)
+            return self._features(entities)
+
+    def peek(self, entities: Mapping[str, Any]) -> Dict[str, float]:
+        """Features a transaction would get, without recording its links."""
+        with self._lock:
+            return self._features(entities, pending=True)
+
+    def _lookup(self, entities: Mapping[str, Any], column: str) -> Optional[int]:
+        value = entities.get(column)
+        return self._ids.get((KINDS[column], str(value))) if _present(value) else None
+
+    def _features(self, entities: Mapping[str, Any], pending: bool = False) -> Dict[str, float]:
+        """Current counts; with pending, as if the transaction's links were added."""
+        nodes = {column: self._lookup(entities, column) for column in KINDS}
+        degree = {column: self._degree[node] if node is not None else 0 for column, node in nodes.items()}
+        user = nodes['user_id']
+
+        if pending and _present(entities.get('user_id')):
+            new_pair = {}
+            for column in ('device_id', 'ip_address'):
+                other = nodes[column]
+                new_pair[column] = _present(entities.get(column)) and (
+                    user is None or other is None or ((other << _PAIR_SHIFT) | user) not in self._pairs)
+            roots = {self._find(node) for node in nodes.values() if node is not None}
+            return {
+                'users_per_device': float(degree['device_id'] + new_pair['device_id']),
+                'users_per_ip': float(degree['ip_address'] + new_pair['ip_address']),
+                'devices_per_user': float(degree['user_id'] + new_pair['device_id']),
+                'cluster_size': float(sum(self._users[root] for root in roots) + (user is None)),
+            }
+
+        # The user's cluster, or the device's/IP's when the transaction has no user
+        anchor = next((node for node in nodes.values() if node is not None), None)
+        return {
+            'users_per_device': float(degree['device_id']),
+            'users_per_ip': float(degree['ip_address']),
+            'devices_per_user': float(degree['user_id']),
+            'cluster_size': float(self._users[self._find(anchor)]) if anchor is not None else 0.0,
+        }
+
+    def save(self, path: str) -> None:
+        """Snapshot the index to an .npz file of flat arrays (fast to restore at startup)."""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with self._lock:
+            # Node ids are assigned in insertion order, so key i is node i
+            keys = list(self._ids)
+            np.savez(path,
+                     kinds=np.array([kind for kind, _ in keys], dtype=np.int8),
+                     values=np.array([value for _, value in keys], dtype=str),
+                     parent=np.asarray(self._parent, dtype=np.int64),
+                     users=np.asarray(self._users, dtype=np.int64),
+                     degree=np.asarray(self._degree, dtype=np.int64),
+                     pairs=np.fromiter(self._pairs, dtype=np.int64, count=len(self._pairs)))
+        logging.info(f"Entity link index ({len(self)} nodes, {len(self._pairs)} links) saved to {path}")
+
+    @classmethod
+    def load(cls, path: str) -> "EntityLinkIndex":
+        """Restore an index saved with save()."""
+        index = cls()
+        with np.load(path, allow_pickle=False) as data:
+            keys = zip(data['kinds'].tolist(), data['values'].tolist())
+            index._ids = {key: node for node, key in enumerate(keys)}
+            index._parent = data['parent'].tolist()
+            index._users = data['users'].tolist()
+            index._degree = data['degree'].tolist()
+            index._pairs = set(data['pairs'].tolist())
+        return index
+
+
+def replay_links(df: "pd.DataFrame", index: EntityLinkIndex,
+                 time_col: str = 'purchase_time') -> "pd.DataFrame":
+    """
+    Replay transactions through the link index in time order.
+
+    Args:
+        df: Frame with any of the entity columns (and time_col, when present,
+            to order the replay).
+        index: EntityLinkIndex to update (its state is kept for serving).
+        time_col: Event-time column.
+
+    Returns:
+        pd.DataFrame: Link features aligned to df's original index/order.
+    """
+    import pandas as pd
+
+    logging.info(f"Replaying {len(df)} transactions through the entity link index...")
+    if time_col in df.columns:
+        order = np.argsort(pd.to_datetime(df[time_col]).to_numpy(), kind='stable')
+    else:
+        order = np.arange(len(df))
+
+    columns = [c for c in KINDS if c in df.columns]
+    values = {c: df[c].to_numpy(dtype=object) for c in columns}
+    out = np.empty((len(df), len(LINK_FEATURES)), dtype=np.float64)
+
+    for i in order:
+        features = index.update({c: values[c][i] for c in columns})
+        out[i] = [features[name] for name in LINK_FEATURES]
+
+    logging.info(f"Entity link index holds {len(index)} nodes")
+    return pd.DataFrame(out, columns=LINK_FEATURES, index=df.index)
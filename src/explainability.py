@@ -4,7 +4,9 @@ import pandas as pd
 import numpy as np
 import os
 import logging
-from typing import List, Any, Dict
+from typing import List, Any, Optional
+
+from src.shap_store import CASES, ShapStore, explain_frame
 
 def plot_feature_importance(model: Any, feature_names: List[str], top_n: int = 10) -> None:
     """
@@ -24,81 +26,68 @@ def plot_feature_importance(model: Any, feature_names: List[str], top_n: int = 1
     plt.savefig('reports/figures/feature_importance_baseline.png', bbox_inches='tight')
     plt.close()
 
-def run_shap_analysis(model: Any, X_test: pd.DataFrame, y_test: pd.Series) -> None:
+def run_shap_analysis(model: Any, X_test: pd.DataFrame, y_test: pd.Series, store_dir: str = 'reports/shap/holdout',
+                      n_jobs: Optional[int] = None, plot_rows: int = 2000) -> ShapStore:
     """
     Generates SHAP Global Summary and Local Force Plots for specific cases.
     Fulfills Task 3 requirements for both Global and Local interpretability.
-    """
-    logging.info("Initializing SHAP Explainer...")
-    
-    # Initialize the explainer
-    explainer = shap.TreeExplainer(model)
-    
-    # Sample data for performance
-    X_sample = X_test.sample(min(100, len(X_test)), random_state=42)
 
-    # Use the new Explanation API
-    explanation = explainer(X_sample)
+    SHAP values for the whole test set are computed once, in parallel chunks,
+    into a memory-mapped store (see src.shap_store); the plots and the
+    population importances read from it instead of re-explaining rows.
 
-    # Resolve class indexing for binary classification (Fraud is class 1)
-    # This check handles both 2D and 3D explanation objects
-    if len(explanation.shape) == 3:
-        shap_values_to_plot = explanation[:, :, 1]
-    else:
-        shap_values_to_plot = explanation
+    Args:
+        model: Fitted tree ensemble.
+        X_test: Test features.
+        y_test: Test labels, used to find the TP/FP/FN cases.
+        store_dir: Directory of the SHAP store (reused when model and data are unchanged).
+        n_jobs: Worker processes for the SHAP computation (default: all cores).
+        plot_rows: Rows drawn in the beeswarm plot (importances use every row).
+
+    Returns:
+        ShapStore: The population SHAP values.
+    """
+    logging.info("Computing SHAP values for the full test set...")
+    store = explain_frame(model, X_test, store_dir, y=y_test, n_jobs=n_jobs)
+    os.makedirs('reports/figures', exist_ok=True)
 
     # 1. Global Summary Plot [Task 3 Requirement]
     logging.info("Generating SHAP Summary Plot...")
     plt.figure(figsize=(10, 6))
-    shap.plots.beeswarm(shap_values_to_plot, show=False)
-    os.makedirs('reports/figures', exist_ok=True)
+    shap.plots.beeswarm(store.explanation(store.sample(plot_rows)), show=False)
     plt.savefig('reports/figures/shap_summary_plot.png', bbox_inches='tight')
     plt.close()
 
+    # Population-level importances over every test row
+    importance = store.mean_abs()
+    plt.figure(figsize=(10, 6))
+    plt.barh(importance.index[::-1], importance.values[::-1], color='skyblue')
+    plt.title(f"Mean |SHAP| over {len(store)} test transactions")
+    plt.savefig('reports/figures/shap_global_importance.png', bbox_inches='tight')
+    plt.close()
+
     # 2. Local Case Explanations [Task 3 Requirement]
     logging.info("Searching for specific prediction cases (TP, FP, FN)...")
-    y_pred = model.predict(X_test)
-    
-    try:
-        # Find indices for the three specific scenarios required
-        tp_idx = X_test[(y_test == 1) & (y_pred == 1)].index[0]
-        fp_idx = X_test[(y_test == 0) & (y_pred == 1)].index[0]
-        fn_idx = X_test[(y_test == 1) & (y_pred == 0)].index[0]
-        
-        cases: Dict[str, int] = {
-            'True_Positive': tp_idx,
-            'False_Positive': fp_idx,
-            'False_Negative': fn_idx
-        }
-    except IndexError:
-        logging.warning("Test set sample too small to find all TP/FP/FN cases.")
-        return
-
-    for name, idx in cases.items():
-        logging.info(f"Generating Force Plot for {name}...")
-        
-        row_data = X_test.loc[[idx]]
-        # Explaining a single row
-        row_explanation = explainer(row_data)
-
-        # Handle class indexing for the single row
-        if len(row_explanation.shape) == 3:
-            row_explanation = row_explanation[:, :, 1]
-
-        # Extract values explicitly to avoid "ambiguous array" warnings
-        base_val = float(row_explanation.base_values[0])
-        shap_vals = row_explanation.values[0]
-        feature_vals = row_data.iloc[0]
+    cases = store.find_cases()
+    if len(cases) < len(CASES):
+        logging.warning(f"Test set has no {sorted(set(CASES) - set(cases))} case.")
+    if not cases:
+        return store
 
+    # One gather from the store for every case
+    explanation = store.explanation(list(cases.values()))
+    for i, name in enumerate(cases):
+        logging.info(f"Generating Force Plot for {name} (row {store.row_ids[cases[name]]})...")
         plt.figure(figsize=(12, 3))
         shap.plots.force(
-            base_val, 
-            shap_vals, 
-            feature_vals, 
-            matplotlib=True, 
+            float(explanation.base_values[i]),
+            explanation.values[i],
+            pd.Series(explanation.data[i], index=store.feature_names),
+            matplotlib=True,
             show=False
         )
         plt.savefig(f'reports/figures/shap_force_{name.lower()}.png', bbox_inches='tight')
         plt.close()
 
-    logging.info("SHAP analysis complete. Plots saved to reports/figures/")
\ No newline at end of file
+    logging.info("SHAP analysis complete. Plots saved to reports/figures/")
+    return store
@@ -1,5 +1,9 @@
 import pandas as pd
 import logging
+from typing import Optional
+
+from src.velocity import VelocityStore, replay_velocity
+from src.entity_links import EntityLinkIndex, replay_links
 
 def create_time_features(df: pd.DataFrame) -> pd.DataFrame:
     """
@@ -15,24 +19,56 @@ def create_time_features(df: pd.DataFrame) -> pd.DataFrame:
     df['signup_time'] = pd.to_datetime(df['signup_time'])
     df['purchase_time'] = pd.to_datetime(df['purchase_time'])
     
-    df['hour_of_day'] = df['purchase_time'].dt.hour
-    df['day_of_week'] = df['purchase_time'].dt.dayofweek
+    df['hour_of_day'] = df['purchase_time'].dt.hour.astype('int8')
+    df['day_of_week'] = df['purchase_time'].dt.dayofweek.astype('int8')
     
     # Duration in seconds
     df['time_since_signup'] = (df['purchase_time'] - df['signup_time']).dt.total_seconds()
     
     return df
 
-def create_transaction_velocity(df: pd.DataFrame) -> pd.DataFrame:
+def create_transaction_velocity(df: pd.DataFrame, store: Optional[VelocityStore] = None) -> pd.DataFrame:
     """
-    Calculate the velocity of transactions (frequency) per user.
+    Calculate the velocity of transactions per user, device and IP.
+    
+    Transactions are replayed in purchase_time order through an incremental
+    VelocityStore, so each row only sees earlier transactions (no look-ahead)
+    and the API can compute the same features live from the saved store.
     
     Args:
         df: Input DataFrame.
+        store: Store to replay into; pass one in to keep its state for serving.
         
     Returns:
-        pd.DataFrame: DataFrame with transaction count features.
+        pd.DataFrame: DataFrame with windowed velocity features and
+        user_transaction_count (user transactions in the last 7 days, including this one).
     """
     logging.info("Calculating transaction velocity...")
-    df['user_transaction_count'] = df.groupby('user_id')['user_id'].transform('count')
-    return df
\ No newline at end of file
+    store = store if store is not None else VelocityStore()
+    velocity = replay_velocity(df, store)
+    df[velocity.columns] = velocity
+    df['user_transaction_count'] = df['user_txn_7d'] + 1
+    return df
+
+def create_entity_link_features(df: pd.DataFrame, index: Optional[EntityLinkIndex] = None) -> pd.DataFrame:
+    """
+    Count how many distinct users share each transaction's device and IP.
+
+    Transactions are replayed in purchase_time order through an incremental
+    EntityLinkIndex (union-find over users, devices and IPs), so each row
+    only sees links up to and including itself, and the API keeps updating
+    the same index live.
+
+    Args:
+        df: Input DataFrame.
+        index: Index to replay into; pass one in to keep its state for serving.
+
+    Returns:
+        pd.DataFrame: DataFrame with users_per_device, users_per_ip,
+        devices_per_user and cluster_size.
+    """
+    logging.info("Calculating device/IP sharing features...")
+    index = index if index is not None else EntityLinkIndex()
+    links = replay_links(df, index)
+    df[links.columns] = links
+    return df
@@ -0,0 +1,387 @@
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from src.entity_links import KINDS, LINK_FEATURES, EntityLinkIndex, replay_links
+from src.feature_engineering import create_time_features
+from src.feature_transform import CAT_COLS, NUM_COLS, UNKNOWN_LABEL, FeatureTransform
+from src.ip_index import IpCountryIndex
+from src.preprocessing import clean_data, convert_to_datetime, map_ip_to_country
+from src.schema import drop_merge_only, read_fraud_csv, read_ip_csv
+from src.velocity import ENTITIES, VelocityStore, replay_velocity
+
+STORE_VERSION = 1
+MANIFEST = 'manifest.json'
+
+
+class FeatureStoreWriter:
+    """
+    Append-only columnar store: one raw binary file per column plus a JSON
+    manifest. Numeric and datetime columns are written as fixed-width arrays;
+    string columns as int32 codes with a dictionary grown across chunks.
+    """
+
+    def __init__(self, out_dir: str):
+        self.out_dir = out_dir
+        self.n_rows = 0
+        self.columns: Dict[str, Dict[str, Any]] = {}
+        self._lookups: Dict[str, Dict[Any, int]] = {}
+        os.makedirs(out_dir, exist_ok=True)
+        for name in os.listdir(out_dir):
+            if name.endswith(('.bin', '.bin.tmp')) or name == MANIFEST:
+                os.remove(os.path.join(out_dir, name))
+
+    def append(self, chunk: pd.DataFrame) -> None:
+        """Append a processed chunk; its columns must match earlier chunks."""
+        if self.columns and list(chunk.columns) != list(self.columns):
+            raise ValueError(f"Chunk columns {list(chunk.columns)} differ from store columns {list(self.columns)}")
+
+        for col in chunk.columns:
+            values = self._encode(col, chunk[col])
+            with open(os.path.join(self.out_dir, f'{col}.bin'), 'ab') as f:
+                values.tofile(f)
+        self.n_rows += len(chunk)
+
+    def _encode(self, col: str, series: pd.Series) -> np.ndarray:
+        meta = self.columns.get(col)
+        if meta is None:
+            if pd.api.types.is_datetime64_any_dtype(series):
+                meta = {'kind': 'datetime', 'dtype': 'int64'}
+            elif pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series):
+                meta = {'kind': 'numeric', 'dtype': np.dtype(series.dtype).name}
+            else:
+                meta = {'kind': 'category', 'dtype': 'int32', 'categories': []}
+                self._lookups[col] = {}
+            self.columns[col] = meta
+
+        if meta['kind'] == 'datetime':
+            return series.to_numpy(dtype='datetime64[ns]').view(np.int64)
+        if meta['kind'] == 'numeric':
+            if series.isna().any() and not np.issubdtype(np.dtype(meta['dtype']), np.floating):
+                # An integer column with gaps in a later chunk (cleaned to float64)
+                self._promote(col, 'float64')
+            return series.to_numpy(dtype=meta['dtype'])
+
+        # Grow the dictionary with unseen labels; missing values become -1
+        lookup = self._lookups[col]
+        codes, uniques = pd.factorize(series, use_na_sentinel=True)
+        remap = np.empty(len(uniques), dtype=np.int32)
+        for i, label in enumerate(uniques):
+            if label not in lookup:
+                lookup[label] = len(meta['categories'])
+                meta['categories'].append(label.item() if hasattr(label, 'item') else label)
+            remap[i] = lookup[label]
+        return np.where(codes >= 0, remap[codes] if len(remap) else -1, -1).astype(np.int32)
+
+    def _promote(self, col: str, dtype: str) -> None:
+        """Rewrite the rows already written for col with a wider dtype."""
+        path = os.path.join(self.out_dir, f'{col}.bin')
+        old = self.columns[col]['dtype']
+        if self.n_rows:
+            written = np.memmap(path, dtype=old, mode='r', shape=(self.n_rows,))
+            with open(f'{path}.tmp', 'wb') as f:
+                for start in range(0, self.n_rows, 1_000_000):
+                    written[start:start + 1_000_000].astype(dtype).tofile(f)
+            del written
+            os.replace(f'{path}.tmp', path)
+        self.columns[col]['dtype'] = dtype
+        logging.info(f"Column {col} widened from {old} to {dtype} for missing values")
+
+    def close(self) -> None:
+        """Write the manifest; the store is only readable afterwards."""
+        _write_manifest(self.out_dir, self.n_rows, self.columns)
+        logging.info(f"Feature store written to {self.out_dir}: {self.n_rows} rows, {len(self.columns)} columns")
+
+
+def _write_manifest(path: str, n_rows: int, columns: Dict[str, Dict[str, Any]]) -> None:
+    tmp = os.path.join(path, MANIFEST + '.tmp')
+    with open(tmp, 'w') as f:
+        json.dump({'version': STORE_VERSION, 'n_rows': n_rows, 'columns': columns}, f)
+    os.replace(tmp, os.path.join(path, MANIFEST))
+
+
+class FeatureStore:
+    """
+    Memory-mapped view of a store written by FeatureStoreWriter.
+
+    Existing columns are read-only; derived numeric columns are added (or
+    replace existing ones) with create_column() and publish().
+    """
+
+    def __init__(self, path: str):
+        with open(os.path.join(path, MANIFEST)) as f:
+            manifest = json.load(f)
+        if manifest.get('version') != STORE_VERSION:
+            raise ValueError(f"Unsupported feature store version {manifest.get('version')} in {path}")
+        self.path = path
+        self.n_rows: int = manifest['n_rows']
+        self.columns: Dict[str, Dict[str, Any]] = manifest['columns']
+        self._pending: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return self.n_rows
+
+    def array(self, col: str) -> np.ndarray:
+        """Memory-mapped raw array for a column (codes for categorical columns)."""
+        meta = self.columns[col]
+        if self.n_rows == 0:
+            return np.empty(0, dtype=meta['dtype'])
+        return np.memmap(os.path.join(self.path, f'{col}.bin'), dtype=meta['dtype'],
+                         mode='r', shape=(self.n_rows,))
+
+    def _restore(self, col: str, values: np.ndarray) -> Any:
+        meta = self.columns[col]
+        if meta['kind'] == 'datetime':
+            return np.asarray(values).view('datetime64[ns]')
+        if meta['kind'] == 'category':
+            return pd.Categorical.from_codes(values, categories=meta['categories'])
+        return values
+
+    def series(self, col: str) -> pd.Series:
+        """Column as a pandas Series (datetime/categorical types restored)."""
+        return pd.Series(self._restore(col, self.array(col)), name=col, copy=False)
+
+    def to_frame(self, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """
+        Load the requested columns (all by default) into a DataFrame.
+
+        Numeric columns stay backed by the memory-mapped files (no copy).
+        """
+        columns = list(columns) if columns is not None else list(self.columns)
+        return pd.DataFrame({col: self.series(col) for col in columns}, copy=False)
+
+    def take(self, rows: Union[slice, np.ndarray], columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """Load some rows (a slice or positions) of the requested columns into memory."""
+        columns = list(columns) if columns is not None else list(self.columns)
+        return pd.DataFrame({col: self._restore(col, np.asarray(self.array(col)[rows])) for col in columns})
+
+    def create_column(self, col: str, dtype: str) -> np.ndarray:
+        """
+        Writable array for a new numeric column, or for the replacement of an
+        existing one. Readers keep seeing the old data until publish().
+        """
+        path = os.path.join(self.path, f'{col}.bin.tmp')
+        if self.n_rows == 0:
+            open(path, 'wb').close()
+            values = np.empty(0, dtype=dtype)
+        else:
+            values = np.memmap(path, dtype=dtype, mode='w+', shape=(self.n_rows,))
+        self._pending[col] = values
+        return values
+
+    def publish(self) -> None:
+        """Move the columns from create_column() into place and rewrite the manifest."""
+        for col, values in self._pending.items():
+            if isinstance(values, np.memmap):
+                values.flush()
+            os.replace(os.path.join(self.path, f'{col}.bin.tmp'), os.path.join(self.path, f'{col}.bin'))
+            self.columns[col] = {'kind': 'numeric', 'dtype': np.dtype(values.dtype).name}
+        self._pending = {}
+        _write_manifest(self.path, self.n_rows, self.columns)
+
+
+class _SeenHashes:
+    """
+    Set of 8-byte row hashes kept as sorted runs of decreasing size.
+
+    A new run is merged with the smaller runs before it like a binary
+    counter, so each hash is re-sorted O(log(N / chunk)) times over the
+    file and a lookup is one searchsorted per run.
+    """
+
+    def __init__(self):
+        self._runs: List[np.ndarray] = []
+
+    def __len__(self) -> int:
+        return sum(len(run) for run in self._runs)
+
+    def contains(self, hashes: np.ndarray) -> np.ndarray:
+        # Sorted probes make searchsorted walk each run once
+        order = np.argsort(hashes)
+        probes = hashes[order]
+        found = np.zeros(len(hashes), dtype=bool)
+        for run in self._runs:
+            pos = np.minimum(np.searchsorted(run, probes), len(run) - 1)
+            found[order] |= run[pos] == probes
+        return found
+
+    def add(self, hashes: np.ndarray) -> None:
+        run = np.sort(hashes)
+        while self._runs and len(self._runs[-1]) <= len(run):
+            # Both halves are sorted; the stable sort merges them in linear time
+            run = np.sort(np.concatenate([self._runs.pop(), run]), kind='stable')
+        if len(run):
+            self._runs.append(run)
+
+
+def _drop_seen_rows(chunk: pd.DataFrame, seen: _SeenHashes) -> pd.DataFrame:
+    """Drop rows duplicated within the chunk or already seen in earlier chunks, and remember the rest."""
+    hashes = pd.util.hash_pandas_object(chunk, index=False).to_numpy()
+    keep = ~pd.Series(hashes).duplicated().to_numpy() & ~seen.contains(hashes)
+    seen.add(hashes[keep])
+    return chunk[keep]
+
+
+def stream_preprocess(fraud_csv: str, ip_source: Union[str, pd.DataFrame, IpCountryIndex],
+                      out_dir: str, chunksize: int = 200_000) -> FeatureStore:
+    """
+    Out-of-core version of the cleaning, datetime, IP mapping and time-feature steps.
+
+    The raw CSV is read chunksize rows at a time and each processed chunk is
+    appended to a columnar store, so peak memory follows the chunk size
+    rather than the file size. Duplicate rows are dropped across chunks
+    using 8-byte row hashes.
+
+    Args:
+        fraud_csv: Path to Fraud_Data.csv.
+        ip_source: IpAddress_to_Country.csv path, its DataFrame, or a prebuilt IpCountryIndex.
+        out_dir: Directory for the feature store.
+        chunksize: Rows per chunk.
+
+    Returns:
+        FeatureStore: Memory-mapped reader over the written store.
+    """
+    if isinstance(ip_source, str):
+        ip_source = read_ip_csv(ip_source)
+    ip_index = ip_source if isinstance(ip_source, IpCountryIndex) else IpCountryIndex.from_frame(ip_source)
+
+    writer = FeatureStoreWriter(out_dir)
+    seen = _SeenHashes()
+
+    for i, chunk in enumerate(read_fraud_csv(fraud_csv, chunksize=chunksize)):
+        chunk = _drop_seen_rows(chunk, seen)
+        chunk = clean_data(chunk)
+        chunk = convert_to_datetime(chunk, ['signup_time', 'purchase_time'])
+        chunk = map_ip_to_country(chunk, ip_index)
+        chunk = drop_merge_only(create_time_features(chunk), 'create_time_features')
+        writer.append(chunk)
+        logging.info(f"Chunk {i}: {len(chunk)} rows written ({writer.n_rows} total)")
+
+    writer.close()
+    return FeatureStore(out_dir)
+
+
+
+def _row_blocks(n_rows: int, chunksize: int):
+    for start in range(0, n_rows, chunksize):
+        yield slice(start, min(start + chunksize, n_rows))
+
+
+def _mean_and_scale(values: np.ndarray, chunksize: int) -> Tuple[float, float]:
+    """StandardScaler's mean_ and scale_ (NaN ignored), merged block by block."""
+    n, mean, m2 = 0, 0.0, 0.0
+    for rows in _row_blocks(len(values), chunksize):
+        block = np.asarray(values[rows], dtype=np.float64)
+        block = block[~np.isnan(block)]
+        if not len(block):
+            continue
+        block_mean = float(block.mean())
+        delta, total = block_mean - mean, n + len(block)
+        m2 += float(((block - block_mean) ** 2).sum()) + delta ** 2 * n * len(block) / total
+        mean += delta * len(block) / total
+        n = total
+    std = float(np.sqrt(m2 / n)) if n else 0.0
+    return mean, std if std > 0 else 1.0
+
+
+def _fit_label_codes(store: FeatureStore, col: str, chunksize: int) -> Tuple[List[Any], np.ndarray]:
+    """
+    LabelEncoder classes of a categorical store column and a lookup from
+    store code + 1 (0 for missing) to the encoded value.
+    """
+    labels = store.columns[col]['categories']
+    present = np.zeros(len(labels) + 1, dtype=bool)
+    codes = store.array(col)
+    for rows in _row_blocks(store.n_rows, chunksize):
+        present |= np.bincount(np.asarray(codes[rows]) + 1, minlength=len(present)) > 0
+    classes = [labels[i] for i in np.flatnonzero(present[1:])]
+    if present[0]:
+        # scale_and_encode fills missing countries with 'Unknown'; other columns cannot be encoded
+        if col != 'country':
+            raise ValueError(f"Column {col} has missing values and cannot be label-encoded")
+        classes.append(UNKNOWN_LABEL)
+    classes = sorted(set(classes))
+    position = {label: i for i, label in enumerate(classes)}
+    lookup = np.array([position.get(UNKNOWN_LABEL, -1)] + [position.get(label, -1) for label in labels])
+    return classes, lookup.astype(np.min_scalar_type(-max(len(classes), 1)))
+
+
+# Suffix of the scaled copies of NUM_COLS written by stream_model_features
+SCALED_SUFFIX = '_scaled'
+
+
+def stream_model_features(store: FeatureStore, velocity_store: Optional[VelocityStore] = None,
+                          entity_links: Optional[EntityLinkIndex] = None,
+                          chunksize: int = 200_000) -> FeatureTransform:
+    """
+    Out-of-core version of the velocity, entity-link and scale/encode steps.
+
+    Rows are replayed through the velocity store and the link index in
+    purchase_time order, chunksize rows at a time, and the features are
+    written into the store as new columns. Encoders and scaler statistics
+    are then fitted from streamed counts and moments, and the encoded and
+    scaled values are written like scale_and_encode computes them in memory,
+    to new '*_encoded' and '*_scaled' columns, so the raw columns are kept
+    and a rerun on the same store gives the same result (read the model
+    columns with model_frame). Besides
+    one chunk and the per-key velocity/link state, only the time order
+    (8 bytes per row) is held in memory.
+
+    Args:
+        store: Store written by stream_preprocess; it is extended in place.
+        velocity_store: Store to replay into; pass one in to keep its state for serving.
+        entity_links: Index to replay into; pass one in to keep its state for serving.
+        chunksize: Rows per chunk.
+
+    Returns:
+        FeatureTransform: The fitted encoders/scaler, as scale_and_encode(return_transform=True).
+    """
+    velocity_store = velocity_store if velocity_store is not None else VelocityStore()
+    entity_links = entity_links if entity_links is not None else EntityLinkIndex()
+
+    # Time order for the replays; NaT sorts last, as in the in-memory replay
+    order = np.argsort(store.array('purchase_time').view('datetime64[ns]'), kind='stable')
+    inputs = [c for c in dict.fromkeys([*ENTITIES, *KINDS, 'purchase_time']) if c in store.columns]
+    outputs = {name: store.create_column(name, 'float64')
+               for name in velocity_store.feature_names + ['user_transaction_count'] + LINK_FEATURES}
+    for start in range(0, len(order), chunksize):
+        rows = order[start:start + chunksize]
+        chunk = store.take(rows, inputs)
+        for features in (replay_velocity(chunk, velocity_store), replay_links(chunk, entity_links)):
+            for name in features.columns:
+                outputs[name][rows] = features[name].to_numpy()
+        outputs['user_transaction_count'][rows] = outputs['user_txn_7d'][rows] + 1
+    store.publish()
+
+    categories, lookups = {}, {}
+    for col in CAT_COLS:
+        categories[col], lookups[col] = _fit_label_codes(store, col, chunksize)
+    moments = {col: _mean_and_scale(store.array(col), chunksize) for col in NUM_COLS}
+    transform = FeatureTransform(categories, means={col: m[0] for col, m in moments.items()},
+                                 scales={col: m[1] for col, m in moments.items()})
+
+    encoded = {col: store.create_column(f'{col}_encoded', lookups[col].dtype.name) for col in CAT_COLS}
+    scaled = {col: store.create_column(f'{col}{SCALED_SUFFIX}', 'float64') for col in NUM_COLS}
+    for rows in _row_blocks(store.n_rows, chunksize):
+        for col in CAT_COLS:
+            encoded[col][rows] = lookups[col][np.asarray(store.array(col)[rows]) + 1]
+        for col in NUM_COLS:
+            mean, scale = moments[col]
+            scaled[col][rows] = (np.asarray(store.array(col)[rows], dtype=np.float64) - mean) / scale
+    store.publish()
+    logging.info(f"Model features written to {store.path}: {store.n_rows} rows")
+    return transform
+
+
+def model_frame(store: FeatureStore, columns: Sequence[str]) -> pd.DataFrame:
+    """
+    Model columns of a store transformed by stream_model_features, with the
+    scaled numeric columns under their raw names (as scale_and_encode returns them).
+    """
+    frame = store.to_frame([f'{col}{SCALED_SUFFIX}' if col in NUM_COLS else col for col in columns])
+    frame.columns = list(columns)
+    return frame
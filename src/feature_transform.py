@@ -0,0 +1,239 @@
+import math
+import logging
+import joblib
+import numpy as np
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+# Bump whenever the artifact layout or transform semantics change
+TRANSFORM_VERSION = 1
+
+CAT_COLS = ['source', 'browser', 'sex', 'country']
+NUM_COLS = ['purchase_value', 'time_since_signup', 'user_transaction_count']
+
+# Request field aliases accepted for each training feature name
+FIELD_ALIASES: Dict[str, Tuple[str, ...]] = {
+    'source_encoded': ('source_encoded', 'source'),
+    'browser_encoded': ('browser_encoded', 'browser'),
+    'sex_encoded': ('sex_encoded', 'sex'),
+    'country_encoded': ('country_encoded', 'country'),
+    'time_since_signup': ('time_since_signup', 'time_diff'),
+}
+
+# Label used for categories never seen during training, when it was fitted
+UNKNOWN_LABEL = 'Unknown'
+
+# Plan opcodes
+_PASS, _SCALE, _ENCODE = 0, 1, 2
+
+
+class FeatureTransform:
+    """
+    Fitted encoders and scaler statistics from scale_and_encode.
+
+    Stored as plain dicts and floats so the artifact is small and the
+    serving transform needs neither pandas nor sklearn. Call compile()
+    with the model's feature order to get a request-dict -> float-row
+    function.
+    """
+
+    def __init__(self, categories: Dict[str, List[Any]],
+                 means: Dict[str, float], scales: Dict[str, float]):
+        self.version = TRANSFORM_VERSION
+        self.categories = categories
+        self.means = means
+        self.scales = scales
+        self._plan: List[Tuple[Tuple[str, ...], int, Any]] = []
+        self._defaults: List[float] = []
+        self.feature_names: List[str] = []
+
+    @classmethod
+    def from_fitted(cls, encoders: Mapping[str, Any], scaler: Any,
+                    num_cols: Sequence[str]) -> "FeatureTransform":
+        """Build the artifact from fitted LabelEncoders and a StandardScaler."""
+        return cls(
+            categories={col: list(le.classes_) for col, le in encoders.items()},
+            means={col: float(m) for col, m in zip(num_cols, scaler.mean_)},
+            scales={col: float(s) for col, s in zip(num_cols, scaler.scale_)},
+        )
+
+    @classmethod
+    def identity(cls) -> "FeatureTransform":
+        """Pass-through transform for models trained without a saved artifact."""
+        return cls(categories={}, means={}, scales={})
+
+    @property
+    def is_fitted(self) -> bool:
+        """True when the transform carries fitted encoders/scaler statistics."""
+        return bool(self.categories or self.means)
+
+    def compile(self, feature_names: Sequence[str]) -> "FeatureTransform":
+        """
+        Precompute the per-feature lookup plan for the given model feature order.
+
+        Args:
+            feature_names: Feature order expected by the model (feature_names_in_).
+
+        Returns:
+            FeatureTransform: self, ready for transform_record().
+        """
+        plan = []
+        for name in feature_names:
+            keys = FIELD_ALIASES.get(name, (name,))
+            raw = name[:-len('_encoded')] if name.endswith('_encoded') else name
+            if raw in self.categories:
+                lookup = {value: code for code, value in enumerate(self.categories[raw])}
+                plan.append((keys, _ENCODE, (lookup, lookup.get(UNKNOWN_LABEL))))
+            elif name in self.means:
+                plan.append((keys, _SCALE, (self.means[name], self.scales[name])))
+            else:
+                plan.append((keys, _PASS, None))
+        self._plan = plan
+        # Missing fields: 0.0 in model space, or the 'Unknown' code where one was fitted
+        # (code 0 is a real category)
+        self._defaults = [float(params[1]) if op == _ENCODE and params[1] is not None else 0.0
+                          for _, op, params in plan]
+        self.feature_names = list(feature_names)
+        return self
+
+    def transform_record(self, record: Mapping[str, Any]) -> np.ndarray:
+        """
+        Turn one request dict into a model-ready float64 row.
+
+        Missing fields default to 0.0 in model space, or for categorical
+        fields to the 'Unknown' code when it was fitted. Categorical fields accept
+        either the raw label (e.g. 'Chrome') or an already-encoded integer code;
+        unseen labels map to 'Unknown' when that category was fitted.
+
+        Raises:
+            ValueError: On non-numeric values or unknown category labels.
+        """
+        row = list(self._defaults)
+        for i, (keys, op, params) in enumerate(self._plan):
+            value = None
+            for key in keys:
+                if key in record:
+                    value = record[key]
+                    break
+            else:
+                continue
+
+            if op == _ENCODE:
+                lookup, unknown_code = params
+                if isinstance(value, str):
+                    code = lookup.get(value, unknown_code)
+                    if code is None:
+                        raise ValueError(f"Unknown {keys[-1]} value: {value!r}")
+                    row[i] = float(code)
+                    continue
+                code = _to_float(keys[-1], value)
+                if code != int(code) or not 0 <= code < len(lookup):
+                    raise ValueError(f"Unknown {keys[-1]} value: {value!r}")
+                row[i] = code
+            elif op == _SCALE:
+                mean, scale = params
+                row[i] = (_to_float(keys[-1], value) - mean) / scale
+            else:
+                row[i] = _to_float(keys[-1], value)
+
+        return np.array(row, dtype=np.float64)
+
+    def transform_records(self, records: Sequence[Mapping[str, Any]]) -> np.ndarray:
+        """Transform several request dicts into a (n_rows, n_features) matrix."""
+        out = np.empty((len(records), len(self._plan)), dtype=np.float64)
+        for i, record in enumerate(records):
+            out[i] = self.transform_record(record)
+        return out
+
+    def transform_frame(self, df: "pd.DataFrame") -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Vectorized transform_record for a whole DataFrame (bulk scoring).
+
+        Applies the same rules column by column. Instead of raising, values
+        transform_record would reject (non-numeric, missing, unknown labels)
+        become NaN and their row is marked invalid.
+
+        Returns:
+            Tuple of (float64 matrix of shape (n_rows, n_features), boolean
+            mask of valid rows).
+        """
+        import pandas as pd
+
+        out = np.zeros((len(df), len(self._plan)), dtype=np.float64)
+        for i, (keys, op, params) in enumerate(self._plan):
+            key = next((k for k in keys if k in df.columns), None)
+            if key is None:
+                out[:, i] = self._defaults[i]
+                continue
+            column = df[key]
+
+            if op == _ENCODE and not pd.api.types.is_numeric_dtype(column):
+                lookup, unknown_code = params
+                codes = pd.to_numeric(column.map(lookup), errors='coerce').to_numpy(dtype=np.float64, copy=True)
+                unseen = np.isnan(codes) & column.notna().to_numpy()
+                if unknown_code is not None:
+                    codes[unseen] = unknown_code
+                out[:, i] = codes
+            else:
+                out[:, i] = _numeric_column(pd.to_numeric(column, errors='coerce').to_numpy(dtype=np.float64),
+                                            op, params)
+
+        valid = np.isfinite(out).all(axis=1)
+        return out, valid
+
+    def transform_columns(self, columns: Mapping[str, np.ndarray], n_rows: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        transform_frame for numeric column arrays (binary API requests), NumPy only.
+
+        Categorical fields must hold encoded codes. The result is float32,
+        the precision the forest compares in, written column by column into
+        one matrix.
+
+        Returns:
+            Tuple of (float32 matrix of shape (n_rows, n_features), boolean
+            mask of valid rows).
+        """
+        out = np.zeros((n_rows, len(self._plan)), dtype=np.float32)
+        for i, (keys, op, params) in enumerate(self._plan):
+            key = next((k for k in keys if k in columns), None)
+            out[:, i] = (_numeric_column(np.asarray(columns[key], dtype=np.float64), op, params)
+                         if key is not None else self._defaults[i])
+        return out, np.isfinite(out).all(axis=1)
+
+
+def _numeric_column(values: np.ndarray, op: int, params: Any) -> np.ndarray:
+    """Model-space values of one numeric input column; values transform_record would reject become NaN."""
+    if op == _ENCODE:
+        lookup = params[0]
+        bad = (values != np.floor(values)) | (values < 0) | (values >= len(lookup))
+        return np.where(bad, np.nan, values)
+    if op == _SCALE:
+        mean, scale = params
+        return (values - mean) / scale
+    return values
+
+
+def _to_float(field: str, value: Any) -> float:
+    """Coerce a request value to a finite float or raise ValueError."""
+    try:
+        result = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Non-numeric value for {field}: {value!r}") from None
+    if not math.isfinite(result):
+        raise ValueError(f"Non-finite value for {field}: {value!r}")
+    return result
+
+
+def load_feature_transform(path: str) -> Optional[FeatureTransform]:
+    """
+    Load a FeatureTransform saved by model_training.save_model.
+
+    Returns:
+        FeatureTransform or None if the artifact version is incompatible.
+    """
+    transform = joblib.load(path)
+    version = getattr(transform, "version", None)
+    if version != TRANSFORM_VERSION:
+        logging.error(f"Feature transform version {version} is incompatible "
+                      f"(expected {TRANSFORM_VERSION}): {path}")
+        return None
+    return transform
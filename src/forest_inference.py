@@ -0,0 +1,243 @@
+import json
+import logging
+import os
+import shutil
+import time
+import joblib
+import numpy as np
+from typing import Any, Optional
+
+# On-disk layout version of save_forest_arrays
+ARRAYS_VERSION = 1
+_ARRAY_NAMES = ('feature', 'threshold', 'left', 'right', 'value', 'roots')
+# Feature transform saved in the same version as the arrays (see save_forest_arrays)
+TRANSFORM_FILE = 'feature_transform.pkl'
+
+
+class CompiledForest:
+    """
+    Array-based inference engine for a fitted RandomForestClassifier.
+
+    All trees are flattened into one set of NumPy node arrays (feature,
+    threshold, children, leaf value). Leaves point to themselves, so every
+    row can be pushed down every tree in lock-step for a fixed number of
+    levels without branching on whether a node is a leaf.
+
+    Exposes the parts of the sklearn API used for scoring (predict,
+    predict_proba, classes_, feature_names_in_) so it is a drop-in scorer.
+    """
+
+    def __init__(self, feature: np.ndarray, threshold: np.ndarray,
+                 left: np.ndarray, right: np.ndarray, value: np.ndarray,
+                 roots: np.ndarray, max_depth: int, classes: np.ndarray,
+                 n_features: int, feature_names: Any = None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.max_depth = max_depth
+        self.classes_ = classes
+        # Version directory the arrays were loaded from (set by load_forest_arrays)
+        self.source: Optional[str] = None
+        self.n_estimators = len(roots)
+        self.n_features_in_ = n_features
+        if feature_names is not None:
+            self.feature_names_in_ = np.asarray(feature_names, dtype=object)
+
+    def apply(self, X: np.ndarray) -> np.ndarray:
+        """
+        Return the global leaf index reached by each row in each tree.
+
+        Args:
+            X: float32 matrix of shape (n_rows, n_features).
+
+        Returns:
+            np.ndarray: Leaf indices of shape (n_trees, n_rows).
+        """
+        n_rows = X.shape[0]
+        rows = np.arange(n_rows)[np.newaxis, :]
+        nodes = np.repeat(self.roots[:, np.newaxis], n_rows, axis=1)
+
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+
+        return nodes
+
+    def predict_proba(self, X: Any) -> np.ndarray:
+        """
+        Class probabilities, bit-for-bit identical to sklearn's predict_proba.
+
+        Rows are cast to float32 (as sklearn's tree code does) and per-tree
+        leaf probabilities are summed in estimator order before averaging.
+        """
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+
+        leaves = self.apply(X)
+        proba = self.value[leaves].sum(axis=0)
+        proba /= self.n_estimators
+        return proba
+
+    def predict(self, X: Any) -> np.ndarray:
+        """Predict class labels (argmax over predict_proba)."""
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+def compile_forest(model: Any) -> CompiledForest:
+    """
+    Flatten a fitted single-output RandomForestClassifier into node arrays.
+
+    Args:
+        model: Fitted RandomForestClassifier.
+
+    Returns:
+        CompiledForest: Array-based equivalent of the model.
+    """
+    from sklearn.ensemble import RandomForestClassifier
+
+    if not isinstance(model, RandomForestClassifier):
+        raise TypeError(f"Expected a RandomForestClassifier, got {type(model).__name__}")
+    if getattr(model, "n_outputs_", 1) != 1:
+        raise ValueError("Only single-output forests can be compiled")
+
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        n_nodes = tree.node_count
+        node_ids = np.arange(n_nodes, dtype=np.int64) + offset
+        is_leaf = tree.children_left == -1
+
+        # Leaves loop back onto themselves so traversal can run a fixed number of steps
+        features.append(np.where(is_leaf, 0, tree.feature).astype(np.int64))
+        thresholds.append(tree.threshold.astype(np.float64))
+        lefts.append(np.where(is_leaf, node_ids, tree.children_left + offset))
+        rights.append(np.where(is_leaf, node_ids, tree.children_right + offset))
+
+        # Same per-tree normalisation as DecisionTreeClassifier.predict_proba
+        leaf_value = tree.value[:, 0, :model.n_classes_].astype(np.float64)
+        normalizer = leaf_value.sum(axis=1)[:, np.newaxis]
+        normalizer[normalizer == 0.0] = 1.0
+        values.append(leaf_value / normalizer)
+
+        roots.append(offset)
+        max_depth = max(max_depth, tree.max_depth)
+        offset += n_nodes
+
+    compiled = CompiledForest(
+        feature=np.concatenate(features),
+        threshold=np.concatenate(thresholds),
+        left=np.concatenate(lefts),
+        right=np.concatenate(rights),
+        value=np.concatenate(values),
+        roots=np.asarray(roots, dtype=np.int64),
+        max_depth=max_depth,
+        classes=np.asarray(model.classes_),
+        n_features=model.n_features_in_,
+        feature_names=getattr(model, "feature_names_in_", None),
+    )
+    logging.info(f"Compiled forest: {compiled.n_estimators} trees, {offset} nodes, depth {max_depth}")
+    return compiled
+
+
+def load_compiled_forest(path: str) -> CompiledForest:
+    """Load a forest saved by model_training.save_model and compile it."""
+    import joblib
+    return compile_forest(joblib.load(path))
+
+
+def _version_prefix(path: str) -> str:
+    return f".{os.path.basename(os.path.normpath(path))}.v"
+
+
+def save_forest_arrays(compiled: CompiledForest, path: str, feature_transform: Any = None) -> None:
+    """
+    Save a compiled forest as one .npy file per node array plus a JSON header.
+
+    The arrays can be memory-mapped by load_forest_arrays, so every worker
+    process maps the same read-only pages instead of holding its own copy.
+    Each save writes a new hidden version directory next to path and then
+    points path at it with one symlink rename. A loader therefore sees
+    either the old set of arrays or the new one, never a mix, and the
+    artifact changes exactly once per save. The previous version is kept
+    for servers still loading it; older ones are deleted.
+
+    Args:
+        compiled: Forest to save.
+        path: Directory path (a symlink to the current version).
+        feature_transform: Fitted FeatureTransform to publish in the same
+            version, so loaders never pair new trees with an old scaler
+            and encoders (see bundled_transform_path).
+    """
+    parent = os.path.dirname(os.path.abspath(path))
+    prefix = _version_prefix(path)
+    version = f"{prefix}{time.time_ns()}"
+    target = os.path.join(parent, version)
+    os.makedirs(target)
+    for name in _ARRAY_NAMES:
+        np.save(os.path.join(target, f'{name}.npy'), np.ascontiguousarray(getattr(compiled, name)))
+
+    meta = {
+        'version': ARRAYS_VERSION,
+        'max_depth': int(compiled.max_depth),
+        'classes': np.asarray(compiled.classes_).tolist(),
+        'n_features': int(compiled.n_features_in_),
+        'feature_names': (list(compiled.feature_names_in_)
+                          if hasattr(compiled, 'feature_names_in_') else None),
+    }
+    with open(os.path.join(target, 'forest.json'), 'w') as f:
+        json.dump(meta, f)
+    if feature_transform is not None:
+        joblib.dump(feature_transform, os.path.join(target, TRANSFORM_FILE))
+
+    previous = os.readlink(path) if os.path.islink(path) else None
+    if os.path.isdir(path) and previous is None:
+        # A plain directory from an older layout cannot be renamed over
+        shutil.rmtree(path)
+    link = f"{path}.{os.getpid()}.link"
+    os.symlink(version, link)
+    os.replace(link, path)
+
+    for name in os.listdir(parent):
+        if name.startswith(prefix) and name not in (version, previous):
+            shutil.rmtree(os.path.join(parent, name), ignore_errors=True)
+    logging.info(f"Compiled forest arrays saved to {path} -> {version}")
+
+
+def load_forest_arrays(path: str, mmap: bool = True) -> CompiledForest:
+    """Load arrays written by save_forest_arrays, memory-mapped read-only by default."""
+    # Resolve the version once, so every file comes from the same save
+    path = os.path.realpath(path)
+    with open(os.path.join(path, 'forest.json')) as f:
+        meta = json.load(f)
+    if meta.get('version') != ARRAYS_VERSION:
+        raise ValueError(f"Unsupported compiled forest version {meta.get('version')} in {path}")
+
+    arrays = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r' if mmap else None)
+              for name in _ARRAY_NAMES}
+    forest = CompiledForest(
+        **arrays,
+        max_depth=meta['max_depth'],
+        classes=np.asarray(meta['classes']),
+        n_features=meta['n_features'],
+        feature_names=meta['feature_names'],
+    )
+    forest.source = path
+    return forest
+
+
+def bundled_transform_path(path: str) -> Optional[str]:
+    """
+    The feature transform saved with the compiled forest at path, or None.
+
+    Pass the resolved directory a forest was loaded from (its source
+    attribute) to get the transform of exactly that version.
+    """
+    candidate = os.path.join(os.path.realpath(path), TRANSFORM_FILE)
+    return candidate if os.path.exists(candidate) else None
@@ -0,0 +1,197 @@
+import logging
+import time
+import tracemalloc
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.base import BaseEstimator, ClassifierMixin, clone
+from sklearn.metrics import auc, precision_recall_curve
+from sklearn.neighbors import NearestNeighbors
+
+
+class ImbalanceStrategy:
+    """
+    How the minority (fraud) class is handled when fitting on a training split.
+
+    fit_resample returns the rows to train on; estimator_params returns
+    parameters to set on the estimator (e.g. class weights). Strategies are
+    only ever applied to training data, never to validation or test rows.
+    """
+    name = 'none'
+
+    def fit_resample(self, X: Any, y: Any) -> Tuple[Any, Any]:
+        return X, y
+
+    def estimator_params(self) -> Dict[str, Any]:
+        return {}
+
+
+class ClassWeightStrategy(ImbalanceStrategy):
+    """Reweight classes inversely to their frequency; no extra rows."""
+    name = 'class_weight'
+
+    def estimator_params(self) -> Dict[str, Any]:
+        return {'class_weight': 'balanced'}
+
+
+def _take(X: Any, y: Any, idx: np.ndarray) -> Tuple[Any, Any]:
+    X_out = X.iloc[idx] if isinstance(X, pd.DataFrame) else np.asarray(X)[idx]
+    y_out = y.iloc[idx] if isinstance(y, pd.Series) else np.asarray(y)[idx]
+    return X_out, y_out
+
+
+class UndersampleStrategy(ImbalanceStrategy):
+    """Randomly drop majority rows down to `ratio` minority rows per majority row."""
+    name = 'undersample'
+
+    def __init__(self, ratio: float = 1.0, random_state: int = 42):
+        self.ratio = ratio
+        self.random_state = random_state
+
+    def fit_resample(self, X: Any, y: Any) -> Tuple[Any, Any]:
+        y_arr = np.asarray(y)
+        classes, counts = np.unique(y_arr, return_counts=True)
+        majority = classes[np.argmax(counts)]
+        majority_idx = np.flatnonzero(y_arr == majority)
+        keep = min(len(majority_idx), int(round(counts.min() / self.ratio)))
+
+        rng = np.random.default_rng(self.random_state)
+        kept = rng.choice(majority_idx, size=keep, replace=False)
+        idx = np.sort(np.concatenate([np.flatnonzero(y_arr != majority), kept]))
+        return _take(X, y, idx)
+
+
+class ChunkedSMOTE(ImbalanceStrategy):
+    """
+    SMOTE oversampling with bounded memory.
+
+    Nearest neighbours are searched among minority rows only, a chunk of
+    query rows at a time, and synthetic rows are written straight into one
+    preallocated output matrix, so peak memory is the output plus one chunk.
+    """
+    name = 'smote'
+
+    def __init__(self, k_neighbors: int = 5, ratio: float = 1.0,
+                 chunk_size: int = 10_000, random_state: int = 42):
+        self.k_neighbors = k_neighbors
+        self.ratio = ratio
+        self.chunk_size = chunk_size
+        self.random_state = random_state
+
+    def fit_resample(self, X: Any, y: Any) -> Tuple[Any, Any]:
+        X_arr = np.asarray(X, dtype=np.float64)
+        y_arr = np.asarray(y)
+        classes, counts = np.unique(y_arr, return_counts=True)
+        minority = classes[np.argmin(counts)]
+        X_min = X_arr[y_arr == minority]
+        n_new = int(round(counts.max() * self.ratio)) - len(X_min)
+        if n_new <= 0 or len(X_min) < 2:
+            return X, y
+
+        k = min(self.k_neighbors, len(X_min) - 1)
+        nn = NearestNeighbors(n_neighbors=k + 1).fit(X_min)
+        neighbours = np.empty((len(X_min), k), dtype=np.int64)
+        for start in range(0, len(X_min), self.chunk_size):
+            chunk = X_min[start:start + self.chunk_size]
+            # First neighbour is the row itself
+            neighbours[start:start + len(chunk)] = nn.kneighbors(chunk, return_distance=False)[:, 1:]
+
+        rng = np.random.default_rng(self.random_state)
+        X_res = np.empty((len(X_arr) + n_new, X_arr.shape[1]))
+        X_res[:len(X_arr)] = X_arr
+        for start in range(0, n_new, self.chunk_size):
+            m = min(self.chunk_size, n_new - start)
+            base = rng.integers(len(X_min), size=m)
+            pick = neighbours[base, rng.integers(k, size=m)]
+            gap = rng.random((m, 1))
+            out = X_res[len(X_arr) + start:len(X_arr) + start + m]
+            np.subtract(X_min[pick], X_min[base], out=out)
+            out *= gap
+            out += X_min[base]
+
+        y_res = np.concatenate([y_arr, np.full(n_new, minority, dtype=y_arr.dtype)])
+        if isinstance(X, pd.DataFrame):
+            X_res = pd.DataFrame(X_res, columns=X.columns)
+            y_res = pd.Series(y_res, name=getattr(y, 'name', None))
+        return X_res, y_res
+
+
+STRATEGIES = {
+    'none': ImbalanceStrategy,
+    'class_weight': ClassWeightStrategy,
+    'undersample': UndersampleStrategy,
+    'smote': ChunkedSMOTE,
+}
+
+
+def get_strategy(name: str, **kwargs) -> ImbalanceStrategy:
+    """Instantiate an imbalance strategy by name (see STRATEGIES)."""
+    if name not in STRATEGIES:
+        raise ValueError(f"Unknown imbalance strategy '{name}' (choose from {sorted(STRATEGIES)})")
+    return STRATEGIES[name](**kwargs)
+
+
+class ResampledClassifier(ClassifierMixin, BaseEstimator):
+    """
+    Wraps a classifier so its imbalance strategy runs inside fit.
+
+    Cross-validating this wrapper resamples each training fold only, so
+    synthetic neighbours of validation rows never reach training.
+    """
+
+    def __init__(self, estimator: Any = None, strategy: str = 'smote'):
+        self.estimator = estimator
+        self.strategy = strategy
+
+    def fit(self, X: Any, y: Any) -> 'ResampledClassifier':
+        strategy = get_strategy(self.strategy)
+        X_res, y_res = strategy.fit_resample(X, y)
+        self.estimator_ = clone(self.estimator).set_params(**strategy.estimator_params())
+        self.estimator_.fit(X_res, y_res)
+        self.n_train_rows_ = len(y_res)
+        self.classes_ = self.estimator_.classes_
+        return self
+
+    def predict(self, X: Any) -> np.ndarray:
+        return self.estimator_.predict(X)
+
+    def predict_proba(self, X: Any) -> np.ndarray:
+        return self.estimator_.predict_proba(X)
+
+
+def compare_strategies(estimator: Any, X_train: Any, y_train: Any, X_test: Any, y_test: Any,
+                       strategies: Sequence[str] = ('class_weight', 'undersample', 'smote')) -> List[Dict[str, Any]]:
+    """
+    Fit the estimator once per strategy and report its cost and accuracy.
+
+    Peak memory is the largest amount of memory traced by tracemalloc during
+    resampling and fitting (NumPy buffers included), so it reflects the extra
+    rows each strategy creates rather than the whole process footprint.
+
+    Returns:
+        List[Dict]: Per strategy, the training rows, fit seconds, peak MB and
+        AUC-PR on the untouched test split.
+    """
+    report = []
+    for name in strategies:
+        model = ResampledClassifier(estimator, name)
+        tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            model.fit(X_train, y_train)
+            fit_seconds = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        precision, recall, _ = precision_recall_curve(y_test, model.predict_proba(X_test)[:, 1])
+        report.append({
+            'strategy': name,
+            'train_rows': model.n_train_rows_,
+            'fit_seconds': round(fit_seconds, 3),
+            'peak_memory_mb': round(peak / 1024 ** 2, 1),
+            'auc_pr': round(float(auc(recall, precision)), 4),
+        })
+        logging.info(f"Imbalance strategy {name}: {report[-1]}")
+    return report
@@ -0,0 +1,141 @@
+import numpy as np
+import logging
+import math
+import os
+from typing import TYPE_CHECKING, Union
+
+# pandas is only needed for bulk preprocessing; serving lookups stay pandas-free
+if TYPE_CHECKING:
+    import pandas as pd
+
+UNKNOWN_COUNTRY = 'Unknown'
+
+
+def ip_to_int(ip: Union[str, float]) -> int:
+    """
+    Convert a single IPv4 address to integer for range-based lookup.
+
+    Accepts dotted strings ('192.168.1.1') as well as the float-encoded
+    integers used in Fraud_Data.csv (732758368.79972).
+
+    Args:
+        ip: The IP address as a dotted string or number.
+
+    Returns:
+        int: The integer representation of the IP (0 if unparseable).
+    """
+    try:
+        if ip is None or (isinstance(ip, float) and math.isnan(ip)):
+            return 0
+        if isinstance(ip, str) and ip.count('.') == 3:
+            parts = list(map(int, ip.split('.')))
+            if all(0 <= p <= 255 for p in parts):
+                return (parts[0] << 24) + (parts[1] << 16) + (parts[2] << 8) + parts[3]
+            return 0
+        return int(float(ip))
+    except (TypeError, ValueError, OverflowError):
+        return 0
+
+
+def ip_series_to_int(ips: "pd.Series") -> np.ndarray:
+    """
+    Vectorized IPv4-to-integer conversion for a whole column.
+
+    Numeric columns (float-encoded IPs) are floored with NumPy; string
+    columns are parsed as dotted quads with pandas string ops, falling
+    back to numeric parsing. Unparseable values map to 0.
+
+    Args:
+        ips: Series of IP addresses.
+
+    Returns:
+        np.ndarray: int64 array aligned with the input rows.
+    """
+    import pandas as pd
+
+    if pd.api.types.is_numeric_dtype(ips):
+        values = ips.to_numpy(dtype=np.float64, na_value=np.nan)
+        return np.nan_to_num(np.floor(values), nan=0.0).astype(np.int64)
+
+    text = ips.astype('string').str.strip()
+    octets = text.str.split('.', n=3, expand=True).reindex(columns=range(4))
+    octets = octets.apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+
+    is_quad = (text.str.count(r'\.') == 3).fillna(False).to_numpy(dtype=bool)
+    is_quad &= ~np.isnan(octets).any(axis=1) & ((octets >= 0) & (octets <= 255)).all(axis=1)
+    quad_ints = (octets[:, 0] * 16777216 + octets[:, 1] * 65536 + octets[:, 2] * 256 + octets[:, 3])
+
+    numeric = pd.to_numeric(text, errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+    result = np.where(is_quad, quad_ints, np.floor(numeric))
+    return np.nan_to_num(result, nan=0.0).astype(np.int64)
+
+
+class IpCountryIndex:
+    """
+    Sorted lower/upper bound arrays for IP-range to country lookup.
+
+    Built once from IpAddress_to_Country.csv and saved to disk, it answers
+    bulk lookups (preprocessing) and single lookups (serving) with
+    np.searchsorted, without sorting or merging the transaction frame.
+    """
+
+    def __init__(self, lower: np.ndarray, upper: np.ndarray,
+                 codes: np.ndarray, countries: np.ndarray):
+        self.lower = lower
+        self.upper = upper
+        self.codes = codes
+        # Last slot holds the fallback label for misses
+        self.countries = np.append(countries, UNKNOWN_COUNTRY).astype(object)
+
+    @classmethod
+    def from_frame(cls, ip_df: "pd.DataFrame") -> "IpCountryIndex":
+        """Build the index from the IpAddress_to_Country table."""
+        import pandas as pd
+
+        ip_df = ip_df.sort_values('lower_bound_ip_address')
+        country = ip_df['country']
+        if isinstance(country.dtype, pd.CategoricalDtype):
+            country = country.astype(object)
+        codes, countries = pd.factorize(country.fillna(UNKNOWN_COUNTRY))
+        return cls(
+            lower=ip_df['lower_bound_ip_address'].to_numpy(dtype=np.int64),
+            upper=ip_df['upper_bound_ip_address'].to_numpy(dtype=np.int64),
+            codes=codes.astype(np.int32),
+            countries=np.asarray(countries, dtype=object),
+        )
+
+    def __len__(self) -> int:
+        return len(self.lower)
+
+    def lookup_codes(self, ip_ints: np.ndarray) -> np.ndarray:
+        """Return indices into self.countries (misses map to the Unknown slot)."""
+        ip_ints = np.asarray(ip_ints, dtype=np.int64)
+        unknown = len(self.countries) - 1
+        if len(self.lower) == 0:
+            return np.full(ip_ints.shape, unknown)
+
+        pos = np.searchsorted(self.lower, ip_ints, side='right') - 1
+        safe_pos = np.maximum(pos, 0)
+        hit = (pos >= 0) & (ip_ints <= self.upper[safe_pos])
+        return np.where(hit, self.codes[safe_pos], unknown)
+
+    def lookup(self, ip_ints: np.ndarray) -> np.ndarray:
+        """Vectorized lookup: country label for each integer IP, in input order."""
+        return self.countries[self.lookup_codes(ip_ints)]
+
+    def lookup_one(self, ip: Union[str, float, int]) -> str:
+        """O(log n) lookup of a single IP (dotted string or numeric)."""
+        return str(self.countries[self.lookup_codes(np.array([ip_to_int(ip)]))[0]])
+
+    def save(self, path: str) -> None:
+        """Save the index arrays to an .npz file."""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        np.savez(path, lower=self.lower, upper=self.upper, codes=self.codes,
+                 countries=self.countries[:-1].astype(str))
+        logging.info(f"IP country index ({len(self)} ranges) saved to {path}")
+
+    @classmethod
+    def load(cls, path: str) -> "IpCountryIndex":
+        """Load an index saved with save()."""
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data['lower'], data['upper'], data['codes'], data['countries'].astype(object))
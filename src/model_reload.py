@@ -0,0 +1,226 @@
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.forest_inference import CompiledForest
+
+
+class ReloadError(Exception):
+    """A candidate model failed validation or warm-up and was not activated."""
+
+
+class ServingModel:
+    """
+    Everything scoring depends on for one model artifact: the model, its
+    compiled arrays, the feature transform compiled against its feature
+    order, the reason-code explainer, the artifact version and the
+    namespace of its prediction cache entries.
+
+    The API holds one instance and replaces it with a single assignment,
+    so a request that took a reference keeps a consistent set for its
+    whole lifetime while new requests see the reloaded model.
+    """
+
+    def __init__(self, model: Any, compiled_model: Optional[CompiledForest], feature_transform: Any,
+                 explainer: Any = None, version: str = "none", source: Optional[str] = None,
+                 cache_namespace: Optional[str] = None):
+        self.model = model
+        self.compiled_model = compiled_model
+        self.feature_transform = feature_transform
+        self.explainer = explainer
+        self.version = version
+        self.source = source
+        # Prefix of prediction cache keys; must change whenever scores can change
+        self.cache_namespace = cache_namespace or version
+        self.loaded_at = time.time()
+
+    @property
+    def feature_names(self) -> list:
+        return list(getattr(self.model, "feature_names_in_", []))
+
+    @property
+    def engine(self) -> str:
+        return "compiled" if self.compiled_model is not None else "sklearn"
+
+    def score_matrix(self, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Score a model-ready feature matrix with a single predict_proba pass.
+
+        Labels are derived from the probabilities the same way the forest's own
+        predict() does (argmax over classes), so the trees are traversed once.
+        The compiled array engine is used when available; it returns the same
+        probabilities as sklearn without its per-call validation overhead.
+
+        Returns:
+            Tuple of (predicted labels, fraud probabilities).
+        """
+        model = self.model
+        if self.compiled_model is not None:
+            probabilities = self.compiled_model.predict_proba(X)
+        elif hasattr(model, "feature_names_in_"):
+            import pandas as pd  # only on the sklearn fallback path
+            probabilities = model.predict_proba(pd.DataFrame(X, columns=model.feature_names_in_))
+        else:
+            probabilities = model.predict_proba(X)
+        predictions = model.classes_[np.argmax(probabilities, axis=1)]
+        fraud_col = list(model.classes_).index(1)
+        return predictions, probabilities[:, fraud_col]
+
+    def info(self) -> Dict[str, Any]:
+        return {"version": self.version, "engine": self.engine, "source": self.source,
+                "loaded_at": round(self.loaded_at, 3), "n_features": len(self.feature_names)}
+
+
+def check_feature_parity(candidate: ServingModel, expected: Sequence[str]) -> None:
+    """
+    Require the candidate's feature_names_in_ to match the active model's, in order.
+
+    Rows already transformed for the active model may be scored by the
+    candidate right after the swap (e.g. inside a micro-batch), so the
+    layout has to be identical, not just the same set of names.
+
+    Raises:
+        ReloadError: On missing, unexpected or reordered features.
+    """
+    names = candidate.feature_names
+    if not names:
+        raise ReloadError("Candidate model does not store feature_names_in_")
+    if names == list(expected):
+        return
+    missing = [f for f in expected if f not in names]
+    extra = [f for f in names if f not in expected]
+    if missing or extra:
+        raise ReloadError(f"Feature mismatch: missing {missing}, unexpected {extra}")
+    raise ReloadError("Feature order differs from the active model")
+
+
+def warm_up(candidate: ServingModel, n_rows: int = 64, rounds: int = 3, seed: int = 0) -> Dict[str, float]:
+    """
+    Run synthetic predictions through the candidate before it takes traffic.
+
+    Touches the (memory-mapped) tree arrays and any lazily built state at
+    single-row and batch sizes, and checks the output is usable.
+
+    Returns:
+        Dict with the last round's single-row and batch latency in ms.
+
+    Raises:
+        ReloadError: If scoring fails or returns invalid probabilities.
+    """
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n_rows, len(candidate.feature_names)))
+    # Category codes and counts are non-negative; a zero row covers the defaults
+    X = np.abs(X)
+    X[0] = 0.0
+    timings: Dict[str, float] = {}
+    try:
+        for _ in range(rounds):
+            for label, rows in (("single_row_ms", X[:1]), ("batch_ms", X)):
+                start = time.perf_counter()
+                predictions, probabilities = candidate.score_matrix(rows)
+                timings[label] = round((time.perf_counter() - start) * 1000.0, 3)
+                if len(predictions) != len(rows) or not np.all((probabilities >= 0) & (probabilities <= 1)):
+                    raise ReloadError("Warm-up produced invalid probabilities")
+        if candidate.explainer is not None:
+            candidate.explainer.explain(X[:2], top_k=1)
+    except ReloadError:
+        raise
+    except Exception as e:
+        raise ReloadError(f"Warm-up prediction failed: {e}") from e
+    return timings
+
+
+class ModelReloader:
+    """
+    Watches the model artifact and swaps in new versions without downtime.
+
+    A background thread polls version_fn() every `interval` seconds. When
+    the version changes, the new artifact is loaded with load_fn() on that
+    thread, checked for feature parity with the active model, warmed with
+    synthetic predictions and only then handed to swap_fn(). Requests keep
+    using the active model the whole time; a candidate that fails any step
+    is logged and skipped until the artifact changes again.
+    """
+
+    def __init__(self, load_fn: Callable[[], ServingModel], version_fn: Callable[[], str],
+                 active_fn: Callable[[], Optional[ServingModel]], swap_fn: Callable[[ServingModel], None],
+                 interval: float = 30.0):
+        self.load_fn = load_fn
+        self.version_fn = version_fn
+        self.active_fn = active_fn
+        self.swap_fn = swap_fn
+        self.interval = interval
+        # The active model was loaded from the artifact as it is now
+        self._seen_version = version_fn()
+        self._check_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.reloads = 0
+        self.rejected = 0
+        self.last_error: Optional[str] = None
+        self.last_check: Optional[float] = None
+
+    def check(self, force: bool = False) -> Dict[str, Any]:
+        """
+        Reload if the artifact version changed (or always, with force).
+
+        Returns:
+            Dict with 'status' ('unchanged', 'reloaded' or 'rejected'), the
+            version and, when reloaded, the warm-up timings.
+        """
+        with self._check_lock:
+            self.last_check = time.time()
+            active = self.active_fn()
+            version = self.version_fn()
+            if not force and version == self._seen_version:
+                return {"status": "unchanged", "version": version}
+            self._seen_version = version
+
+            start = time.perf_counter()
+            try:
+                candidate = self.load_fn()
+                if candidate is None or candidate.model is None:
+                    raise ReloadError("Model artifact could not be loaded")
+                if active is not None and active.model is not None:
+                    check_feature_parity(candidate, active.feature_names)
+                timings = warm_up(candidate)
+            except Exception as e:
+                self.rejected += 1
+                self.last_error = f"{version}: {e}"
+                logging.error(f"Model {version} rejected, keeping {active.version if active else 'none'}: {e}")
+                return {"status": "rejected", "version": version, "error": str(e)}
+
+            self.swap_fn(candidate)
+            self.reloads += 1
+            self.last_error = None
+            logging.info(f"Model {candidate.version} activated after {time.perf_counter() - start:.2f}s "
+                         f"(replaced {active.version if active else 'none'}; warm-up {timings})")
+            return {"status": "reloaded", "version": candidate.version, "warm_up": timings}
+
+    def start(self) -> "ModelReloader":
+        """Start polling in a daemon thread (call in each worker process, after fork)."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="model-reloader", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:  # never let the watcher die
+                logging.error(f"Model reload check failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {"watching": self._thread is not None and self._thread.is_alive(), "interval_s": self.interval,
+                "reloads": self.reloads, "rejected": self.rejected, "last_error": self.last_error,
+                "last_check": round(self.last_check, 3) if self.last_check else None}
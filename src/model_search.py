@@ -0,0 +1,283 @@
+import copy
+import hashlib
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import auc, f1_score, precision_recall_curve
+from sklearn.model_selection import ParameterGrid, StratifiedKFold
+
+from src.stage_cache import evict_lru, fingerprint
+
+# Candidate hyperparameters for the Random Forest; n_estimators is the halving resource
+DEFAULT_SEARCH_SPACE = {
+    'max_depth': [6, 10, 16, None],
+    'min_samples_leaf': [1, 5, 20],
+    'max_features': ['sqrt', 0.5],
+}
+
+# Disk budget for the shared (X, y, folds) copies kept next to each other;
+# least recently used sets beyond it are deleted
+SHARED_DATA_MAX_BYTES = 2 * 1024 ** 3
+
+# Memory-mapped (X, y, folds) per data directory, opened once per worker process
+_SHARED: Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+
+
+def share_arrays(X: Any, y: Any, data_dir: str, n_splits: int = 5, seed: int = 42) -> str:
+    """
+    Write X, y and a stratified fold assignment as .npy files that worker
+    processes memory-map read-only, instead of each receiving a pickled copy.
+
+    Existing files are reused, so a resumed search does not rewrite them.
+    Sibling data directories are evicted least recently used first once
+    they exceed SHARED_DATA_MAX_BYTES.
+    """
+    os.makedirs(data_dir, exist_ok=True)
+    if not os.path.exists(os.path.join(data_dir, 'folds.npy')):
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        y = np.asarray(y)
+        folds = np.empty(len(y), dtype=np.int8)
+        skf = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=seed)
+        for fold, (_, test_idx) in enumerate(skf.split(X, y)):
+            folds[test_idx] = fold
+        np.save(os.path.join(data_dir, 'X.npy'), X)
+        np.save(os.path.join(data_dir, 'y.npy'), y)
+        # Written last: its presence marks a complete set
+        np.save(os.path.join(data_dir, 'folds.npy'), folds)
+    os.utime(data_dir)  # mark as recently used
+    evict_lru(os.path.dirname(os.path.abspath(data_dir)), SHARED_DATA_MAX_BYTES, suffix='', keep=data_dir)
+    return data_dir
+
+
+def _shared_arrays(data_dir: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    if data_dir not in _SHARED:
+        _SHARED[data_dir] = tuple(np.load(os.path.join(data_dir, f'{name}.npy'), mmap_mode='r')
+                                  for name in ('X', 'y', 'folds'))
+    return _SHARED[data_dir]
+
+
+def score_predictions(model: Any, X: np.ndarray, y: np.ndarray, scoring: str) -> float:
+    """Score a fitted classifier with 'auc_pr' (as in model_training) or 'f1'."""
+    if scoring == 'f1':
+        return float(f1_score(y, model.predict(X)))
+    if scoring == 'auc_pr':
+        precision, recall, _ = precision_recall_curve(y, model.predict_proba(X)[:, 1])
+        return float(auc(recall, precision))
+    raise ValueError(f"Unknown scoring '{scoring}'")
+
+
+def fit_fold(data_dir: str, estimator: Any, fold: int, scoring: str) -> Tuple[float, float]:
+    """
+    Fit an unfitted estimator on every fold but `fold` and score it on `fold`.
+
+    Runs in worker processes; the training data is read from the shared memmaps.
+
+    Returns:
+        Tuple of (score, fit seconds).
+    """
+    X, y, folds = _shared_arrays(data_dir)
+    train = folds != fold
+    start = time.perf_counter()
+    estimator.fit(X[train], y[train])
+    fit_seconds = time.perf_counter() - start
+    return score_predictions(estimator, X[~train], y[~train], scoring), fit_seconds
+
+
+def _single_threaded(estimator: Any, fitted: bool = False) -> Any:
+    """
+    Copy of estimator with n_jobs=1 at every level, to run inside a pool worker.
+
+    Parallelism comes from the pool; nested n_jobs=-1 would oversubscribe
+    cores. An unfitted estimator is cloned; with fitted=True it is copied
+    with its fitted state (deeply, so nested estimators of the original
+    keep their settings). Objects without get_params are returned as is.
+    """
+    if not hasattr(estimator, 'get_params'):
+        return estimator
+    estimator = copy.deepcopy(estimator) if fitted else clone(estimator)
+    nested = [name for name in estimator.get_params() if name == 'n_jobs' or name.endswith('__n_jobs')]
+    return estimator.set_params(**{name: 1 for name in nested})
+
+
+def _run_tasks(pool: Optional[ProcessPoolExecutor], data_dir: str,
+               tasks: Sequence[Tuple[Any, Any, int]], scoring: str, on_result=None) -> Dict[Tuple[Any, int], Tuple[float, float]]:
+    """Run (key, estimator, fold) tasks in the pool (or inline without one)."""
+    results = {}
+    if pool is None:
+        for key, estimator, fold in tasks:
+            results[(key, fold)] = fit_fold(data_dir, estimator, fold, scoring)
+            if on_result:
+                on_result(key, fold, *results[(key, fold)])
+        return results
+
+    futures = {pool.submit(fit_fold, data_dir, estimator, fold, scoring): (key, fold)
+               for key, estimator, fold in tasks}
+    for future in as_completed(futures):
+        key, fold = futures[future]
+        results[(key, fold)] = future.result()
+        if on_result:
+            on_result(key, fold, *results[(key, fold)])
+    return results
+
+
+def _pool(n_jobs: Optional[int]) -> Optional[ProcessPoolExecutor]:
+    n_jobs = n_jobs or os.cpu_count() or 1
+    return ProcessPoolExecutor(max_workers=n_jobs) if n_jobs > 1 else None
+
+
+def cross_validate(model: Any, X: Any, y: Any, k: int = 5, scoring: str = 'f1',
+                   n_jobs: Optional[int] = None, data_dir: str = '.cache/search/cv') -> np.ndarray:
+    """
+    Stratified k-fold scores with the folds fitted in parallel processes.
+
+    Args:
+        model: Estimator to evaluate (cloned, so a fitted model is fine).
+        X, y: Training data, shared with the workers through memory-mapped files.
+        k: Number of folds.
+        scoring: 'f1' or 'auc_pr'.
+        n_jobs: Worker processes (default: all cores).
+
+    Returns:
+        np.ndarray: One score per fold.
+    """
+    data_dir = os.path.join(data_dir, fingerprint([X, y])[:16] + f'-k{k}')
+    share_arrays(X, y, data_dir, n_splits=k)
+    estimator = _single_threaded(model)
+    pool = _pool(n_jobs)
+    try:
+        results = _run_tasks(pool, data_dir, [(None, estimator, fold) for fold in range(k)], scoring)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return np.array([results[(None, fold)][0] for fold in range(k)])
+
+
+def _params_key(params: Dict[str, Any]) -> str:
+    return json.dumps(params, sort_keys=True)
+
+
+def _candidate(base_params: Dict[str, Any], params: Dict[str, Any], n_estimators: int,
+               imbalance: Optional[str]) -> Any:
+    from src.imbalance import ResampledClassifier
+    forest = RandomForestClassifier(**base_params, **params, n_estimators=n_estimators, n_jobs=1)
+    return ResampledClassifier(forest, imbalance) if imbalance else forest
+
+
+def successive_halving(X: Any, y: Any, search_space: Optional[Dict[str, List[Any]]] = None,
+                       base_params: Optional[Dict[str, Any]] = None, n_splits: int = 5,
+                       min_estimators: int = 25, max_estimators: int = 200, eta: int = 3,
+                       scoring: str = 'auc_pr', n_jobs: Optional[int] = None,
+                       search_dir: str = '.cache/search', seed: int = 42,
+                       imbalance: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Random Forest hyperparameter search by successive halving over n_estimators.
+
+    Every candidate is cross-validated with min_estimators trees; the best
+    1/eta are kept and re-evaluated with eta times more trees, until one
+    candidate is left or max_estimators is reached. All fold fits of a rung
+    run in one process pool reading X and y from memory-mapped files.
+
+    Each finished fold fit is appended to trials.jsonl under a directory
+    keyed by the data and the search settings, so rerunning an interrupted
+    search skips the fits that already completed.
+
+    Args:
+        X, y: Training data.
+        search_space: Parameter grid (default DEFAULT_SEARCH_SPACE).
+        base_params: Fixed RandomForestClassifier parameters.
+        n_splits: Cross-validation folds per evaluation.
+        min_estimators, max_estimators, eta: Halving schedule.
+        scoring: 'auc_pr' or 'f1'.
+        n_jobs: Worker processes (default: all cores).
+        search_dir: Root directory for shared arrays and search state.
+        seed: Random state for folds and forests.
+        imbalance: Optional src.imbalance strategy, applied inside each training fold.
+
+    Returns:
+        Dict: best_params, best_score, per-rung results and fit counts.
+    """
+    search_space = search_space or DEFAULT_SEARCH_SPACE
+    base_params = {'random_state': seed, **(base_params or {})}
+    candidates = list(ParameterGrid(search_space))
+    settings = [fingerprint([X, y]), search_space, base_params, n_splits,
+                min_estimators, max_estimators, eta, scoring, seed, imbalance]
+    search_id = hashlib.sha256(repr(settings).encode()).hexdigest()[:16]
+    state_dir = os.path.join(search_dir, search_id)
+    os.makedirs(state_dir, exist_ok=True)
+    # Trials stay under state_dir; the array copies are evicted with the other data sets
+    data_dir = share_arrays(X, y, os.path.join(search_dir, 'data', search_id), n_splits=n_splits, seed=seed)
+    trials_path = os.path.join(state_dir, 'trials.jsonl')
+
+    done: Dict[Tuple[str, int, int], float] = {}
+    if os.path.exists(trials_path):
+        with open(trials_path) as f:
+            for line in f:
+                try:
+                    trial = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # partial line from an interrupted write
+                done[(trial['params'], trial['n_estimators'], trial['fold'])] = trial['score']
+        logging.info(f"Resuming search {search_id}: {len(done)} fold fits already completed")
+        # Terminate a partial last line so the next record starts on its own line
+        with open(trials_path, 'rb+') as f:
+            if f.seek(0, os.SEEK_END):
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b'\n':
+                    f.write(b'\n')
+
+    resumed = len(done)
+    rungs = []
+    survivors = candidates
+    resource = min_estimators
+    pool = _pool(n_jobs)
+    try:
+        with open(trials_path, 'a') as trials_file:
+            def record(key, fold, score, fit_seconds):
+                trials_file.write(json.dumps({'params': key, 'n_estimators': resource, 'fold': fold,
+                                              'score': score, 'fit_seconds': round(fit_seconds, 4)}) + '\n')
+                trials_file.flush()
+                done[(key, resource, fold)] = score
+
+            while True:
+                keys = [_params_key(params) for params in survivors]
+                tasks = [(key, _candidate(base_params, params, resource, imbalance), fold)
+                         for key, params in zip(keys, survivors) for fold in range(n_splits)
+                         if (key, resource, fold) not in done]
+                logging.info(f"Halving rung {len(rungs)}: {len(survivors)} candidates x {n_splits} folds "
+                             f"at {resource} trees ({len(tasks)} fits to run)")
+                _run_tasks(pool, data_dir, tasks, scoring, on_result=record)
+
+                scores = [float(np.mean([done[(key, resource, fold)] for fold in range(n_splits)]))
+                          for key in keys]
+                order = np.argsort(scores)[::-1]
+                rungs.append({'n_estimators': resource,
+                              'results': [{'params': survivors[i], 'score': scores[i]} for i in order]})
+
+                if len(survivors) == 1 or resource >= max_estimators:
+                    break
+                survivors = [survivors[i] for i in order[:max(1, len(survivors) // eta)]]
+                resource = min(resource * eta, max_estimators)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    best = rungs[-1]['results'][0]
+    result = {
+        'best_params': {**best['params'], 'n_estimators': rungs[-1]['n_estimators']},
+        'best_score': best['score'],
+        'scoring': scoring,
+        'rungs': rungs,
+        'n_fits': len(done),
+        'resumed_fits': resumed,
+    }
+    with open(os.path.join(state_dir, 'result.json'), 'w') as f:
+        json.dump(result, f, indent=2)
+    logging.info(f"Best parameters: {result['best_params']} ({scoring}={result['best_score']:.4f})")
+    return result
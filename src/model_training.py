@@ -3,10 +3,9 @@ import numpy as np
 import logging
 import joblib
 import os
-from typing import Tuple, Any
+from typing import Tuple, Any, Dict, Optional
 
-from imblearn.over_sampling import SMOTE
-from sklearn.model_selection import train_test_split, StratifiedKFold, cross_val_score
+from sklearn.model_selection import train_test_split
 from sklearn.linear_model import LogisticRegression
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import (
@@ -16,21 +15,35 @@ from sklearn.metrics import (
     auc
 )
 
-def handle_imbalance(df: pd.DataFrame, target_col: str) -> Tuple[pd.DataFrame, pd.Series]:
-    """Applies SMOTE to balance the dataset."""
-    logging.info("Applying SMOTE to handle class imbalance...")
-    
-    X = df[['purchase_value', 'source_encoded', 'browser_encoded', 
-            'sex_encoded', 'age', 'time_since_signup', 'user_transaction_count']]
-    y = df[target_col]
-    
-    smote = SMOTE(random_state=42)
-    X_res, y_res = smote.fit_resample(X, y)
-    
-    logging.info(f"Original class distribution: {y.value_counts().to_dict()}")
+from src.velocity import VELOCITY_FEATURES
+from src.entity_links import LINK_FEATURES
+from src.model_search import cross_validate
+from src.imbalance import ResampledClassifier, get_strategy
+
+# Model input columns, in training order
+FEATURE_COLS = ['purchase_value', 'source_encoded', 'browser_encoded',
+                'sex_encoded', 'age', 'time_since_signup', 'user_transaction_count',
+                'country_encoded'] + VELOCITY_FEATURES + LINK_FEATURES
+
+def select_features(df: pd.DataFrame, target_col: str) -> Tuple[pd.DataFrame, pd.Series]:
+    """Model inputs and target, without any resampling."""
+    return df[FEATURE_COLS], df[target_col]
+
+def handle_imbalance(X: pd.DataFrame, y: pd.Series, strategy: str = 'smote') -> Tuple[pd.DataFrame, pd.Series, Dict[str, Any]]:
+    """
+    Applies an imbalance strategy (see src.imbalance.STRATEGIES) to a
+    training split only. Returns the rows to fit on and any estimator
+    parameters the strategy needs (e.g. class weights).
+    """
+    logging.info(f"Applying '{strategy}' imbalance strategy to the training split...")
+    
+    imbalance = get_strategy(strategy)
+    X_res, y_res = imbalance.fit_resample(X, y)
+    
+    logging.info(f"Original class distribution: {pd.Series(y).value_counts().to_dict()}")
     logging.info(f"Resampled class distribution: {pd.Series(y_res).value_counts().to_dict()}")
     
-    return X_res, y_res
+    return X_res, y_res, imbalance.estimator_params()
 
 def prepare_train_test_split(X: pd.DataFrame, y: pd.Series, test_size: float = 0.2) -> Tuple[Any, Any, Any, Any]:
     """Split the data into training and testing sets using stratification."""
@@ -44,12 +57,14 @@ def prepare_train_test_split(X: pd.DataFrame, y: pd.Series, test_size: float = 0
     return X_train, X_test, y_train, y_test
 
 def train_baseline_model(X_train: pd.DataFrame, y_train: pd.Series, 
-                         X_test: pd.DataFrame, y_test: pd.Series) -> LogisticRegression:
+                         X_test: pd.DataFrame, y_test: pd.Series,
+                         imbalance: str = 'smote') -> LogisticRegression:
     """Train a Logistic Regression baseline and evaluate performance."""
     logging.info("Training Logistic Regression baseline...")
     
-    model = LogisticRegression(max_iter=1000, random_state=42)
-    model.fit(X_train, y_train)
+    X_fit, y_fit, imbalance_params = handle_imbalance(X_train, y_train, imbalance)
+    model = LogisticRegression(max_iter=1000, random_state=42, **imbalance_params)
+    model.fit(X_fit, y_fit)
     
     y_pred = model.predict(X_test)
     y_probs = model.predict_proba(X_test)[:, 1]
@@ -65,18 +80,24 @@ def train_baseline_model(X_train: pd.DataFrame, y_train: pd.Series,
     
     return model
 
-def train_ensemble_model(X_train, y_train, X_test, y_test) -> RandomForestClassifier:
-    """Train a Random Forest model with basic hyperparameter tuning."""
+def train_ensemble_model(X_train, y_train, X_test, y_test,
+                         params: Optional[Dict[str, Any]] = None,
+                         imbalance: str = 'smote') -> RandomForestClassifier:
+    """
+    Train a Random Forest model with basic hyperparameter tuning.
+    `params` (e.g. the best_params of model_search.successive_halving)
+    override the defaults; the imbalance strategy is applied to the
+    training split only.
+    """
     logging.info("Training Random Forest ensemble model...")
     
-    rf_model = RandomForestClassifier(
-        n_estimators=100, 
-        max_depth=10, 
-        random_state=42, 
-        n_jobs=-1 
-    )
+    X_fit, y_fit, imbalance_params = handle_imbalance(X_train, y_train, imbalance)
+    rf_params = {'n_estimators': 100, 'max_depth': 10, 'random_state': 42, 'n_jobs': -1}
+    rf_params.update(params or {})
+    rf_params.update(imbalance_params)
+    rf_model = RandomForestClassifier(**rf_params)
     
-    rf_model.fit(X_train, y_train)
+    rf_model.fit(X_fit, y_fit)
     
     y_pred = rf_model.predict(X_test)
     y_probs = rf_model.predict_proba(X_test)[:, 1]
@@ -92,12 +113,14 @@ def train_ensemble_model(X_train, y_train, X_test, y_test) -> RandomForestClassi
     
     return rf_model
     
-def perform_cross_validation(model, X, y, k=5):
-    """Perform Stratified K-Fold cross-validation."""
+def perform_cross_validation(model, X, y, k=5, n_jobs=None, imbalance='smote'):
+    """
+    Perform Stratified K-Fold cross-validation, fitting the folds in
+    parallel worker processes that share X and y through memory-mapped files.
+    The imbalance strategy is applied inside each training fold.
+    """
     logging.info(f"Starting {k}-fold Stratified Cross-Validation...")
-    skf = StratifiedKFold(n_splits=k, shuffle=True, random_state=42)
-    
-    scores = cross_val_score(model, X, y, cv=skf, scoring='f1')
+    scores = cross_validate(ResampledClassifier(model, imbalance), X, y, k=k, scoring='f1', n_jobs=n_jobs)
     
     logging.info(f"Cross-Validation F1-Scores: {scores}")
     logging.info(f"Mean F1-Score: {np.mean(scores):.4f} (+/- {np.std(scores):.4f})")
@@ -0,0 +1,232 @@
+import hashlib
+import json
+import logging
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple
+
+import numpy as np
+
+# (prediction, fraud probability)
+CachedScore = Tuple[int, float]
+
+# Fixed-size records of the shared table; the key is a 16-byte digest
+_RECORD = np.dtype([('key', '<u8', (2,)), ('check', '<u8'), ('expires', '<f8'),
+                    ('probability', '<f8'), ('prediction', '<i8')])
+# Slots per bucket: a key can live in any slot of its bucket
+SHARED_WAYS = 4
+
+
+def _digest(*parts: bytes) -> bytes:
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(part)
+    return digest.digest()
+
+
+def feature_key(row: np.ndarray, version: str) -> bytes:
+    """
+    Cache key of an aligned feature vector for one model version.
+
+    The row is canonicalized to the float32 values the forest compares
+    (so 0, 0.0 and -0.0, or float64 noise below float32 precision, give
+    the same key).
+    """
+    row = np.ascontiguousarray(row, dtype=np.float32) + np.float32(0.0)  # -0.0 -> 0.0
+    return _digest(b'f', version.encode(), b'\0', row.tobytes())
+
+
+# Payload fields that make an identical resubmission a retry of the same transaction
+RETRY_ID_FIELDS = ('purchase_time', 'request_id')
+
+
+def payload_key(record: Mapping[str, Any], version: str) -> Optional[bytes]:
+    """
+    Cache key of a raw request payload (key order and whitespace do not matter).
+
+    Lets an exact resubmission be answered before enrichment, so a retried
+    transaction is not recorded again in the velocity and link state.
+    Only payloads that identify the transaction (one of RETRY_ID_FIELDS)
+    get a key: without one, two identical payloads may be two real
+    transactions (e.g. a rapid repeat card test) and must both be counted.
+    Returns None for those and for payloads that cannot be serialized canonically.
+    """
+    if not any(record.get(field) is not None for field in RETRY_ID_FIELDS):
+        return None
+    try:
+        canonical = json.dumps(record, sort_keys=True, separators=(',', ':'), allow_nan=False)
+    except (TypeError, ValueError):
+        return None
+    return _digest(b'p', version.encode(), b'\0', canonical.encode())
+
+
+class SharedPredictionStore:
+    """
+    Fixed-size hash table of scores in a memory-mapped file, shared by the
+    worker processes that open the same path (put it on /dev/shm to keep it
+    in shared memory).
+
+    Keys map to a bucket of SHARED_WAYS slots; a write replaces the same
+    key, an expired or empty slot, or else the slot closest to expiry. There
+    is no cross-process lock: each record carries a checksum of its
+    contents, and a record torn by a concurrent write reads as a miss.
+    """
+
+    def __init__(self, path: str, slots: int = 65536, clock: Callable[[], float] = time.time):
+        self.path = path
+        self.n_buckets = max(1, slots // SHARED_WAYS)
+        self.clock = clock
+        size = self.n_buckets * SHARED_WAYS * _RECORD.itemsize
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if os.fstat(fd).st_size != size:
+                os.ftruncate(fd, size)
+        finally:
+            os.close(fd)
+        self._table = np.memmap(path, dtype=_RECORD, mode='r+', shape=(self.n_buckets * SHARED_WAYS,))
+
+    def _bucket(self, key: bytes) -> range:
+        start = int.from_bytes(key[:8], 'little') % self.n_buckets * SHARED_WAYS
+        return range(start, start + SHARED_WAYS)
+
+    @staticmethod
+    def _check(key: bytes, expires: float, probability: float, prediction: int) -> int:
+        packed = struct.pack('<ddq', expires, probability, prediction)
+        return int.from_bytes(hashlib.blake2b(key + packed, digest_size=8).digest(), 'little') | 1
+
+    def get(self, key: bytes) -> Optional[Tuple[CachedScore, float]]:
+        """Returns (score, seconds it remains valid), or None."""
+        words = np.frombuffer(key, dtype='<u8')
+        now = self.clock()
+        for slot in self._bucket(key):
+            record = self._table[slot:slot + 1].copy()[0]
+            if (record['key'] == words).all() and record['expires'] > now:
+                prediction, probability = int(record['prediction']), float(record['probability'])
+                if int(record['check']) == self._check(key, float(record['expires']), probability, prediction):
+                    return (prediction, probability), float(record['expires']) - now
+        return None
+
+    def put(self, key: bytes, value: CachedScore, ttl: float) -> bool:
+        """
+        Store a score; returns True when a live entry of another key was overwritten.
+        """
+        words = np.frombuffer(key, dtype='<u8')
+        now = self.clock()
+        slots = self._bucket(key)
+        bucket = self._table[slots.start:slots.stop]
+        same = np.flatnonzero((bucket['key'] == words).all(axis=1))
+        free = np.flatnonzero((bucket['check'] == 0) | (bucket['expires'] <= now))
+        if len(same):
+            slot, evicted = same[0], False
+        elif len(free):
+            slot, evicted = free[0], False
+        else:
+            slot, evicted = int(np.argmin(bucket['expires'])), True
+        prediction, probability = int(value[0]), float(value[1])
+        expires = now + ttl
+        bucket[slot] = ((words[0], words[1]), self._check(key, expires, probability, prediction),
+                        expires, probability, prediction)
+        return evicted
+
+
+class PredictionCache:
+    """
+    LRU cache of scores with a time-to-live, optionally backed by a
+    SharedPredictionStore so worker processes answer each other's repeats.
+
+    Keys carry the serving model's cache namespace (see feature_key and
+    payload_key), which changes with the model and transform files, so a
+    reloaded model never serves scores of the previous one. Local entries
+    are cleared on reload; shared ones simply age out.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 30.0,
+                 shared: Optional[SharedPredictionStore] = None, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.shared = shared
+        self.clock = clock
+        self._entries: "OrderedDict[bytes, Tuple[float, CachedScore]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl_seconds > 0
+
+    def get(self, key: Optional[bytes], final: bool = True) -> Optional[CachedScore]:
+        """
+        Look up a score in the local cache, then the shared store.
+
+        Args:
+            key: Cache key from feature_key or payload_key.
+            final: Whether a miss settles the request. Pass False for a probe
+                that is followed by another lookup, so each request counts
+                one hit or one miss.
+
+        Returns:
+            The cached (prediction, probability), or None.
+        """
+        if not self.enabled or key is None:
+            return None
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key]
+                self.expirations += 1
+        found = self.shared.get(key) if self.shared is not None else None
+        with self._lock:
+            if found is None:
+                self.misses += final
+                return None
+            self.shared_hits += 1
+        value, remaining = found
+        # Keep it locally for the rest of its shared lifetime
+        self._put_local(key, value, now, remaining)
+        return value
+
+    def put(self, key: Optional[bytes], value: CachedScore) -> None:
+        if not self.enabled or key is None:
+            return
+        self._put_local(key, value, self.clock())
+        if self.shared is not None:
+            try:
+                if self.shared.put(key, value, self.ttl_seconds):
+                    with self._lock:
+                        self.evictions += 1
+            except (OSError, ValueError) as e:
+                logging.warning(f"Shared prediction cache write failed: {e}")
+
+    def _put_local(self, key: bytes, value: CachedScore, now: float, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._entries[key] = (now + (self.ttl_seconds if ttl is None else ttl), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.shared_hits + self.misses
+            return {"enabled": self.enabled, "entries": len(self._entries), "max_entries": self.max_entries,
+                    "ttl_s": self.ttl_seconds, "hits": self.hits, "shared_hits": self.shared_hits,
+                    "misses": self.misses, "evictions": self.evictions, "expirations": self.expirations,
+                    "hit_rate": round((self.hits + self.shared_hits) / lookups, 4) if lookups else 0.0,
+                    "shared_path": self.shared.path if self.shared is not None else None}
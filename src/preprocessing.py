@@ -1,29 +1,16 @@
 import pandas as pd
 import numpy as np
 import logging
-from typing import List, Union
+from typing import List, Tuple, Union
 from sklearn.preprocessing import StandardScaler, LabelEncoder
 
+from src.feature_transform import CAT_COLS, NUM_COLS, FeatureTransform
+from src.ip_index import IpCountryIndex, ip_series_to_int, ip_to_int  # noqa: F401 (ip_to_int re-exported)
+from src.schema import numpy_integers
+
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def ip_to_int(ip: Union[str, float]) -> int:
-    """
-    Convert IPv4 string to integer for range-based lookup.
-    
-    Args:
-        ip: The IP address string (e.g., '192.168.1.1').
-        
-    Returns:
-        int: The integer representation of the IP.
-    """
-    try:
-        if pd.isna(ip): return 0
-        parts = list(map(int, str(ip).split('.')))
-        return (parts[0] << 24) + (parts[1] << 16) + (parts[2] << 8) + parts[3]
-    except Exception:
-        return 0
-
 def clean_data(df: pd.DataFrame) -> pd.DataFrame:
     """
     Handle missing values and duplicates for the fraud dataset.
@@ -38,7 +25,8 @@ def clean_data(df: pd.DataFrame) -> pd.DataFrame:
     df = df.drop_duplicates()
     # Dropping rows missing critical IDs for fraud analysis
     df = df.dropna(subset=['user_id', 'device_id', 'ip_address']) 
-    return df
+    # Nullable integers from read_fraud_csv back to NumPy dtypes now that IDs are present
+    return numpy_integers(df)
 
 def convert_to_datetime(df: pd.DataFrame, columns: List[str]) -> pd.DataFrame:
     """
@@ -56,64 +44,61 @@ def convert_to_datetime(df: pd.DataFrame, columns: List[str]) -> pd.DataFrame:
         df[col] = pd.to_datetime(df[col])
     return df
 
-def map_ip_to_country(fraud_df: pd.DataFrame, ip_df: pd.DataFrame) -> pd.DataFrame:
+def map_ip_to_country(fraud_df: pd.DataFrame,
+                      ip_df: Union[pd.DataFrame, IpCountryIndex]) -> pd.DataFrame:
     """
-    Efficiently map IP addresses to countries using merge_asof.
+    Map IP addresses to countries with a sorted-array range lookup.
+    
+    Rows keep their original order and index; no sort or merge of the
+    transaction frame is needed.
     
     Args:
         fraud_df: DataFrame containing transaction data.
-        ip_df: DataFrame containing IP range to country mapping.
+        ip_df: IP range to country mapping, as a DataFrame or a prebuilt IpCountryIndex.
         
     Returns:
-        pd.DataFrame: Merged DataFrame with country information.
+        pd.DataFrame: DataFrame with a categorical country column added. The
+        integer IPs used for the lookup are not kept.
     """
     logging.info("Mapping IP addresses to countries...")
     
-    fraud_df['ip_int'] = fraud_df['ip_address'].apply(ip_to_int).astype('int64')
-    ip_df['lower_bound_ip_address'] = ip_df['lower_bound_ip_address'].astype('int64')
-    ip_df['upper_bound_ip_address'] = ip_df['upper_bound_ip_address'].astype('int64')
+    index = ip_df if isinstance(ip_df, IpCountryIndex) else IpCountryIndex.from_frame(ip_df)
     
-    ip_df = ip_df.sort_values('lower_bound_ip_address')
-    fraud_df = fraud_df.sort_values('ip_int')
+    fraud_df['country'] = pd.Categorical(index.lookup(ip_series_to_int(fraud_df['ip_address'])))
 
-    merged_df = pd.merge_asof(
-        fraud_df, 
-        ip_df, 
-        left_on='ip_int', 
-        right_on='lower_bound_ip_address'
-    )
+    return fraud_df
 
-    merged_df['country'] = np.where(
-        merged_df['ip_int'] <= merged_df['upper_bound_ip_address'],
-        merged_df['country'],
-        'Unknown'
-    )
-
-    return merged_df
-
-def scale_and_encode(df: pd.DataFrame) -> pd.DataFrame:
+def scale_and_encode(df: pd.DataFrame, return_transform: bool = False
+                     ) -> Union[pd.DataFrame, Tuple[pd.DataFrame, FeatureTransform]]:
     """
     Normalize numerical features and encode categorical variables.
     
     Args:
         df: The DataFrame after feature engineering.
+        return_transform: Also return the fitted encoders/scaler as a
+            FeatureTransform so serving can apply the exact same mapping.
         
     Returns:
-        pd.DataFrame: Processed DataFrame ready for modeling.
+        pd.DataFrame: Processed DataFrame ready for modeling, plus the
+        FeatureTransform when return_transform is True.
     """
     logging.info("Scaling numerical features and encoding categoricals...")
     
+    if isinstance(df['country'].dtype, pd.CategoricalDtype) and 'Unknown' not in df['country'].cat.categories:
+        df['country'] = df['country'].cat.add_categories('Unknown')
     df['country'] = df['country'].fillna('Unknown')
     
-    # Categorical columns
-    cat_cols = ['source', 'browser', 'sex']
-    for col in cat_cols:
+    # Categorical columns (codes stored at the narrowest integer width)
+    encoders = {}
+    for col in CAT_COLS:
         le = LabelEncoder()
-        df[f'{col}_encoded'] = le.fit_transform(df[col])
+        df[f'{col}_encoded'] = pd.to_numeric(le.fit_transform(df[col]), downcast='integer')
+        encoders[col] = le
     
     # Numerical columns
     scaler = StandardScaler()
-    num_cols = ['purchase_value', 'time_since_signup', 'user_transaction_count']
-    df[num_cols] = scaler.fit_transform(df[num_cols])
+    df[NUM_COLS] = scaler.fit_transform(df[NUM_COLS])
     
-    return df
\ No newline at end of file
+    if return_transform:
+        return df, FeatureTransform.from_fitted(encoders, scaler, NUM_COLS)
+    return df
@@ -0,0 +1,208 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.forest_inference import CompiledForest
+
+TREE_SHAP = 'tree_shap'
+PATH_APPROX = 'path'
+
+# (per-feature contributions, base value, method)
+Attribution = Tuple[np.ndarray, float, str]
+
+
+def path_attributions(compiled: CompiledForest, X: np.ndarray, class_index: int = -1) -> Tuple[np.ndarray, float]:
+    """
+    Approximate per-feature attributions from each row's decision paths.
+
+    Every split a row passes through credits the change in the node's class
+    probability to the split feature (Saabas-style). Contributions plus the
+    base value add up to predict_proba, at the cost of one forest traversal.
+
+    Args:
+        compiled: Compiled forest (node values hold class probabilities).
+        X: Feature matrix of shape (n_rows, n_features).
+        class_index: Column of the explained class in the node values.
+
+    Returns:
+        Tuple of (contributions of shape (n_rows, n_features), base value).
+    """
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    if X.ndim == 1:
+        X = X.reshape(1, -1)
+    n_rows, n_features = X.shape
+    value = compiled.value[:, class_index]
+    rows = np.arange(n_rows)[np.newaxis, :]
+    nodes = np.repeat(compiled.roots[:, np.newaxis], n_rows, axis=1)
+    contributions = np.zeros(n_rows * n_features)
+
+    for _ in range(compiled.max_depth):
+        feature = compiled.feature[nodes]
+        go_left = X[rows, feature] <= compiled.threshold[nodes]
+        children = np.where(go_left, compiled.left[nodes], compiled.right[nodes])
+        # Leaves point to themselves, so their delta is zero
+        delta = value[children] - value[nodes]
+        contributions += np.bincount((rows * n_features + feature).ravel(), weights=delta.ravel(),
+                                     minlength=n_rows * n_features)
+        nodes = children
+
+    base_value = float(value[compiled.roots].mean())
+    return contributions.reshape(n_rows, n_features) / compiled.n_estimators, base_value
+
+
+class ReasonCodeExplainer:
+    """
+    Per-transaction reason codes for the API.
+
+    Exact TreeSHAP values come from a shap.TreeExplainer built once from the
+    sklearn forest. When only the compiled forest is available, or a request's
+    latency budget would be exceeded, rows fall back to path attributions.
+    Explanations are kept in an LRU cache keyed by the float32 feature
+    vector the model actually sees.
+    """
+
+    def __init__(self, compiled: CompiledForest, model: Any = None, feature_names: Sequence[str] = None,
+                 cache_size: int = 4096, chunk_size: int = 16):
+        self.compiled = compiled
+        self.feature_names = list(feature_names if feature_names is not None
+                                  else getattr(compiled, 'feature_names_in_', []))
+        classes = list(np.asarray(compiled.classes_))
+        self.class_index = classes.index(1) if 1 in classes else len(classes) - 1
+        self.cache_size = cache_size
+        self.chunk_size = chunk_size
+        self._cache: "OrderedDict[bytes, Attribution]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        self.tree_explainer = None
+        self.exact_row_seconds = 0.0
+        if model is not None:
+            import shap
+            self.tree_explainer = shap.TreeExplainer(model)
+            self.exact_row_seconds = self._calibrate()
+            logging.info(f"TreeExplainer ready (~{self.exact_row_seconds * 1000:.2f}ms per row)")
+        else:
+            logging.info("No sklearn model available; explanations use path attributions")
+
+    @property
+    def method(self) -> str:
+        return TREE_SHAP if self.tree_explainer is not None else PATH_APPROX
+
+    def _calibrate(self) -> float:
+        """Warm the explainer and measure the per-row cost used for budget decisions."""
+        X = np.zeros((self.chunk_size, self.compiled.n_features_in_))
+        self._tree_shap(X[:1])
+        start = time.perf_counter()
+        self._tree_shap(X)
+        return (time.perf_counter() - start) / len(X)
+
+    def _tree_shap(self, X: np.ndarray) -> Tuple[np.ndarray, float]:
+        values = self.tree_explainer.shap_values(np.asarray(X, dtype=np.float64), check_additivity=False)
+        if isinstance(values, list):
+            values = values[self.class_index]
+        elif values.ndim == 3:
+            values = values[:, :, self.class_index]
+        base_value = np.ravel(self.tree_explainer.expected_value)
+        return values, float(base_value[self.class_index] if len(base_value) > 1 else base_value[0])
+
+    def _cache_get(self, key: bytes) -> Optional[Attribution]:
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+            return entry
+
+    def _cache_put(self, key: bytes, entry: Attribution) -> None:
+        with self._lock:
+            self._cache[key] = entry
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def attribute(self, X: np.ndarray, budget_ms: Optional[float] = None) -> Tuple[List[Attribution], List[bool]]:
+        """
+        Attributions for each row, exact where the budget allows.
+
+        Uncached rows are explained exactly in chunks; once the elapsed time
+        plus the expected cost of the next chunk would pass budget_ms, the
+        remaining rows use path attributions. Only results of the default
+        method are cached, so an approximation never displaces an exact value.
+
+        Returns:
+            Tuple of (attributions, cache-hit flags), one per row.
+        """
+        start = time.perf_counter()
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        keys = [row.tobytes() for row in X]
+        results: List[Optional[Attribution]] = [self._cache_get(key) for key in keys]
+        cached = [entry is not None for entry in results]
+        pending = [i for i, entry in enumerate(results) if entry is None]
+
+        if self.tree_explainer is not None:
+            while pending:
+                chunk, rest = pending[:self.chunk_size], pending[self.chunk_size:]
+                if budget_ms is not None:
+                    projected = time.perf_counter() - start + self.exact_row_seconds * len(chunk)
+                    if projected * 1000.0 > budget_ms:
+                        break
+                values, base_value = self._tree_shap(X[chunk])
+                for i, contributions in zip(chunk, values):
+                    results[i] = (contributions, base_value, TREE_SHAP)
+                    self._cache_put(keys[i], results[i])
+                pending = rest
+
+        if pending:
+            values, base_value = path_attributions(self.compiled, X[pending], self.class_index)
+            for i, contributions in zip(pending, values):
+                results[i] = (contributions, base_value, PATH_APPROX)
+                if self.tree_explainer is None:
+                    self._cache_put(keys[i], results[i])
+
+        return results, cached
+
+    def explain(self, X: np.ndarray, top_k: int = 3, budget_ms: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Top-k contributing features per row, largest absolute contribution first.
+
+        Args:
+            X: Aligned feature matrix of shape (n_rows, n_features).
+            top_k: Number of features to report per row.
+            budget_ms: Optional latency budget for the whole call.
+
+        Returns:
+            List[Dict]: Per row, the base value, the fraud probability implied
+            by the attributions, the method used and the top features.
+        """
+        X = np.asarray(X)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        attributions, cached = self.attribute(X, budget_ms)
+
+        explanations = []
+        for row, (contributions, base_value, method), hit in zip(X, attributions, cached):
+            order = np.argsort(-np.abs(contributions), kind='stable')[:top_k]
+            explanations.append({
+                "base_value": round(base_value, 4),
+                "fraud_probability": round(float(base_value + contributions.sum()), 4),
+                "method": method,
+                "cached": hit,
+                "top_features": [{
+                    "feature": self.feature_names[j],
+                    "value": float(row[j]),
+                    "contribution": round(float(contributions[j]), 4),
+                } for j in order],
+            })
+        return explanations
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"method": self.method, "cache_entries": len(self._cache),
+                    "cache_hits": self.hits, "cache_misses": self.misses}
@@ -0,0 +1,223 @@
+import io
+import logging
+import os
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+
+# Bump when the stored table layout changes
+ROLLUP_VERSION = 1
+
+# Rollup tables and the column each one groups by ('day' is derived from purchase_time)
+DIMENSIONS = ('day', 'country', 'source', 'browser')
+
+# Additive measures kept per group; rates are derived on read so tables can be summed
+MEASURES = ('transactions', 'flagged', 'labelled_fraud', 'probability_sum', 'purchase_value', 'value_at_risk')
+MEASURE_DTYPES = {m: 'int64' for m in MEASURES[:3]} | {m: 'float64' for m in MEASURES[3:]}
+
+# Bytes of new CSV output parsed at a time during a refresh
+READ_BLOCK_BYTES = 64 * 1024 ** 2
+
+
+def summarize(scores: pd.DataFrame, dimension: str) -> pd.DataFrame:
+    """
+    Additive measures of one batch of scores grouped by dimension.
+
+    value_at_risk is the purchase value of flagged transactions;
+    labelled_fraud counts rows whose 'class' column is 1, when present.
+    """
+    if dimension == 'day' and 'purchase_time' in scores.columns:
+        days = pd.to_datetime(scores['purchase_time'], errors='coerce').dt.strftime('%Y-%m-%d')
+        keys = days.astype(object).fillna('Unknown')
+    elif dimension in scores.columns:
+        keys = scores[dimension].astype(object).fillna('Unknown').astype(str)
+    else:
+        keys = pd.Series('Unknown', index=scores.index)
+
+    flagged = scores['prediction'].to_numpy() == 1
+    if 'purchase_value' in scores.columns:
+        value = np.nan_to_num(pd.to_numeric(scores['purchase_value'], errors='coerce').to_numpy(dtype=np.float64))
+    else:
+        value = np.zeros(len(scores))
+    labelled = scores['class'].to_numpy() == 1 if 'class' in scores.columns else np.zeros(len(scores), bool)
+    frame = pd.DataFrame({
+        'key': keys.to_numpy(),
+        'transactions': 1,
+        'flagged': flagged.astype(np.int64),
+        'labelled_fraud': labelled.astype(np.int64),
+        'probability_sum': np.nan_to_num(scores['fraud_probability'].to_numpy(dtype=np.float64)),
+        'purchase_value': value,
+        'value_at_risk': np.where(flagged, value, 0.0),
+    })
+    return frame.groupby('key', sort=True)[list(MEASURES)].sum()
+
+
+def with_rates(table: pd.DataFrame) -> pd.DataFrame:
+    """Add fraud_rate (flagged share) and mean_probability to a rollup table."""
+    table = table.copy()
+    transactions = table['transactions'].where(table['transactions'] > 0)
+    table['fraud_rate'] = (table['flagged'] / transactions).fillna(0.0)
+    table['mean_probability'] = (table['probability_sum'] / transactions).fillna(0.0)
+    return table
+
+
+def latest_day(day_table: pd.DataFrame) -> Optional[Tuple[str, pd.Series]]:
+    """
+    Key and row of the most recent dated bucket of the 'day' table, skipping
+    non-date keys such as 'Unknown'; None when there is no dated bucket.
+    """
+    dates = pd.to_datetime(pd.Series(day_table.index, index=day_table.index), format='%Y-%m-%d', errors='coerce')
+    if dates.isna().all():
+        return None
+    key = dates.idxmax()
+    return key, day_table.loc[key]
+
+
+class RollupStore:
+    """
+    Per-day/country/source/browser aggregates of scored transactions.
+
+    Tables only hold sums, so new scores are folded in by adding the
+    grouped batch to the existing rows; nothing is recomputed. For each
+    scores file the store remembers how much has been ingested (bytes of
+    a CSV, parts of a Parquet directory), so refresh() only reads what was
+    appended since. Tables and positions are saved together in one file,
+    replaced atomically, so an interrupted refresh never double counts.
+    """
+
+    def __init__(self, path: str = 'data/rollups/rollups.pkl'):
+        self.path = path
+        self.version = ROLLUP_VERSION
+        self.tables: Dict[str, pd.DataFrame] = {
+            dim: pd.DataFrame(columns=list(MEASURES), index=pd.Index([], name='key')).astype(MEASURE_DTYPES)
+            for dim in DIMENSIONS}
+        self.sources: Dict[str, Dict[str, int]] = {}
+
+    @classmethod
+    def load(cls, path: str = 'data/rollups/rollups.pkl') -> 'RollupStore':
+        """Load a saved store, or return an empty one if none exists yet."""
+        store = cls(path)
+        if os.path.exists(path):
+            state = joblib.load(path)
+            if state.get('version') != ROLLUP_VERSION:
+                raise ValueError(f"Rollup store {path} has version {state.get('version')} "
+                                 f"(expected {ROLLUP_VERSION}); rebuild it")
+            store.tables, store.sources = state['tables'], state['sources']
+        return store
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp = self.path + '.tmp'
+        joblib.dump({'version': self.version, 'tables': self.tables, 'sources': self.sources}, tmp)
+        os.replace(tmp, self.path)
+
+    def append(self, scores: pd.DataFrame) -> None:
+        """Fold one batch of scored rows into every table (in memory; call save())."""
+        if scores.empty:
+            return
+        for dim in DIMENSIONS:
+            batch = summarize(scores, dim)
+            table = self.tables[dim]
+            merged = batch if table.empty else table.add(batch, fill_value=0)
+            self.tables[dim] = merged.astype(MEASURE_DTYPES).sort_index()
+
+    def refresh(self, scores_path: str) -> int:
+        """
+        Ingest the rows appended to a scores file since the last refresh.
+
+        Args:
+            scores_path: Output of score.py (CSV file or Parquet part directory).
+
+        Returns:
+            int: Number of new rows ingested.
+
+        Raises:
+            ValueError: If the file is shorter than what was already ingested
+                (it was rewritten); rebuild the store from scratch then.
+        """
+        key = os.path.abspath(scores_path)
+        position = self.sources.get(key, {'bytes': 0, 'parts': 0, 'rows': 0})
+        added = 0
+        for batch, position in _new_batches(scores_path, position):
+            self.append(batch)
+            added += len(batch)
+        position['rows'] = position.get('rows', 0) + added
+        self.sources[key] = position
+        self.save()
+        logging.info(f"Rollups refreshed from {scores_path}: {added} new rows "
+                     f"({position['rows']} total from this file)")
+        return added
+
+    def table(self, dimension: str) -> pd.DataFrame:
+        """One rollup table with derived rates."""
+        return with_rates(self.tables[dimension])
+
+    def totals(self) -> Dict[str, float]:
+        """Overall sums and rates (every table covers all rows, so any one will do)."""
+        sums = self.tables['day'][list(MEASURES)].sum()
+        totals = {m: float(sums[m]) for m in MEASURES}
+        n = totals['transactions']
+        totals['fraud_rate'] = totals['flagged'] / n if n else 0.0
+        return totals
+
+
+def _new_batches(path: str, position: Dict[str, int]) -> Iterator[Any]:
+    """Yield (batch, position after it) for data past position in a scores file."""
+    position = dict(position)
+    if os.path.isdir(path):
+        parts: List[str] = sorted(name for name in os.listdir(path) if name.startswith('part-'))
+        if len(parts) < position['parts']:
+            raise ValueError(f"{path} has fewer parts than already ingested; rebuild the rollups")
+        for name in parts[position['parts']:]:
+            position['parts'] += 1
+            yield pd.read_parquet(os.path.join(path, name)), dict(position)
+        return
+
+    size = os.path.getsize(path)
+    if size < position['bytes']:
+        raise ValueError(f"{path} is shorter than already ingested; rebuild the rollups")
+    with open(path, 'rb') as f:
+        header = f.readline()
+        if position['bytes'] == 0:
+            position['bytes'] = f.tell()
+        names = pd.read_csv(io.BytesIO(header), nrows=0).columns
+        f.seek(position['bytes'])
+        carry = b''
+        while True:
+            block = f.read(READ_BLOCK_BYTES)
+            if not block:
+                break
+            data = carry + block
+            end = data.rfind(b'\n') + 1
+            # Only complete lines are ingested; a partly written last line waits for the next refresh
+            carry = data[end:]
+            if end == 0:
+                continue
+            batch = pd.read_csv(io.BytesIO(data[:end]), names=names, header=None,
+                                keep_default_na=False, na_values=[''])
+            position['bytes'] += end
+            yield batch, dict(position)
+
+
+def refresh_rollups(scores_path: str, store_path: str = 'data/rollups/rollups.pkl',
+                    rebuild: bool = False) -> RollupStore:
+    """Load (or, with rebuild, reset) the rollup store and fold in new scores."""
+    store = RollupStore(store_path) if rebuild else RollupStore.load(store_path)
+    store.refresh(scores_path)
+    return store
+
+
+def load_rollup_tables(store_path: str = 'data/rollups/rollups.pkl') -> Optional[Dict[str, Any]]:
+    """
+    Rollup tables with rates and overall totals, for the dashboard.
+
+    Returns:
+        Dict with 'totals' and one DataFrame per dimension, or None when no
+        store has been built yet.
+    """
+    if not os.path.exists(store_path):
+        return None
+    store = RollupStore.load(store_path)
+    return {'totals': store.totals(), **{dim: store.table(dim) for dim in DIMENSIONS}}
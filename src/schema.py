@@ -0,0 +1,111 @@
+import json
+import logging
+import os
+import resource
+from typing import Any, Dict, List
+
+import pandas as pd
+
+# Declared column types for the raw CSVs. Repeated strings load as
+# categoricals and integers at the narrowest width that fits the data.
+# Integers are read as nullable types so rows with missing values reach
+# clean_data, which narrows them to NumPy dtypes (see numpy_integers).
+FRAUD_DTYPES = {
+    'user_id': 'Int32',
+    'purchase_value': 'Int32',
+    'device_id': 'category',
+    'source': 'category',
+    'browser': 'category',
+    'sex': 'category',
+    'age': 'Int8',
+    # Float-encoded IPv4; float32 cannot hold 32-bit addresses exactly
+    'ip_address': 'float64',
+    'class': 'Int8',
+}
+FRAUD_DATETIME_COLS = ['signup_time', 'purchase_time']
+
+IP_DTYPES = {
+    'lower_bound_ip_address': 'float64',
+    'upper_bound_ip_address': 'int64',
+    'country': 'category',
+}
+
+# Columns only needed to derive others; dropped once they have been used
+MERGE_ONLY_COLS = {
+    'signup_time': 'create_time_features',
+}
+
+
+def read_fraud_csv(path: str, **kwargs) -> Any:
+    """
+    Read Fraud_Data.csv with the declared dtypes and parsed timestamps.
+
+    Extra keyword arguments go to pd.read_csv (e.g. chunksize, which
+    returns an iterator of typed chunks).
+    """
+    return pd.read_csv(path, dtype=FRAUD_DTYPES, parse_dates=FRAUD_DATETIME_COLS, **kwargs)
+
+
+def read_ip_csv(path: str) -> pd.DataFrame:
+    """Read IpAddress_to_Country.csv with the declared dtypes."""
+    return pd.read_csv(path, dtype=IP_DTYPES)
+
+
+def numpy_integers(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convert nullable integer columns (as read by read_fraud_csv) to NumPy
+    dtypes: the same width when no value is missing, float64 with NaN
+    otherwise (what pd.read_csv gives an integer column with gaps).
+    """
+    for col in df.columns:
+        dtype = df[col].dtype
+        if isinstance(dtype, pd.api.extensions.ExtensionDtype) and pd.api.types.is_integer_dtype(dtype):
+            df[col] = df[col].astype('float64' if df[col].isna().any() else dtype.numpy_dtype)
+    return df
+
+
+def drop_merge_only(df: pd.DataFrame, after_stage: str) -> pd.DataFrame:
+    """Drop the columns whose last consumer is after_stage."""
+    cols = [c for c, stage in MERGE_ONLY_COLS.items() if stage == after_stage and c in df.columns]
+    return df.drop(columns=cols) if cols else df
+
+
+def frame_memory_mb(df: pd.DataFrame) -> float:
+    """Deep memory usage of a frame (strings and categories included), in MB."""
+    return float(df.memory_usage(deep=True).sum()) / 1024 ** 2
+
+
+class MemoryReport:
+    """
+    Frame size and process peak RSS after each pipeline stage.
+
+    Frame memory is measured with memory_usage(deep=True), so object
+    columns are charged for their Python strings.
+    """
+
+    def __init__(self):
+        self.stages: List[Dict[str, Any]] = []
+
+    def record(self, stage: str, df: pd.DataFrame) -> pd.DataFrame:
+        """Record df's footprint after stage and return df unchanged."""
+        entry = {
+            'stage': stage,
+            'rows': int(len(df)),
+            'columns': int(df.shape[1]),
+            'frame_mb': round(frame_memory_mb(df), 2),
+            # ru_maxrss is reported in KB on Linux
+            'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+            'dtypes': {str(k): int(v) for k, v in df.dtypes.astype(str).value_counts().items()},
+        }
+        self.stages.append(entry)
+        logging.info(f"Memory after {stage}: {entry['frame_mb']} MB frame, {entry['peak_rss_mb']} MB peak RSS")
+        return df
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(self.stages, f, indent=2)
+        logging.info(f"Memory report saved to {path}")
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame([{k: v for k, v in s.items() if k != 'dtypes'} for s in self.stages])
@@ -0,0 +1,375 @@
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+
+# Bump when the store layout changes
+STORE_VERSION = 2
+
+# (label, predicted) for the local case explanations
+CASES = {'True_Positive': (1, 1), 'False_Positive': (0, 1), 'False_Negative': (1, 0)}
+
+# Raw little-endian arrays next to meta.json, opened with np.memmap. Unlike
+# .npy files they can be appended to while the row count is still unknown.
+ARRAYS = {'data': np.float32, 'values': np.float32, 'row_ids': np.int64,
+          'probabilities': np.float32, 'predictions': np.int8, 'labels': np.int8}
+
+# Per-process explainer state, set once by _init_worker
+_WORKER: Dict[str, Any] = {}
+
+
+def _array_path(store_dir: str, name: str) -> str:
+    return os.path.join(store_dir, f'{name}.bin')
+
+
+def _open(store_dir: str, name: str, shape: Tuple[int, ...], mode: str = 'r') -> np.ndarray:
+    if shape[0] == 0:
+        return np.empty(shape, dtype=ARRAYS[name])
+    return np.memmap(_array_path(store_dir, name), dtype=ARRAYS[name], mode=mode, shape=shape)
+
+
+def _init_worker(model: Any, class_index: int) -> None:
+    """Build the TreeExplainer once per worker process."""
+    import shap
+    _WORKER['model'] = model
+    _WORKER['explainer'] = shap.TreeExplainer(model)
+    _WORKER['class_index'] = class_index
+
+
+def explain_chunk(store_dir: str, start: int, stop: int, n_features: int, n_rows: int) -> Tuple[int, float]:
+    """
+    Compute SHAP values, fraud probabilities and predicted labels for rows [start, stop) of a store.
+
+    Runs in worker processes: features are read from the memory-mapped data
+    file and results are written straight into the shared output files, so
+    only the row range crosses the process boundary.
+
+    Returns:
+        Tuple of (start, base value of the explained class).
+    """
+    model, explainer, class_index = _WORKER['model'], _WORKER['explainer'], _WORKER['class_index']
+    X = np.asarray(_open(store_dir, 'data', (n_rows, n_features))[start:stop], dtype=np.float64)
+    frame = pd.DataFrame(X, columns=model.feature_names_in_) if hasattr(model, 'feature_names_in_') else X
+    values = explainer.shap_values(frame, check_additivity=False)
+    if isinstance(values, list):
+        values = values[class_index]
+    elif values.ndim == 3:
+        values = values[:, :, class_index]
+
+    out = _open(store_dir, 'values', (n_rows, n_features), mode='r+')
+    out[start:stop] = values
+    out.flush()
+    proba = model.predict_proba(frame)
+    probabilities = _open(store_dir, 'probabilities', (n_rows,), mode='r+')
+    probabilities[start:stop] = proba[:, class_index]
+    probabilities.flush()
+    # Labels as serving assigns them (argmax, so a 0.5 tie is class 0), from the full-precision scores
+    predictions = _open(store_dir, 'predictions', (n_rows,), mode='r+')
+    predictions[start:stop] = np.asarray(model.classes_)[np.argmax(proba, axis=1)]
+    predictions.flush()
+
+    base_value = np.ravel(explainer.expected_value)
+    return start, float(base_value[class_index] if len(base_value) > 1 else base_value[0])
+
+
+class ShapStore:
+    """
+    Population SHAP values on disk: one row of attributions per explained
+    transaction, with its feature values, row id, fraud probability,
+    predicted label and (when known) true label, all memory-mapped read-only.
+
+    Global plots and the dashboard aggregate over the full population from
+    here, and local case explanations are gathered from it by position,
+    so nothing is recomputed after the offline job.
+    """
+
+    def __init__(self, store_dir: str):
+        self.store_dir = store_dir
+        with open(os.path.join(store_dir, 'meta.json')) as f:
+            self.meta = json.load(f)
+        if self.meta.get('version') != STORE_VERSION:
+            raise ValueError(f"SHAP store {store_dir} has layout version {self.meta.get('version')}; "
+                             f"rerun the explanation job to rebuild it")
+        if not self.meta.get('complete'):
+            raise ValueError(f"SHAP store {store_dir} is incomplete; rerun the explanation job to finish it")
+        n, f = self.meta['n_rows'], len(self.meta['feature_names'])
+        self.data = _open(store_dir, 'data', (n, f))
+        self.values = _open(store_dir, 'values', (n, f))
+        self.row_ids = _open(store_dir, 'row_ids', (n,))
+        self.probabilities = _open(store_dir, 'probabilities', (n,))
+        self.predictions = _open(store_dir, 'predictions', (n,))
+        self.labels = _open(store_dir, 'labels', (n,)) if self.meta['has_labels'] else None
+
+    def __len__(self) -> int:
+        return self.meta['n_rows']
+
+    @property
+    def feature_names(self) -> List[str]:
+        return self.meta['feature_names']
+
+    @property
+    def base_value(self) -> float:
+        return self.meta['base_value']
+
+    def mean_abs(self, block_rows: int = 100_000) -> pd.Series:
+        """Mean |SHAP| per feature over every stored row, read block by block."""
+        total = np.zeros(len(self.feature_names))
+        for start in range(0, len(self), block_rows):
+            total += np.abs(self.values[start:start + block_rows]).sum(axis=0, dtype=np.float64)
+        return pd.Series(total / max(len(self), 1), index=self.feature_names).sort_values(ascending=False)
+
+    def find_cases(self) -> Dict[str, int]:
+        """
+        Store position of the first true positive, false positive and false negative.
+
+        One vectorized pass over the true and the stored predicted labels
+        (assigned like serving does, not by thresholding the float32
+        probabilities); cases with no matching row are left out.
+        """
+        if self.labels is None:
+            raise ValueError("SHAP store has no labels; cases need the true class")
+        predicted = np.asarray(self.predictions)
+        labels = np.asarray(self.labels)
+        cases = {}
+        for name, (label, prediction) in CASES.items():
+            hits = np.flatnonzero((labels == label) & (predicted == prediction))
+            if len(hits):
+                cases[name] = int(hits[0])
+        return cases
+
+    def explanation(self, positions: Sequence[int]) -> Any:
+        """shap.Explanation for the given store positions (one gather from the memmaps)."""
+        import shap
+        positions = np.asarray(positions)
+        return shap.Explanation(values=np.asarray(self.values[positions], dtype=np.float64),
+                                base_values=np.full(len(positions), self.base_value),
+                                data=np.asarray(self.data[positions], dtype=np.float64),
+                                feature_names=self.feature_names)
+
+    def sample(self, n: int, seed: int = 42) -> np.ndarray:
+        """Sorted random store positions, e.g. for plots that cannot show every row."""
+        if n >= len(self):
+            return np.arange(len(self))
+        return np.sort(np.random.default_rng(seed).choice(len(self), n, replace=False))
+
+
+class _StoreWriter:
+    """Appends feature rows, row ids and labels to a new store, then records its shape."""
+
+    def __init__(self, store_dir: str, feature_names: Sequence[str], settings: Dict[str, Any]):
+        self.store_dir = store_dir
+        os.makedirs(store_dir, exist_ok=True)
+        # Until close() writes new metadata, the directory holds no usable store
+        if os.path.exists(os.path.join(store_dir, 'meta.json')):
+            os.remove(os.path.join(store_dir, 'meta.json'))
+        self.meta = {'version': STORE_VERSION, 'settings': settings, 'feature_names': list(feature_names),
+                     'n_rows': 0, 'has_labels': False, 'chunks_done': [], 'base_value': None, 'complete': False}
+        self._files = {name: open(_array_path(store_dir, name), 'wb') for name in ('data', 'row_ids', 'labels')}
+
+    def append(self, X: np.ndarray, row_ids: np.ndarray, labels: Optional[np.ndarray]) -> None:
+        self._files['data'].write(np.ascontiguousarray(X, dtype=ARRAYS['data']).tobytes())
+        self._files['row_ids'].write(np.asarray(row_ids, dtype=ARRAYS['row_ids']).tobytes())
+        if labels is not None:
+            self.meta['has_labels'] = True
+            self._files['labels'].write(np.asarray(labels, dtype=ARRAYS['labels']).tobytes())
+        self.meta['n_rows'] += len(X)
+
+    def close(self) -> Dict[str, Any]:
+        for f in self._files.values():
+            f.close()
+        n, f = self.meta['n_rows'], len(self.meta['feature_names'])
+        # Outputs are preallocated so workers can write their row ranges in place
+        for name, shape in (('values', (n, f)), ('probabilities', (n,)), ('predictions', (n,))):
+            with open(_array_path(self.store_dir, name), 'wb') as out:
+                out.truncate(int(np.prod(shape)) * np.dtype(ARRAYS[name]).itemsize)
+        _save_meta(self.store_dir, self.meta)
+        return self.meta
+
+
+def _save_meta(store_dir: str, meta: Dict[str, Any]) -> None:
+    path = os.path.join(store_dir, 'meta.json')
+    with open(path + '.tmp', 'w') as f:
+        json.dump(meta, f)
+    os.replace(path + '.tmp', path)
+
+
+def _load_meta(store_dir: str, settings: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Saved metadata when the store was built with the same settings, else None."""
+    path = os.path.join(store_dir, 'meta.json')
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        meta = json.load(f)
+    if meta.get('version') != STORE_VERSION or meta.get('settings') != settings:
+        logging.info(f"SHAP store {store_dir} was built with a different model or input; recomputing")
+        return None
+    return meta
+
+
+def _explain_store(store_dir: str, meta: Dict[str, Any], model: Any, chunksize: int,
+                   n_jobs: Optional[int]) -> Dict[str, Any]:
+    """Fill in the SHAP values of every chunk not yet recorded in meta['chunks_done']."""
+    from src.model_search import _single_threaded
+
+    n_rows, n_features = meta['n_rows'], len(meta['feature_names'])
+    done = set(meta['chunks_done'])
+    todo = [start for start in range(0, n_rows, chunksize) if start not in done]
+    class_index = list(model.classes_).index(1)
+    n_jobs = min(n_jobs or os.cpu_count() or 1, max(len(todo), 1))
+    if todo:
+        logging.info(f"Explaining {n_rows} rows in {len(todo)} chunks "
+                     f"({len(done)} already done) with {n_jobs} processes")
+    start_time = time.perf_counter()
+
+    def record(start: int, base_value: float) -> None:
+        meta['chunks_done'].append(start)
+        meta['base_value'] = base_value
+        # Checkpoint after every chunk, so an interrupted job resumes here
+        _save_meta(store_dir, meta)
+
+    if n_jobs == 1:
+        _init_worker(model, class_index)
+        for start in todo:
+            record(*explain_chunk(store_dir, start, min(start + chunksize, n_rows), n_features, n_rows))
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker,
+                                 initargs=(_single_threaded(model, fitted=True), class_index)) as pool:
+            futures = [pool.submit(explain_chunk, store_dir, start, min(start + chunksize, n_rows),
+                                   n_features, n_rows) for start in todo]
+            for future in as_completed(futures):
+                record(*future.result())
+
+    meta['complete'] = True
+    _save_meta(store_dir, meta)
+    if todo:
+        seconds = time.perf_counter() - start_time
+        logging.info(f"SHAP store written to {store_dir} in {seconds:.1f}s")
+    return meta
+
+
+def _settings(model: Any, source: str, chunksize: int) -> Dict[str, Any]:
+    return {'model': joblib.hash(model), 'source': source, 'chunksize': chunksize}
+
+
+def explain_frame(model: Any, X: pd.DataFrame, store_dir: str = 'reports/shap/holdout',
+                  y: Optional[pd.Series] = None, chunksize: int = 2000, n_jobs: Optional[int] = None,
+                  resume: bool = True) -> ShapStore:
+    """
+    Compute TreeExplainer values for every row of X into an on-disk store.
+
+    Rows are split into chunks of chunksize, explained across a process
+    pool whose workers build the explainer once, and written in place into
+    memory-mapped output files. Row ids are taken from X.index. Completed
+    chunks are checkpointed, so an interrupted job continues where it
+    stopped when rerun with the same model and data.
+
+    Args:
+        model: Fitted tree ensemble (RandomForestClassifier or similar).
+        X: Model-ready features, in the model's feature order.
+        store_dir: Directory of the store.
+        y: True labels, stored for TP/FP/FN case lookup.
+        chunksize: Rows per task.
+        n_jobs: Worker processes (default: all cores; 1 explains in-process).
+        resume: Reuse completed chunks of an existing store with the same settings.
+
+    Returns:
+        ShapStore: The completed store.
+    """
+    source = joblib.hash((X.index.to_numpy(), X.to_numpy(), None if y is None else np.asarray(y)))
+    settings = _settings(model, source, chunksize)
+    meta = _load_meta(store_dir, settings) if resume else None
+    if meta is None:
+        writer = _StoreWriter(store_dir, list(X.columns), settings)
+        for start in range(0, len(X), chunksize):
+            block = X.iloc[start:start + chunksize]
+            writer.append(block.to_numpy(), block.index.to_numpy(),
+                          None if y is None else np.asarray(y)[start:start + chunksize])
+        meta = writer.close()
+    if not meta['complete']:
+        _explain_store(store_dir, meta, model, chunksize, n_jobs)
+    return ShapStore(store_dir)
+
+
+def _file_features(input_path: str, feature_names: Sequence[str], transform_path: Optional[str],
+                   ip_index_path: Optional[str], chunksize: int, velocity: bool) -> Iterator[Tuple[np.ndarray, np.ndarray, Optional[np.ndarray]]]:
+    """Model-ready (features, row ids, labels) per chunk of a transaction file, as score.py builds them."""
+    from src.bulk_scoring import prepare_features, read_chunks
+    from src.entity_links import LINK_FEATURES, EntityLinkIndex, replay_links
+    from src.feature_transform import FeatureTransform, load_feature_transform
+    from src.ip_index import IpCountryIndex
+    from src.velocity import VELOCITY_FEATURES, VelocityStore, replay_velocity
+
+    transform = load_feature_transform(transform_path) if transform_path and os.path.exists(transform_path) else None
+    transform = (transform or FeatureTransform.identity()).compile(list(feature_names))
+    ip_index = IpCountryIndex.load(ip_index_path) if ip_index_path and os.path.exists(ip_index_path) else None
+    features = set(feature_names)
+    store = VelocityStore() if velocity and features & set(VELOCITY_FEATURES) else None
+    links = EntityLinkIndex() if velocity and features & set(LINK_FEATURES) else None
+
+    first_row = 0
+    for chunk in read_chunks(input_path, chunksize):
+        if store is not None and 'purchase_time' in chunk.columns:
+            velocity_frame = replay_velocity(chunk, store)
+            chunk[velocity_frame.columns] = velocity_frame
+        if links is not None:
+            link_frame = replay_links(chunk, links)
+            chunk[link_frame.columns] = link_frame
+        chunk = prepare_features(chunk, ip_index)
+        X, valid = transform.transform_frame(chunk)
+        rows = np.arange(first_row, first_row + len(chunk))
+        labels = chunk['class'].to_numpy()[valid] if 'class' in chunk.columns else None
+        first_row += len(chunk)
+        yield X[valid], rows[valid], labels
+
+
+def explain_file(input_path: str, store_dir: str, model_path: str = 'models/random_forest_model.pkl',
+                 transform_path: Optional[str] = 'models/feature_transform.pkl',
+                 ip_index_path: Optional[str] = 'models/ip_country_index.npz',
+                 chunksize: int = 2000, read_chunksize: int = 200_000, n_jobs: Optional[int] = None,
+                 velocity: bool = True, resume: bool = True) -> ShapStore:
+    """
+    Compute TreeExplainer values for every transaction in a CSV or Parquet file.
+
+    Features are built chunk by chunk with the same steps as score.py and
+    appended to the store; row ids are input row numbers (the `row` column
+    of score.py output), and rows whose features cannot be built are left
+    out. The SHAP values are then computed as in explain_frame.
+
+    Args:
+        input_path: CSV or Parquet transactions file (a `class` column, if present, is stored as labels).
+        store_dir: Directory of the store.
+        model_path: Pickled sklearn forest (TreeExplainer needs the fitted trees, not the compiled arrays).
+        transform_path, ip_index_path: Artifacts saved by main.py.
+        chunksize: Rows per SHAP task.
+        read_chunksize: Rows per chunk when reading the input.
+        n_jobs: Worker processes (default: all cores).
+        velocity: Replay velocity and entity-link features (file in purchase_time order).
+        resume: Reuse completed chunks of an existing store with the same settings.
+
+    Returns:
+        ShapStore: The completed store.
+    """
+    model = joblib.load(model_path)
+    stat = os.stat(input_path)
+    from src.bulk_scoring import _file_digest
+
+    # The stored features depend on the transform and the velocity replay too
+    settings = {**_settings(model, f'{os.path.abspath(input_path)}:{stat.st_size}:{int(stat.st_mtime)}', chunksize),
+                'feature_transform': _file_digest(transform_path), 'velocity': velocity}
+    meta = _load_meta(store_dir, settings) if resume else None
+    if meta is None:
+        feature_names = list(model.feature_names_in_)
+        writer = _StoreWriter(store_dir, feature_names, settings)
+        for X, rows, labels in _file_features(input_path, feature_names, transform_path, ip_index_path,
+                                              read_chunksize, velocity):
+            writer.append(X, rows, labels)
+        meta = writer.close()
+    if not meta['complete']:
+        _explain_store(store_dir, meta, model, chunksize, n_jobs)
+    return ShapStore(store_dir)
@@ -0,0 +1,166 @@
+import hashlib
+import inspect
+import logging
+import os
+import shutil
+import sys
+import time
+from typing import Any, Callable, Iterable, List, Optional, Tuple
+
+import joblib
+import pandas as pd
+
+# Bump to invalidate every cached stage (e.g. after changing the key scheme)
+CACHE_VERSION = 1
+
+
+def fingerprint(value: Any) -> str:
+    """
+    Content hash of a stage input.
+
+    DataFrames and Series are hashed row-wise with pandas' vectorized hasher
+    (plus column names and dtypes); everything else goes through joblib.hash,
+    which handles NumPy arrays and fitted estimators efficiently.
+    """
+    if isinstance(value, pd.DataFrame):
+        h = hashlib.sha256()
+        h.update(repr((list(value.columns), [str(t) for t in value.dtypes])).encode())
+        h.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+        return h.hexdigest()
+    if isinstance(value, pd.Series):
+        h = hashlib.sha256()
+        h.update(repr((value.name, str(value.dtype))).encode())
+        h.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+        return h.hexdigest()
+    if isinstance(value, (list, tuple)):
+        return hashlib.sha256(repr([fingerprint(v) for v in value]).encode()).hexdigest()
+    return joblib.hash(value)
+
+
+def code_version(func: Callable) -> str:
+    """
+    Hash of the source of func's module and of the src.* modules it imports
+    names from, so editing a stage (or a helper it relies on) busts its cache.
+    """
+    module = inspect.getmodule(func)
+    modules = {module}
+    for obj in vars(module).values():
+        dep = inspect.getmodule(obj) if not inspect.ismodule(obj) else obj
+        if dep is not None and getattr(dep, '__name__', '').startswith('src.'):
+            modules.add(dep)
+
+    h = hashlib.sha256(str(CACHE_VERSION).encode())
+    for mod in sorted(modules, key=lambda m: m.__name__):
+        try:
+            h.update(inspect.getsource(mod).encode())
+        except (OSError, TypeError):
+            h.update(mod.__name__.encode())
+    h.update(func.__qualname__.encode())
+    return h.hexdigest()
+
+
+class StageCache:
+    """
+    Content-addressed cache for pipeline stages.
+
+    A stage's key hashes its name, its code version, its inputs and its
+    keyword parameters; outputs are stored with joblib under cache_dir.
+    Least recently used entries are evicted once the directory exceeds
+    max_bytes. Stages named in `force` (or all stages, with 'all') are
+    recomputed and their cache entry overwritten.
+    """
+
+    def __init__(self, cache_dir: str = '.cache/stages', max_bytes: int = 2 * 1024 ** 3,
+                 force: Iterable[str] = (), enabled: bool = True):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.force = set(force)
+        self.enabled = enabled
+        self.hits: List[str] = []
+        self.misses: List[str] = []
+        if enabled:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, stage: str, func: Callable, args: Tuple, kwargs: dict) -> str:
+        """Cache key for one stage invocation."""
+        parts = [stage, code_version(func), repr(sys.version_info[:2])]
+        parts += [fingerprint(a) for a in args]
+        parts += [f"{k}={fingerprint(v)}" for k, v in sorted(kwargs.items())]
+        return hashlib.sha256('|'.join(parts).encode()).hexdigest()[:32]
+
+    def run(self, stage: str, func: Callable, *args, **kwargs) -> Any:
+        """Return func(*args, **kwargs), from cache when the key matches."""
+        if not self.enabled:
+            return func(*args, **kwargs)
+
+        start = time.perf_counter()
+        path = os.path.join(self.cache_dir, f"{stage}-{self.key(stage, func, args, kwargs)}.pkl")
+        forced = stage in self.force or 'all' in self.force
+
+        if not forced and os.path.exists(path):
+            try:
+                result = joblib.load(path)
+                os.utime(path)  # mark as recently used
+                self.hits.append(stage)
+                logging.info(f"Stage cache hit: {stage} ({time.perf_counter() - start:.2f}s)")
+                return result
+            except Exception as e:
+                logging.warning(f"Discarding unreadable cache entry {path}: {e}")
+                os.remove(path)
+
+        result = func(*args, **kwargs)
+        self.misses.append(stage)
+
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        joblib.dump(result, tmp_path)
+        os.replace(tmp_path, path)
+        logging.info(f"Stage {'forced' if forced else 'computed'}: {stage} "
+                     f"({time.perf_counter() - start:.2f}s, cached to {path})")
+        self.evict(keep=path)
+        return result
+
+    def evict(self, keep: Optional[str] = None) -> None:
+        """Delete least recently used entries until the cache fits in max_bytes (never `keep`)."""
+        evict_lru(self.cache_dir, self.max_bytes, keep=keep)
+
+
+def _disk_size(path: str) -> int:
+    if not os.path.isdir(path):
+        return os.stat(path).st_size
+    return sum(os.stat(os.path.join(root, name)).st_size
+               for root, _, files in os.walk(path) for name in files)
+
+
+def evict_lru(directory: str, max_bytes: int, suffix: str = '.pkl', keep: Optional[str] = None) -> None:
+    """
+    Delete the least recently used (oldest mtime) entries of directory whose
+    names end in suffix until their total size fits in max_bytes. Entries
+    may be files or directories (deleted with their contents).
+
+    keep, usually the entry that was just written, is never deleted; a
+    warning is logged when it alone exceeds the budget.
+    """
+    entries = []
+    for name in os.listdir(directory):
+        if name.endswith(suffix):
+            full = os.path.join(directory, name)
+            try:
+                entries.append((os.stat(full).st_mtime, _disk_size(full), full))
+            except FileNotFoundError:
+                continue
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, full in sorted(entries):
+        if total <= max_bytes:
+            break
+        if keep is not None and os.path.samefile(full, keep):
+            if size > max_bytes:
+                logging.warning(f"Cache entry {full} ({size / 1024 ** 2:.1f} MB) alone exceeds the "
+                                f"{max_bytes / 1024 ** 2:.1f} MB budget; keeping it")
+            continue
+        if os.path.isdir(full):
+            shutil.rmtree(full, ignore_errors=True)
+        else:
+            os.remove(full)
+        total -= size
+        logging.info(f"Evicted cache entry {full}")
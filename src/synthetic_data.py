@@ -0,0 +1,165 @@
+import logging
+import os
+from typing import Dict, Iterator, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Rows are generated in fixed blocks, each seeded by (seed, block index), so
+# the data for a given seed does not depend on how it is written or chunked
+BLOCK_ROWS = 100_000
+
+# Category shares observed in Fraud_Data.csv
+SOURCES = {'SEO': 0.40, 'Ads': 0.40, 'Direct': 0.20}
+BROWSERS = {'Chrome': 0.41, 'IE': 0.24, 'Safari': 0.16, 'FireFox': 0.16, 'Opera': 0.03}
+SEXES = {'M': 0.58, 'F': 0.42}
+
+SIGNUP_START = pd.Timestamp('2015-01-01')
+SIGNUP_SPAN_S = 230 * 86400
+DEVICE_ID_LEN = 13
+# Fraudulent transactions share devices and IPs in rings of about this many rows
+RING_SIZE = 8
+IP_SPACE = 2 ** 32
+
+
+def generate_ip_ranges(n_ranges: int = 138_846, n_countries: int = 235, seed: int = 0) -> pd.DataFrame:
+    """
+    IP-range-to-country table with the IpAddress_to_Country.csv schema.
+
+    Ranges are sorted, non-overlapping and separated by small gaps (unmapped
+    addresses), with a skewed country distribution like the real table.
+    """
+    rng = np.random.default_rng([seed, 1])
+    # Roughly 90% of the address space is covered by a range
+    widths = rng.pareto(1.2, n_ranges) + 1.0
+    widths = widths / widths.mean() * 0.9
+    gaps = rng.random(n_ranges) * 0.2
+    scale = (IP_SPACE - 1) / (widths.sum() + gaps.sum())
+    widths, gaps = widths * scale, gaps * scale
+    starts = np.floor(np.cumsum(widths + gaps) - widths).astype(np.int64)
+    ends = np.maximum(starts, np.floor(starts + widths).astype(np.int64) - 1)
+
+    weights = 1.0 / np.arange(1, n_countries + 1)
+    countries = np.array([f'Country_{i:03d}' for i in range(n_countries)], dtype=object)
+    countries[:5] = ['United States', 'China', 'Japan', 'United Kingdom', 'Korea Republic of']
+    return pd.DataFrame({
+        'lower_bound_ip_address': starts.astype(np.float64),
+        'upper_bound_ip_address': ends,
+        'country': countries[rng.choice(n_countries, n_ranges, p=weights / weights.sum())],
+    })
+
+
+def _choice(rng: np.random.Generator, shares: Dict[str, float], n: int) -> np.ndarray:
+    p = np.array(list(shares.values()))
+    return np.array(list(shares))[rng.choice(len(shares), n, p=p / p.sum())]
+
+
+def _device_ids(codes: np.ndarray) -> np.ndarray:
+    """Deterministic 13-letter upper-case device ids from non-negative integers."""
+    codes = codes.astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15) + np.uint64(1)  # scatter neighbours
+    letters = np.empty((len(codes), DEVICE_ID_LEN), dtype=np.uint8)
+    for i in range(DEVICE_ID_LEN):
+        letters[:, i] = (codes % np.uint64(26)).astype(np.uint8) + ord('A')
+        codes //= np.uint64(26)
+    return letters.view(f'S{DEVICE_ID_LEN}').ravel().astype(str)
+
+
+def _user_ids(rows: np.ndarray, n_rows: int, seed: int) -> np.ndarray:
+    """Unique user ids (one transaction per user, as in Fraud_Data.csv) in scrambled order."""
+    modulus = 1 << max(int(np.ceil(np.log2(max(n_rows, 2) * 2))), 20)
+    # Odd multiplier: a bijection modulo a power of two
+    return ((rows * 2654435761 + seed * 7919) % modulus + 1).astype(np.int64)
+
+
+def _block(index: int, start: int, n: int, n_rows: int, fraud_rate: float, seed: int,
+           ip_lower: np.ndarray, ip_upper: np.ndarray) -> pd.DataFrame:
+    rng = np.random.default_rng([seed, 2, index])
+    rows = np.arange(start, start + n, dtype=np.int64)
+    fraud = rng.random(n) < fraud_rate
+
+    # Legitimate users mostly have their own device and IP; fraud rings share them
+    n_rings = max(1, int(n_rows * fraud_rate / RING_SIZE))
+    ring = rng.integers(0, n_rings, n)
+    device_code = np.where(fraud, n_rows + ring, rng.integers(0, max(1, int(n_rows * 0.9)), n))
+    hit = rng.integers(0, len(ip_lower), n)
+    legit_ip = ip_lower[hit] + rng.random(n) * (ip_upper[hit] - ip_lower[hit] + 1)
+    ring_rng = np.random.default_rng([seed, 3])
+    ring_ips = ring_rng.random(n_rings) * IP_SPACE
+    ip = np.where(fraud, ring_ips[ring], legit_ip)
+
+    signup_s = rng.integers(0, SIGNUP_SPAN_S, n)
+    # Half of the fraud purchases happen one second after signup; the rest soon after
+    fraud_lag = np.where(rng.random(n) < 0.5, 1, rng.exponential(3 * 86400, n).astype(np.int64) + 1)
+    legit_lag = rng.integers(60, 120 * 86400, n)
+    lag_s = np.where(fraud, fraud_lag, legit_lag)
+
+    return pd.DataFrame({
+        'user_id': _user_ids(rows, n_rows, seed),
+        'signup_time': SIGNUP_START + pd.to_timedelta(signup_s, unit='s'),
+        'purchase_time': SIGNUP_START + pd.to_timedelta(signup_s + lag_s, unit='s'),
+        'purchase_value': np.clip(rng.gamma(3.0, 12.3, n).astype(np.int64) + 9, 9, 154),
+        'device_id': _device_ids(device_code),
+        'source': _choice(rng, SOURCES, n),
+        'browser': _choice(rng, BROWSERS, n),
+        'sex': _choice(rng, SEXES, n),
+        'age': np.clip(rng.normal(33.1, 8.6, n).round(), 18, 76).astype(np.int64),
+        'ip_address': ip,
+        'class': fraud.astype(np.int64),
+    })
+
+
+def iter_fraud_blocks(n_rows: int, fraud_rate: float = 0.094, seed: int = 0,
+                      ip_ranges: Optional[pd.DataFrame] = None) -> Iterator[pd.DataFrame]:
+    """Yield the synthetic transactions BLOCK_ROWS rows at a time."""
+    if not 0.0 <= fraud_rate <= 1.0:
+        raise ValueError(f"fraud_rate must be between 0 and 1, got {fraud_rate}")
+    ip_ranges = ip_ranges if ip_ranges is not None else generate_ip_ranges(seed=seed)
+    lower = ip_ranges['lower_bound_ip_address'].to_numpy(dtype=np.float64)
+    upper = ip_ranges['upper_bound_ip_address'].to_numpy(dtype=np.float64)
+    for index, start in enumerate(range(0, n_rows, BLOCK_ROWS)):
+        yield _block(index, start, min(BLOCK_ROWS, n_rows - start), n_rows, fraud_rate, seed, lower, upper)
+
+
+def generate_fraud_data(n_rows: int, fraud_rate: float = 0.094, seed: int = 0,
+                        ip_ranges: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """
+    Seeded synthetic transactions with the Fraud_Data.csv schema.
+
+    One transaction per user; devices and IPs of fraudulent rows are
+    shared within small rings and their purchases follow signup closely,
+    so the engineered features carry signal like the real data.
+
+    Args:
+        n_rows: Number of transactions.
+        fraud_rate: Expected share of rows with class 1.
+        seed: Same seed, same rows, regardless of how they are written.
+        ip_ranges: Table from generate_ip_ranges (generated from seed when omitted).
+    """
+    return pd.concat(list(iter_fraud_blocks(n_rows, fraud_rate, seed, ip_ranges)), ignore_index=True)
+
+
+def write_dataset(out_dir: str, n_rows: int, fraud_rate: float = 0.094, seed: int = 0,
+                  n_ranges: int = 138_846) -> Tuple[str, str]:
+    """
+    Write Fraud_Data.csv and IpAddress_to_Country.csv to out_dir.
+
+    Transactions are streamed to disk block by block, so sizes up to tens
+    of millions of rows never need to fit in memory at once.
+
+    Returns:
+        Tuple of (fraud CSV path, IP CSV path).
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    fraud_path = os.path.join(out_dir, 'Fraud_Data.csv')
+    ip_path = os.path.join(out_dir, 'IpAddress_to_Country.csv')
+    ip_ranges = generate_ip_ranges(n_ranges, seed=seed)
+    ip_ranges.to_csv(ip_path, index=False)
+
+    tmp = fraud_path + '.tmp'
+    with open(tmp, 'w', newline='') as f:
+        for i, block in enumerate(iter_fraud_blocks(n_rows, fraud_rate, seed, ip_ranges)):
+            block.to_csv(f, header=i == 0, index=False, date_format='%Y-%m-%d %H:%M:%S')
+    os.replace(tmp, fraud_path)
+    logging.info(f"Synthetic dataset written to {out_dir}: {n_rows} transactions "
+                 f"(fraud rate {fraud_rate}), {len(ip_ranges)} IP ranges")
+    return fraud_path, ip_path
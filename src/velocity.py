@@ -0,0 +1,213 @@
+import logging
+import threading
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+# pandas is only needed for the training replay; live updates stay pandas-free
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Entity columns tracked by the store, and their feature-name prefixes
+ENTITIES: Dict[str, str] = {'user_id': 'user', 'device_id': 'device', 'ip_address': 'ip'}
+
+# Sliding windows as (suffix, seconds)
+DEFAULT_WINDOWS: Tuple[Tuple[str, int], ...] = (('1h', 3600), ('24h', 86400), ('7d', 604800))
+
+# Value of *_secs_since_last when the key has no earlier transaction in the store
+NO_PREVIOUS = -1.0
+
+
+def velocity_feature_names(windows: Sequence[Tuple[str, int]] = DEFAULT_WINDOWS) -> List[str]:
+    """Feature columns produced by VelocityStore.update, in a stable order."""
+    names = []
+    for prefix in ENTITIES.values():
+        names += [f'{prefix}_txn_{suffix}' for suffix, _ in windows]
+        names.append(f'{prefix}_secs_since_last')
+    return names
+
+
+VELOCITY_FEATURES = velocity_feature_names()
+
+
+class _KeyState:
+    """Time-bucketed counters for one entity value."""
+    __slots__ = ('last_ts', 'buckets', 'totals')
+
+    def __init__(self, n_windows: int):
+        self.last_ts: Optional[float] = None
+        self.buckets = [deque() for _ in range(n_windows)]
+        self.totals = [0] * n_windows
+
+
+class VelocityStore:
+    """
+    Incremental per-entity transaction counters over sliding windows.
+
+    Each window is split into a fixed number of buckets, so memory per key
+    is bounded and an update is amortised O(1). Counts are exact up to the
+    bucket width (window / buckets_per_window). Keys idle for longer than
+    the largest window (or beyond max_keys, least recently seen first) are
+    evicted.
+
+    Features describe the history *before* the event being scored, so
+    replaying training data in time order computes the same values the API
+    computes live, without looking into the future.
+    """
+
+    def __init__(self, windows: Sequence[Tuple[str, int]] = DEFAULT_WINDOWS,
+                 buckets_per_window: int = 60, max_keys: int = 1_000_000):
+        self.windows = tuple(windows)
+        self.widths = [seconds / buckets_per_window for _, seconds in self.windows]
+        self.buckets_per_window = buckets_per_window
+        self.idle_ttl = max(seconds for _, seconds in self.windows)
+        self.max_keys = max_keys
+        self.feature_names = velocity_feature_names(self.windows)
+        self._state: "OrderedDict[Tuple[str, Any], _KeyState]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._state)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def update(self, entities: Mapping[str, Any], ts: float) -> Dict[str, float]:
+        """
+        Record one transaction and return its velocity features.
+
+        Args:
+            entities: Mapping with any of user_id, device_id, ip_address.
+            ts: Event time in epoch seconds.
+
+        Returns:
+            Dict[str, float]: Counts of earlier transactions per window and
+            seconds since the previous transaction, for each entity.
+        """
+        features: Dict[str, float] = {}
+        with self._lock:
+            for column, prefix in ENTITIES.items():
+                value = entities.get(column)
+                if value is None or (isinstance(value, float) and np.isnan(value)):
+                    self._fill_missing(features, prefix)
+                    continue
+                self._update_key(features, prefix, (prefix, value), ts)
+            self._evict(ts)
+        return features
+
+    def peek(self, entities: Mapping[str, Any], ts: float) -> Dict[str, float]:
+        """Velocity features a transaction at ts would get, without recording it."""
+        features: Dict[str, float] = {}
+        with self._lock:
+            for column, prefix in ENTITIES.items():
+                value = entities.get(column)
+                state = None
+                if value is not None and not (isinstance(value, float) and np.isnan(value)):
+                    state = self._state.get((prefix, value))
+                if state is None:
+                    self._fill_missing(features, prefix)
+                    continue
+                for w, ((suffix, _), width) in enumerate(zip(self.windows, self.widths)):
+                    oldest = int(ts // width) - self.buckets_per_window
+                    features[f'{prefix}_txn_{suffix}'] = float(
+                        sum(count for bucket_id, count in state.buckets[w] if bucket_id > oldest))
+                last = state.last_ts
+                features[f'{prefix}_secs_since_last'] = NO_PREVIOUS if last is None else max(ts - last, 0.0)
+        return features
+
+    def _fill_missing(self, features: Dict[str, float], prefix: str) -> None:
+        for suffix, _ in self.windows:
+            features[f'{prefix}_txn_{suffix}'] = 0.0
+        features[f'{prefix}_secs_since_last'] = NO_PREVIOUS
+
+    def _update_key(self, features: Dict[str, float], prefix: str,
+                    key: Tuple[str, Any], ts: float) -> None:
+        state = self._state.get(key)
+        if state is None:
+            state = self._state[key] = _KeyState(len(self.windows))
+        else:
+            self._state.move_to_end(key)
+
+        for w, ((suffix, seconds), width) in enumerate(zip(self.windows, self.widths)):
+            bucket_id = int(ts // width)
+            buckets = state.buckets[w]
+            # Drop buckets that fell out of the window
+            oldest = bucket_id - self.buckets_per_window
+            while buckets and buckets[0][0] <= oldest:
+                state.totals[w] -= buckets.popleft()[1]
+
+            features[f'{prefix}_txn_{suffix}'] = float(state.totals[w])
+
+            if buckets and buckets[-1][0] >= bucket_id:
+                buckets[-1][1] += 1
+            else:
+                buckets.append([bucket_id, 1])
+            state.totals[w] += 1
+
+        last = state.last_ts
+        features[f'{prefix}_secs_since_last'] = NO_PREVIOUS if last is None else max(ts - last, 0.0)
+        state.last_ts = ts if last is None else max(ts, last)
+
+    def _evict(self, now: float) -> None:
+        """Drop keys idle past the largest window, and the oldest keys over max_keys."""
+        cutoff = now - self.idle_ttl
+        while self._state:
+            key, state = next(iter(self._state.items()))
+            if state.last_ts is not None and state.last_ts < cutoff:
+                del self._state[key]
+            else:
+                break
+        while len(self._state) > self.max_keys:
+            self._state.popitem(last=False)
+
+
+def to_epoch_seconds(value: Any) -> float:
+    """Convert a datetime, ISO string or epoch number to epoch seconds (naive = UTC)."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if isinstance(value, datetime):  # includes pd.Timestamp
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp()
+    raise ValueError(f"Unsupported timestamp: {value!r}")
+
+
+def replay_velocity(df: "pd.DataFrame", store: VelocityStore,
+                    time_col: str = 'purchase_time') -> "pd.DataFrame":
+    """
+    Replay transactions through the store in time order.
+
+    Args:
+        df: Frame with a datetime time_col and any of the entity columns.
+        store: VelocityStore to update (its state is kept for serving).
+        time_col: Event-time column.
+
+    Returns:
+        pd.DataFrame: Velocity features aligned to df's original index/order.
+    """
+    import pandas as pd
+
+    logging.info(f"Replaying {len(df)} transactions through the velocity store...")
+    seconds = (pd.to_datetime(df[time_col]) - pd.Timestamp(0)).dt.total_seconds().to_numpy()
+    order = np.argsort(seconds, kind='stable')
+
+    columns = [c for c in ENTITIES if c in df.columns]
+    values = {c: df[c].to_numpy(dtype=object) for c in columns}
+    out = np.empty((len(df), len(store.feature_names)), dtype=np.float64)
+
+    for i in order:
+        features = store.update({c: values[c][i] for c in columns}, seconds[i])
+        out[i] = [features[name] for name in store.feature_names]
+
+    logging.info(f"Velocity store holds {len(store)} active keys")
+    return pd.DataFrame(out, columns=store.feature_names, index=df.index)
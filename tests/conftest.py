@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+FEATURES = ['purchase_value', 'source_encoded', 'browser_encoded',
+            'sex_encoded', 'age', 'time_since_signup', 'user_transaction_count']
+
+
+@pytest.fixture(scope="session")
+def training_frame():
+    """Small synthetic feature matrix with the same schema as select_features output."""
+    rng = np.random.default_rng(0)
+    n = 400
+    X = pd.DataFrame({
+        'purchase_value': rng.normal(size=n),
+        'source_encoded': rng.integers(0, 3, n),
+        'browser_encoded': rng.integers(0, 5, n),
+        'sex_encoded': rng.integers(0, 2, n),
+        'age': rng.integers(18, 70, n),
+        'time_since_signup': rng.normal(size=n),
+        'user_transaction_count': rng.normal(size=n),
+    })[FEATURES]
+    y = pd.Series(((X['time_since_signup'] < -0.5) | (X['purchase_value'] > 1.2)).astype(int))
+    return X, y
+
+
+@pytest.fixture(scope="session")
+def forest(training_frame):
+    X, y = training_frame
+    model = RandomForestClassifier(n_estimators=15, max_depth=6, random_state=42)
+    return model.fit(X, y)
+
+
+@pytest.fixture(scope="session")
+def explainer(forest):
+    from src.forest_inference import compile_forest
+    from src.reason_codes import ReasonCodeExplainer
+    return ReasonCodeExplainer(compile_forest(forest), forest)
+
+
+@pytest.fixture
+def client(forest, explainer, monkeypatch, tmp_path):
+    import serve_model
+    from src.forest_inference import compile_forest
+    from src.feature_transform import FeatureTransform
+    from src.velocity import VelocityStore
+    from src.entity_links import EntityLinkIndex
+    from src.model_reload import ServingModel
+    from src.drift import DriftMonitor
+    from src.prediction_cache import PredictionCache
+    monkeypatch.setattr(serve_model, "active", ServingModel(
+        forest, compile_forest(forest), FeatureTransform.identity().compile(forest.feature_names_in_),
+        explainer, version="test"))
+    monkeypatch.setattr(serve_model, "velocity_store", VelocityStore())
+    monkeypatch.setattr(serve_model, "entity_links", EntityLinkIndex())
+    # No reference profile: drift tracking is off unless a test enables it
+    monkeypatch.setattr(serve_model, "drift_monitor", DriftMonitor(str(tmp_path / "no_reference.npz")))
+    monkeypatch.setattr(serve_model, "prediction_cache", PredictionCache())
+    serve_model.app.config["TESTING"] = True
+    return serve_model.app.test_client()
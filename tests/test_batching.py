@@ -0,0 +1,71 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from src.batching import MicroBatcher
+from src.forest_inference import compile_forest
+
+
+def test_concurrent_rows_are_batched(forest, training_frame):
+    X, _ = training_frame
+    compiled = compile_forest(forest)
+
+    def score(matrix):
+        proba = compiled.predict_proba(matrix)
+        return compiled.classes_[proba.argmax(axis=1)], proba[:, 1]
+
+    batcher = MicroBatcher(score, max_wait_ms=20, max_batch_size=16)
+    rows = X.to_numpy()[:64]
+    with ThreadPoolExecutor(max_workers=32) as pool:
+        results = list(pool.map(batcher.submit, rows))
+
+    np.testing.assert_array_equal([p for _, p in results], forest.predict_proba(X.iloc[:64])[:, 1])
+    stats = batcher.stats()
+    assert stats["rows"] == 64
+    assert stats["batches"] < 64
+    assert stats["max_batch_size_seen"] <= 16
+
+
+def test_scoring_errors_reach_callers():
+    def broken(matrix):
+        raise RuntimeError("model exploded")
+
+    batcher = MicroBatcher(broken, max_wait_ms=1)
+    with pytest.raises(RuntimeError, match="exploded"):
+        batcher.submit(np.zeros(3))
+
+
+def test_predict_through_micro_batcher(client, monkeypatch):
+    import serve_model
+    batcher = MicroBatcher(serve_model.score_matrix, max_wait_ms=1)
+    monkeypatch.setattr(serve_model, "micro_batcher", batcher)
+
+    response = client.post("/predict", json={"purchase_value": 10, "age": 40})
+    assert response.status_code == 200
+    assert client.get("/health").get_json()["micro_batching"]["rows"] == 1
+
+
+def test_timed_out_rows_are_dropped_and_reported_as_overload(client, monkeypatch):
+    import threading
+    import serve_model
+    release = threading.Event()
+    scored = []
+
+    def slow(matrix):
+        release.wait(5)
+        scored.append(len(matrix))
+        return serve_model.score_matrix(matrix)
+
+    batcher = MicroBatcher(slow, max_wait_ms=1, max_batch_size=1)
+    monkeypatch.setattr(serve_model, "micro_batcher", batcher)
+    monkeypatch.setattr(serve_model, "score_row", lambda row: batcher.submit(row, timeout=0.05))
+
+    # the first row holds the scorer thread; the second times out while queued
+    assert client.post("/predict", json={"purchase_value": 10, "age": 40}).status_code == 503
+    response = client.post("/predict", json={"purchase_value": 11, "age": 40})
+    assert response.status_code == 503 and response.headers["Retry-After"] == "1"
+    release.set()
+    assert batcher.submit(np.zeros(len(serve_model.active.feature_transform.feature_names)))
+    # the abandoned queued row was skipped, not scored
+    assert scored == [1, 1]
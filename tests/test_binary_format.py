@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from src.binary_format import ARROW_STREAM_TYPE, MATRIX_TYPE, decode_matrix, encode_matrix
+from src.feature_transform import FeatureTransform
+
+REQUEST_COLUMNS = ['purchase_value', 'age', 'browser', 'sex', 'source', 'time_diff', 'user_transaction_count']
+
+
+def _scores(response):
+    X, columns, _ = decode_matrix(response.data)
+    assert columns == ['fraud_probability', 'prediction']
+    return X[:, 0], X[:, 1]
+
+
+def test_matrix_round_trip_is_zero_copy():
+    X = np.arange(12, dtype=np.float32).reshape(4, 3)
+    body = encode_matrix(X, ['a', 'bb', 'ccc'], model_space=True)
+    decoded, columns, model_space = decode_matrix(body)
+    assert columns == ['a', 'bb', 'ccc'] and model_space
+    np.testing.assert_array_equal(decoded, X)
+    assert not decoded.flags.owndata and decoded.base is not None
+    with pytest.raises(ValueError):
+        decode_matrix(body[:-4])
+
+
+def test_request_space_matrix_matches_json_batch(client, training_frame):
+    X, _ = training_frame
+    rows = X.head(30).rename(columns={'browser_encoded': 'browser', 'sex_encoded': 'sex',
+                                      'source_encoded': 'source', 'time_since_signup': 'time_diff'})
+    rows = rows[REQUEST_COLUMNS].to_numpy(dtype=np.float32)
+    rows[4, 0] = np.nan  # missing value
+
+    response = client.post("/predict/batch", data=encode_matrix(rows, REQUEST_COLUMNS), content_type=MATRIX_TYPE)
+    assert response.status_code == 200 and response.mimetype == MATRIX_TYPE
+    probabilities, predictions = _scores(response)
+
+    expected = client.post("/predict/batch", json=X.head(30).to_dict(orient="records")).get_json()["results"]
+    valid = np.arange(30) != 4
+    np.testing.assert_allclose(probabilities[valid], [r["fraud_probability"] for i, r in enumerate(expected) if i != 4],
+                               atol=1e-4)
+    assert np.isnan(probabilities[4]) and predictions[4] == -1
+
+
+def test_model_space_matrix_is_scored_in_place(client, forest, training_frame):
+    X, _ = training_frame
+    names = list(forest.feature_names_in_)
+    body = encode_matrix(X[names].to_numpy(), names, model_space=True)
+    probabilities, predictions = _scores(client.post("/predict/batch", data=body, content_type=MATRIX_TYPE))
+    np.testing.assert_allclose(probabilities, forest.predict_proba(X[names])[:, 1], atol=1e-6)
+    np.testing.assert_array_equal(predictions, forest.predict(X[names]))
+
+    bad = client.post("/predict/batch", data=encode_matrix(X[names[:3]].to_numpy(), names[:3], model_space=True),
+                      content_type=MATRIX_TYPE)
+    assert bad.status_code == 400
+
+
+def test_transform_columns_matches_transform_record():
+    transform = FeatureTransform({'browser': ['Chrome', 'IE', 'Safari']}, {'purchase_value': 30.0},
+                                 {'purchase_value': 10.0}).compile(['purchase_value', 'browser_encoded', 'age'])
+    columns = {'purchase_value': np.array([50.0, 20.0]), 'browser': np.array([2.0, 7.0])}
+    out, valid = transform.transform_columns(columns, 2)
+    np.testing.assert_allclose(out[0], transform.transform_record({'purchase_value': 50.0, 'browser': 2}))
+    assert valid.tolist() == [True, False]
+
+
+def test_arrow_stream_round_trip(client, forest, training_frame):
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.ipc  # noqa: F401
+    X, _ = training_frame
+    table = pa.Table.from_pandas(X.head(10), preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    response = client.post("/predict/batch", data=sink.getvalue().to_pybytes(), content_type=ARROW_STREAM_TYPE)
+    assert response.status_code == 200
+    scores = pa.ipc.open_stream(response.data).read_all()
+    np.testing.assert_allclose(scores.column('fraud_probability').to_numpy(),
+                               forest.predict_proba(X.head(10))[:, 1], atol=1e-6)
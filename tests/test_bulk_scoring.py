@@ -0,0 +1,126 @@
+import json
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from src.bulk_scoring import score_file
+from src.feature_transform import FeatureTransform
+from src.forest_inference import compile_forest, save_forest_arrays
+
+
+@pytest.fixture
+def scoring_setup(forest, training_frame, tmp_path):
+    X, _ = training_frame
+    rows = X.iloc[:250].copy()
+    rows.insert(0, 'user_id', np.arange(250))
+    rows.loc[7, 'age'] = np.nan  # unscoreable row
+    csv = tmp_path / 'rows.csv'
+    rows.to_csv(csv, index=False)
+    model_dir = tmp_path / 'compiled'
+    save_forest_arrays(compile_forest(forest), str(model_dir))
+    expected = forest.predict_proba(X.iloc[:250])[:, 1]
+    return csv, str(model_dir), expected
+
+
+def _score(csv, model_dir, out, **kwargs):
+    return score_file(str(csv), str(out), model_path=model_dir, transform_path=None,
+                      ip_index_path=None, chunksize=40, **kwargs)
+
+
+def test_output_is_ordered_and_matches_direct_scoring(scoring_setup, tmp_path):
+    csv, model_dir, expected = scoring_setup
+    summary = _score(csv, model_dir, tmp_path / 'out.csv', n_jobs=2)
+    out = pd.read_csv(tmp_path / 'out.csv', keep_default_na=False, na_values=[''])
+    assert summary['rows_scored'] == 250 and summary['chunks'] == 7 and summary['invalid_rows'] == 1
+    assert out['row'].tolist() == list(range(250)) and out['user_id'].tolist() == list(range(250))
+    assert out.loc[7, 'prediction'] == -1 and out.loc[7, 'error'] != ''
+    valid = out.index != 7
+    np.testing.assert_allclose(out.loc[valid, 'fraud_probability'], expected[valid], rtol=1e-6)
+
+
+def test_resume_continues_from_last_completed_chunk(scoring_setup, forest, tmp_path):
+    csv, model_dir, _ = scoring_setup
+    out = tmp_path / 'out.csv'
+    _score(csv, model_dir, tmp_path / 'full.csv', n_jobs=1)
+
+    # Simulate a crash after three chunks, with part of the fourth already written
+    _score(csv, model_dir, out, n_jobs=1)
+    progress_path = tmp_path / 'out.csv.progress.json'
+    progress = json.loads(progress_path.read_text())
+    with open(out) as f:
+        lines = f.readlines()
+    partial = ''.join(lines[:1 + 120])
+    progress.update(chunks=3, rows=120, output_bytes=len(partial.encode()))
+    progress_path.write_text(json.dumps(progress))
+    out.write_text(partial + ''.join(lines[121:130]))
+
+    summary = _score(csv, model_dir, out, n_jobs=1)
+    assert summary['rows_skipped_on_resume'] == 120 and summary['rows_scored'] == 130
+    assert out.read_text() == (tmp_path / 'full.csv').read_text()
+
+    with pytest.raises(ValueError, match="different settings"):
+        score_file(str(csv), str(out), model_path=model_dir, transform_path=None,
+                   ip_index_path=None, chunksize=50, n_jobs=1)
+    with pytest.raises(ValueError, match=r"\(velocity\).*--restart"):
+        _score(csv, model_dir, out, n_jobs=1, velocity=False)
+    # a retrain repoints the compiled model path to a new version
+    save_forest_arrays(compile_forest(forest), model_dir)
+    with pytest.raises(ValueError, match=r"\(model\)"):
+        _score(csv, model_dir, out, n_jobs=1)
+    # a retrained transform at the same path
+    transform_path = tmp_path / 'feature_transform.pkl'
+    joblib.dump(FeatureTransform.identity(), transform_path)
+    with pytest.raises(ValueError, match="feature_transform"):
+        score_file(str(csv), str(out), model_path=model_dir, transform_path=str(transform_path),
+                   ip_index_path=None, chunksize=40, n_jobs=1)
+
+
+def test_resume_restores_velocity_in_one_read_pass(tmp_path):
+    rng = np.random.default_rng(3)
+    rows = pd.DataFrame({'user_id': rng.integers(0, 20, 200), 'purchase_value': rng.normal(size=200),
+                         'purchase_time': pd.date_range('2015-01-01', periods=200, freq='7min')})
+    rows.to_csv(tmp_path / 'rows.csv', index=False)
+    X = pd.DataFrame({'purchase_value': rng.normal(size=200), 'user_txn_1h': rng.integers(0, 4, 200)})
+    model = RandomForestClassifier(n_estimators=5, max_depth=3, random_state=0).fit(X, X['user_txn_1h'] > 1)
+    model_path = tmp_path / 'model.pkl'
+    joblib.dump(model, model_path)
+    score = lambda out: score_file(str(tmp_path / 'rows.csv'), str(out), model_path=str(model_path),
+                                   transform_path=None, ip_index_path=None, chunksize=40, n_jobs=1)
+    score(tmp_path / 'full.csv')
+
+    out = tmp_path / 'out.csv'
+    score(out)
+    progress_path = tmp_path / 'out.csv.progress.json'
+    progress = json.loads(progress_path.read_text())
+    lines = out.read_text().splitlines(keepends=True)
+    partial = ''.join(lines[:1 + 80])
+    progress.update(chunks=2, rows=80, output_bytes=len(partial.encode()))
+    progress_path.write_text(json.dumps(progress))
+    out.write_text(partial)
+
+    assert score(out)['rows_scored'] == 120
+    assert out.read_text() == (tmp_path / 'full.csv').read_text()
+
+
+def test_transform_frame_matches_transform_record():
+    transform = FeatureTransform(categories={'browser': ['Chrome', 'IE', 'Unknown']},
+                                 means={'purchase_value': 30.0}, scales={'purchase_value': 10.0})
+    transform.compile(['purchase_value', 'browser_encoded', 'age'])
+    df = pd.DataFrame({'purchase_value': [20, 45, 31], 'browser': ['IE', 'Opera', None], 'age': [30, 41, 25]})
+    X, valid = transform.transform_frame(df)
+    assert valid.tolist() == [True, True, False]
+    for i in range(2):
+        np.testing.assert_array_equal(X[i], transform.transform_record(df.iloc[i].to_dict()))
+
+
+def test_parquet_round_trip(scoring_setup, tmp_path):
+    pytest.importorskip("pyarrow")
+    csv, model_dir, _ = scoring_setup
+    parquet = tmp_path / 'rows.parquet'
+    pd.read_csv(csv).to_parquet(parquet, index=False)
+    summary = _score(parquet, model_dir, tmp_path / 'scores.parquet', n_jobs=1)
+    out = pd.read_parquet(tmp_path / 'scores.parquet')
+    assert summary['rows_scored'] == 250 and sorted(out['row']) == list(range(250))
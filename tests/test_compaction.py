@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+from src.compaction import (auc_pr, compact_model, distill, prune_forest, select_trees,
+                            tree_probabilities)
+from src.forest_inference import compile_forest
+
+
+def test_selected_trees_stay_within_tolerance(forest, training_frame):
+    X, y = training_frame
+    trees, summary = select_trees(forest, X.iloc[300:], y.iloc[300:], tolerance=0.01)
+    assert 1 <= len(trees) <= len(forest.estimators_)
+    assert summary['auc_pr'] >= summary['auc_pr_original'] - 0.01
+
+    pruned = prune_forest(forest, trees)
+    assert len(pruned.estimators_) == len(trees) and len(forest.estimators_) == 15
+    expected = tree_probabilities(compile_forest(forest), X)[trees].mean(axis=0)
+    np.testing.assert_allclose(pruned.predict_proba(X)[:, 1], expected)
+
+
+def test_distilled_student_follows_teacher(forest, training_frame):
+    X, y = training_frame
+    student = distill(forest, X, kind='tree')
+    proba = student.predict_proba(X)
+    assert proba.shape == (len(X), 2) and np.allclose(proba.sum(axis=1), 1.0)
+    assert list(student.feature_names_in_) == list(X.columns)
+    assert auc_pr(y, proba[:, 1]) > 0.8
+
+
+def test_compact_model_reports_every_artifact(forest, training_frame, tmp_path):
+    X, y = training_frame
+    report = compact_model(forest, X.iloc[:200], X.iloc[200:300], y.iloc[200:300], X.iloc[300:], y.iloc[300:],
+                           out_dir=str(tmp_path), tolerance=0.01, distill_kind='gbm')
+    frame = pd.DataFrame(report).set_index(['model', 'engine'])
+    assert set(frame.index) == {('original', 'pickle'), ('original', 'compiled'), ('pruned', 'pickle'),
+                                ('pruned', 'compiled'), ('distilled_gbm', 'pickle')}
+    assert frame.loc[('pruned', 'compiled'), 'n_trees'] <= frame.loc[('original', 'compiled'), 'n_trees']
+    assert frame.loc[('pruned', 'compiled'), 'size_mb'] <= frame.loc[('original', 'compiled'), 'size_mb']
+    assert (frame['p99_latency_ms'] > 0).all() and (frame['auc_pr'] > 0).all()
+    # Pickle and compiled engines score identically
+    assert frame.loc[('original', 'pickle'), 'auc_pr'] == frame.loc[('original', 'compiled'), 'auc_pr']
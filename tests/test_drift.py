@@ -0,0 +1,62 @@
+import numpy as np
+
+from src.drift import DriftMonitor, FeatureProfile, compare_profiles
+
+
+def _reference(n=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.column_stack([rng.normal(size=n), rng.integers(0, 4, n)])
+
+
+def test_profiles_merge_exactly_and_flag_shift():
+    X = _reference()
+    reference = FeatureProfile.from_reference(X, ['amount', 'code'])
+    assert reference.edges.shape == (2, 19) and reference.counts[1, :4].tolist() == np.bincount(X[:, 1].astype(int)).tolist()
+    np.testing.assert_allclose(reference.quantiles([0.5])[0], [np.median(X[:, 0])], atol=0.05)
+
+    # Per-worker profiles merge into the profile of all their rows
+    a, b, both = reference.empty_like(), reference.empty_like(), reference.empty_like()
+    for row in X[:300]:
+        a.update(row)
+    b.update(X[300:1000])
+    both.update(X[:1000])
+    np.testing.assert_array_equal(a.merge(b).counts, both.counts)
+
+    assert compare_profiles(reference, both)["status"] == "stable"
+    shifted = reference.empty_like()
+    shifted.update(X[:1000] + [1.0, 0.0])
+    report = compare_profiles(reference, shifted)
+    assert report["status"] == "drift" and report["drifted_features"] == ["amount"]
+    assert report["features"]["code"]["psi"] < 0.01 and report["features"]["amount"]["ks"] > 0.3
+
+
+def test_monitor_merges_workers_sharing_a_directory(tmp_path):
+    reference_path = str(tmp_path / 'reference.npz')
+    FeatureProfile.from_reference(_reference(), ['amount', 'code']).save(reference_path)
+    shared = str(tmp_path / 'shared')
+    worker_a = DriftMonitor(reference_path, shared, flush_interval=0.0, min_rows=10)
+    worker_b = DriftMonitor(reference_path, shared, flush_interval=0.0, min_rows=10)
+    worker_b._snapshot_path = lambda: str(tmp_path / 'shared' / 'worker-b.npz')
+
+    worker_a.observe(_reference(1500, seed=1))
+    worker_b.observe(_reference(2000, seed=2))
+    # A profile built on other edges (e.g. an older model) is ignored
+    FeatureProfile.from_reference(_reference() * 3, ['amount', 'code']).save(str(tmp_path / 'shared' / 'worker-x.npz'))
+
+    report = worker_a.report()
+    assert report["live_rows"] == 3500 and report["status"] == "stable"
+
+
+def test_drift_endpoint_reports_scored_traffic(client, training_frame, tmp_path, monkeypatch):
+    import serve_model
+    X, _ = training_frame
+    reference_path = str(tmp_path / 'drift_reference.npz')
+    FeatureProfile.from_reference(X.to_numpy(), X.columns).save(reference_path)
+    monkeypatch.setattr(serve_model, "drift_monitor", DriftMonitor(reference_path, min_rows=20))
+
+    assert client.get("/drift").get_json()["status"] == "insufficient_data"
+    client.post("/predict/batch", json=X.head(40).to_dict(orient="records"))
+    client.post("/predict", json=X.iloc[40].to_dict())
+    report = client.get("/drift").get_json()
+    assert report["live_rows"] == 41 and set(report["features"]) == set(X.columns)
+    assert client.get("/health").get_json()["drift"]["live_rows"] == 41
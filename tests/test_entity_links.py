@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+
+from src.entity_links import LINK_FEATURES, EntityLinkIndex, replay_links
+from src.feature_engineering import create_entity_link_features
+
+
+def make_transactions(n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'user_id': rng.integers(0, 80, n),
+        'device_id': rng.choice([f'D{i}' for i in range(60)], n),
+        'ip_address': rng.integers(0, 150, n).astype(float),
+        'purchase_time': pd.Timestamp('2015-01-01') + pd.to_timedelta(rng.permutation(n), unit='min'),
+    })
+
+
+def brute_force(df):
+    """Features of each row from all rows up to and including it in time order."""
+    rows = []
+    for _, row in df.iterrows():
+        seen = df[df['purchase_time'] <= row['purchase_time']]
+        # Users linked to this one through any chain of shared devices or IPs
+        users, frontier = set(), {row['user_id']}
+        while frontier:
+            users |= frontier
+            linked = seen[seen['user_id'].isin(frontier)]
+            shared = seen['device_id'].isin(linked['device_id']) | seen['ip_address'].isin(linked['ip_address'])
+            frontier = set(seen.loc[shared, 'user_id']) - users
+        rows.append([seen.loc[seen['device_id'] == row['device_id'], 'user_id'].nunique(),
+                     seen.loc[seen['ip_address'] == row['ip_address'], 'user_id'].nunique(),
+                     seen.loc[seen['user_id'] == row['user_id'], 'device_id'].nunique(),
+                     len(users)])
+    return np.array(rows, dtype=float)
+
+
+def test_replay_matches_brute_force_and_keeps_order():
+    df = make_transactions()
+    result = replay_links(df, EntityLinkIndex())
+    assert list(result.columns) == LINK_FEATURES and list(result.index) == list(df.index)
+    np.testing.assert_array_equal(result.to_numpy(), brute_force(df))
+    assert result['cluster_size'].max() > 10  # chains through shared devices/IPs merge clusters
+
+
+def test_peek_predicts_update_without_recording():
+    df = make_transactions(n=200, seed=1)
+    index = EntityLinkIndex()
+    create_entity_link_features(df.iloc[:150].copy(), index)
+    for record in df.iloc[150:].to_dict('records') + [{'user_id': 999, 'device_id': 'D1'}, {'device_id': 'D2'}]:
+        nodes = len(index)
+        peeked = index.peek(record)
+        assert len(index) == nodes
+        assert index.update(record) == peeked
+
+
+def test_snapshot_restores_identical_state(tmp_path):
+    df = make_transactions(n=250, seed=2)
+    index = EntityLinkIndex()
+    replay_links(df.iloc[:200], index)
+    index.save(str(tmp_path / 'entity_links.npz'))
+    restored = EntityLinkIndex.load(str(tmp_path / 'entity_links.npz'))
+    assert len(restored) == len(index)
+    tail = df.iloc[200:]
+    pd.testing.assert_frame_equal(replay_links(tail, restored), replay_links(tail, index))
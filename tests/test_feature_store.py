@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+
+from src.feature_engineering import create_time_features
+from src.feature_store import FeatureStore, stream_preprocess
+from src.preprocessing import clean_data, convert_to_datetime, map_ip_to_country
+from src.schema import drop_merge_only, read_fraud_csv
+
+IP_TABLE = pd.DataFrame({
+    'lower_bound_ip_address': [0.0, 1000.0, 5000.0],
+    'upper_bound_ip_address': [999, 2999, 9999],
+    'country': ['Japan', 'China', 'United States'],
+})
+
+
+def make_raw(n=60, seed=0):
+    rng = np.random.default_rng(seed)
+    signup = pd.Timestamp('2015-01-01') + pd.to_timedelta(rng.integers(0, 10**6, n), unit='s')
+    df = pd.DataFrame({
+        'user_id': rng.integers(1, 10**6, n),
+        'signup_time': signup.astype(str),
+        'purchase_time': (signup + pd.to_timedelta(rng.integers(1, 10**6, n), unit='s')).astype(str),
+        'purchase_value': rng.integers(9, 150, n),
+        'device_id': rng.choice(['QVPSPJUOCKZAR', 'EOGFQPIZPYXFZ', 'YSSKYOSJHPPLJ'], n),
+        'source': rng.choice(['SEO', 'Ads', 'Direct'], n),
+        'browser': rng.choice(['Chrome', 'Safari', 'IE'], n),
+        'sex': rng.choice(['M', 'F'], n),
+        'age': rng.integers(18, 70, n),
+        'ip_address': rng.uniform(0, 12000, n),
+        'class': rng.integers(0, 2, n),
+    })
+    # duplicates that land in different chunks
+    return pd.concat([df, df.iloc[[2, 5, 40]]], ignore_index=True)
+
+
+def test_streamed_store_matches_in_memory_pipeline(tmp_path):
+    raw = make_raw()
+    csv = tmp_path / 'Fraud_Data.csv'
+    raw.to_csv(csv, index=False)
+
+    store = stream_preprocess(str(csv), IP_TABLE, str(tmp_path / 'store'), chunksize=16)
+    streamed = FeatureStore(str(tmp_path / 'store')).to_frame()
+
+    expected = read_fraud_csv(csv)
+    expected = clean_data(expected)
+    expected = convert_to_datetime(expected, ['signup_time', 'purchase_time'])
+    expected = map_ip_to_country(expected, IP_TABLE.copy())
+    expected = drop_merge_only(create_time_features(expected), 'create_time_features').reset_index(drop=True)
+
+    assert len(store) == len(expected) == 60
+    assert list(streamed.columns) == list(expected.columns)
+    assert 'signup_time' not in streamed.columns
+    for col in expected.columns:
+        np.testing.assert_array_equal(np.asarray(streamed[col]), np.asarray(expected[col]), err_msg=col)
+    assert isinstance(store.array('purchase_value'), np.memmap)
+
+
+def test_streamed_model_features_match_in_memory_pipeline(tmp_path):
+    from src.entity_links import EntityLinkIndex
+    from src.feature_engineering import create_entity_link_features, create_transaction_velocity
+    from src.feature_store import model_frame, stream_model_features
+    from src.model_training import FEATURE_COLS
+    from src.preprocessing import scale_and_encode
+    from src.velocity import VelocityStore
+
+    csv = tmp_path / 'Fraud_Data.csv'
+    make_raw(n=300).to_csv(csv, index=False)
+    store = stream_preprocess(str(csv), IP_TABLE, str(tmp_path / 'store'), chunksize=64)
+    expected = store.take(slice(None))
+    velocity, links = VelocityStore(), EntityLinkIndex()
+    transform = stream_model_features(store, velocity, links, chunksize=50)
+    streamed = model_frame(FeatureStore(str(tmp_path / 'store')), FEATURE_COLS + ['class'])
+
+    expected = create_entity_link_features(create_transaction_velocity(expected, VelocityStore()), EntityLinkIndex())
+    expected, expected_transform = scale_and_encode(expected, return_transform=True)
+
+    assert transform.categories == expected_transform.categories
+    for col in transform.means:
+        np.testing.assert_allclose(transform.means[col], expected_transform.means[col], err_msg=col)
+        np.testing.assert_allclose(transform.scales[col], expected_transform.scales[col], err_msg=col)
+    for col in FEATURE_COLS + ['class']:
+        np.testing.assert_allclose(streamed[col].to_numpy(dtype=float), expected[col].to_numpy(dtype=float),
+                                   err_msg=col)
+    assert len(velocity) > 0 and len(links) > 0
+    assert isinstance(FeatureStore(str(tmp_path / 'store')).array('purchase_value'), np.memmap)
+
+    # the raw columns are kept, so a rerun refits the same moments and writes the same values
+    rerun = stream_model_features(FeatureStore(str(tmp_path / 'store')), chunksize=50)
+    assert rerun.means == transform.means and rerun.scales == transform.scales
+    pd.testing.assert_frame_equal(model_frame(FeatureStore(str(tmp_path / 'store')), FEATURE_COLS + ['class']),
+                                  streamed)
+
+
+def test_seen_hashes_keep_sorted_runs():
+    from src.feature_store import _SeenHashes
+
+    rng = np.random.default_rng(1)
+    seen, reference = _SeenHashes(), set()
+    for _ in range(40):
+        block = np.unique(rng.integers(0, 5000, 100).astype(np.uint64))
+        block = block[~seen.contains(block)]
+        assert not reference.intersection(block.tolist())
+        seen.add(block)
+        reference.update(block.tolist())
+    assert len(seen) == len(reference)
+    assert len(seen._runs) <= int(np.log2(len(reference))) + 1
+    probe = np.arange(5000, dtype=np.uint64)
+    np.testing.assert_array_equal(seen.contains(probe), np.isin(probe, list(reference)))
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.feature_transform import load_feature_transform
+from src.model_training import save_model
+from src.preprocessing import scale_and_encode
+
+FEATURES = ['purchase_value', 'source_encoded', 'browser_encoded',
+            'sex_encoded', 'age', 'time_since_signup', 'user_transaction_count']
+
+
+@pytest.fixture
+def raw_frame():
+    return pd.DataFrame({
+        'purchase_value': [34.0, 16.0, 15.0, 44.0, 39.0],
+        'source': ['SEO', 'Ads', 'SEO', 'Direct', 'Ads'],
+        'browser': ['Chrome', 'Chrome', 'Opera', 'Safari', 'Safari'],
+        'sex': ['M', 'F', 'M', 'M', 'F'],
+        'age': [39, 53, 53, 41, 45],
+        'time_since_signup': [4506682.0, 17944.0, 1.0, 492085.0, 4361461.0],
+        'user_transaction_count': [1.0, 1.0, 1.0, 2.0, 1.0],
+        'country': ['Japan', None, 'United States', 'Unknown', 'Japan'],
+    })
+
+
+def test_transform_record_matches_training(raw_frame, tmp_path, monkeypatch):
+    raw_records = raw_frame.rename(columns={'time_since_signup': 'time_diff'}).to_dict(orient='records')
+    df, transform = scale_and_encode(raw_frame.copy(), return_transform=True)
+
+    monkeypatch.chdir(tmp_path)
+    save_model(transform, 'feature_transform.pkl')
+    loaded = load_feature_transform('models/feature_transform.pkl').compile(FEATURES)
+
+    np.testing.assert_allclose(loaded.transform_records(raw_records), df[FEATURES].to_numpy(dtype=float))
+
+
+def test_transform_record_codes_and_errors(raw_frame):
+    _, transform = scale_and_encode(raw_frame.copy(), return_transform=True)
+    transform.compile(FEATURES)
+
+    by_label = transform.transform_record({'browser': 'Opera'})
+    by_code = transform.transform_record({'browser_encoded': 1})
+    assert by_label[2] == by_code[2] == 1.0
+    # Missing fields default to zero in model space
+    assert by_label[0] == 0.0
+
+    with pytest.raises(ValueError, match='browser'):
+        transform.transform_record({'browser': 'Netscape'})
+    with pytest.raises(ValueError, match='age'):
+        transform.transform_record({'age': 'thirty'})
+
+
+def test_version_mismatch_rejected(raw_frame, tmp_path, monkeypatch):
+    _, transform = scale_and_encode(raw_frame.copy(), return_transform=True)
+    transform.version = -1
+    monkeypatch.chdir(tmp_path)
+    save_model(transform, 'feature_transform.pkl')
+    assert load_feature_transform('models/feature_transform.pkl') is None
+
+
+def test_unseen_country_maps_to_unknown(raw_frame):
+    df, transform = scale_and_encode(raw_frame.copy(), return_transform=True)
+    transform.compile(FEATURES + ['country_encoded'])
+
+    unknown_code = df.loc[df['country'] == 'Unknown', 'country_encoded'].iloc[0]
+    assert transform.transform_record({'country': 'Atlantis'})[-1] == unknown_code
+    assert transform.transform_record({'country': 'Japan'})[-1] == df['country_encoded'].iloc[0]
+    # a record without country (no ip_address either) is scored as Unknown, not the first country
+    assert transform.transform_record({})[-1] == unknown_code
+    frame, valid = transform.transform_frame(pd.DataFrame({'age': [30.0]}))
+    assert frame[0, -1] == unknown_code and valid.all()
+    columns, _ = transform.transform_columns({'age': np.array([30.0])}, 1)
+    assert columns[0, -1] == unknown_code and columns[0, 1] == 0.0
@@ -0,0 +1,61 @@
+import os
+
+import numpy as np
+import pytest
+
+from src.forest_inference import compile_forest, load_forest_arrays, save_forest_arrays
+
+
+def test_predict_proba_parity(forest, training_frame):
+    X, _ = training_frame
+    compiled = compile_forest(forest)
+
+    np.testing.assert_array_equal(compiled.predict_proba(X), forest.predict_proba(X))
+    np.testing.assert_array_equal(compiled.predict(X), forest.predict(X))
+    np.testing.assert_array_equal(compiled.predict_proba(X.iloc[0].to_numpy()),
+                                  forest.predict_proba(X.iloc[[0]]))
+
+
+def test_parity_on_unseen_rows(forest, training_frame):
+    X, _ = training_frame
+    rng = np.random.default_rng(1)
+    X_new = X.sample(200, replace=True, random_state=1) + rng.normal(scale=0.3, size=(200, X.shape[1]))
+    compiled = compile_forest(forest)
+    np.testing.assert_array_equal(compiled.predict_proba(X_new), forest.predict_proba(X_new))
+
+
+def test_rejects_other_estimators():
+    with pytest.raises(TypeError):
+        compile_forest(object())
+
+
+def test_memory_mapped_arrays_roundtrip(forest, training_frame, tmp_path):
+    X, _ = training_frame
+    save_forest_arrays(compile_forest(forest), str(tmp_path / "compiled"))
+    loaded = load_forest_arrays(str(tmp_path / "compiled"))
+
+    assert isinstance(loaded.threshold, np.memmap)
+    assert list(loaded.feature_names_in_) == list(forest.feature_names_in_)
+    np.testing.assert_array_equal(loaded.predict_proba(X), forest.predict_proba(X))
+
+
+def test_saves_swap_whole_versions(forest, training_frame, tmp_path):
+    from sklearn.ensemble import RandomForestClassifier
+
+    X, y = training_frame
+    path = tmp_path / "compiled"
+    path.mkdir()
+    (path / "left.npy").write_bytes(b"stale file from the old flat layout")
+    save_forest_arrays(compile_forest(forest), str(path))
+    first_version = os.path.realpath(path)
+    first = load_forest_arrays(str(path))
+
+    retrained = RandomForestClassifier(n_estimators=5, max_depth=3, random_state=7).fit(X, y)
+    save_forest_arrays(compile_forest(retrained), str(path))
+    save_forest_arrays(compile_forest(retrained), str(path))
+
+    assert os.path.islink(path) and not os.path.exists(first_version)
+    assert len([n for n in os.listdir(tmp_path) if n.startswith(".compiled.v")]) == 2
+    # the first loader keeps scoring from the pages it mapped
+    np.testing.assert_array_equal(first.predict_proba(X), forest.predict_proba(X))
+    np.testing.assert_array_equal(load_forest_arrays(str(path)).predict_proba(X), retrained.predict_proba(X))
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from src.imbalance import ChunkedSMOTE, ResampledClassifier, UndersampleStrategy, compare_strategies, get_strategy
+from src.model_search import cross_validate
+
+
+def test_chunked_smote_balances_with_interpolated_rows(training_frame):
+    X, y = training_frame
+    X_res, y_res = ChunkedSMOTE(chunk_size=7).fit_resample(X, y)
+    counts = y_res.value_counts()
+    assert counts[0] == counts[1] == (y == 0).sum()
+    assert list(X_res.columns) == list(X.columns)
+
+    X_min = X[y == 1].to_numpy()
+    synthetic = X_res.to_numpy()[len(X):]
+    assert (synthetic >= X_min.min(axis=0) - 1e-9).all() and (synthetic <= X_min.max(axis=0) + 1e-9).all()
+    np.testing.assert_array_equal(X_res.to_numpy()[:len(X)], X.to_numpy())
+
+
+def test_undersample_keeps_every_minority_row(training_frame):
+    X, y = training_frame
+    X_res, y_res = UndersampleStrategy().fit_resample(X, y)
+    assert (y_res == 1).sum() == (y == 1).sum() == (y_res == 0).sum()
+
+
+def test_unknown_strategy_is_rejected():
+    with pytest.raises(ValueError):
+        get_strategy('oversample_everything')
+
+
+def test_resampling_happens_inside_training_folds(training_frame, tmp_path):
+    X, y = training_frame
+    model = ResampledClassifier(RandomForestClassifier(n_estimators=10, random_state=0, n_jobs=-1), 'smote')
+    scores = cross_validate(model, X, y, k=3, scoring='auc_pr', n_jobs=2, data_dir=str(tmp_path))
+    assert scores.shape == (3,) and (scores > 0).all()
+
+
+def test_compare_strategies_reports_cost_and_accuracy(training_frame):
+    X, y = training_frame
+    report = compare_strategies(RandomForestClassifier(n_estimators=10, random_state=0),
+                                X.iloc[:300], y.iloc[:300], X.iloc[300:], y.iloc[300:])
+    by_name = {r['strategy']: r for r in report}
+    assert set(by_name) == {'class_weight', 'undersample', 'smote'}
+    assert by_name['undersample']['train_rows'] < by_name['class_weight']['train_rows'] < by_name['smote']['train_rows']
+    assert all(r['peak_memory_mb'] >= 0 and 0 < r['auc_pr'] <= 1 for r in report)
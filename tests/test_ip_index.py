@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+
+from src.ip_index import IpCountryIndex, ip_series_to_int, ip_to_int
+from src.preprocessing import map_ip_to_country
+
+IP_TABLE = pd.DataFrame({
+    'lower_bound_ip_address': [50331648.0, 16777216.0, 16777472.0],
+    'upper_bound_ip_address': [50331903, 16777471, 16777727],
+    'country': ['United States', 'Australia', 'China'],
+})
+
+
+def test_ip_series_to_int_handles_floats_and_strings():
+    floats = pd.Series([732758368.79972, np.nan, 16777300.5])
+    np.testing.assert_array_equal(ip_series_to_int(floats), [732758368, 0, 16777300])
+
+    strings = pd.Series(['1.0.0.1', '192.168.1.1', '732758368.79972', 'bogus', None, '1.2.3.999'])
+    expected = [ip_to_int(ip) for ip in strings]
+    np.testing.assert_array_equal(ip_series_to_int(strings), expected)
+    assert expected[:4] == [16777217, 3232235777, 732758368, 0]
+
+
+def test_index_lookup_and_roundtrip(tmp_path):
+    index = IpCountryIndex.from_frame(IP_TABLE)
+    ips = np.array([16777216, 16777500, 16777800, 50331650, 10, 50331903])
+    expected = ['Australia', 'China', 'Unknown', 'United States', 'Unknown', 'United States']
+    assert list(index.lookup(ips)) == expected
+
+    path = str(tmp_path / 'ip_index.npz')
+    index.save(path)
+    loaded = IpCountryIndex.load(path)
+    assert list(loaded.lookup(ips)) == expected
+    assert loaded.lookup_one('1.0.0.1') == 'Australia'
+
+
+def test_map_ip_to_country_keeps_row_order():
+    fraud = pd.DataFrame({'ip_address': [50331700.2, 16777220.9, 5.0, 16777600.0]},
+                         index=[10, 3, 7, 1])
+    result = map_ip_to_country(fraud, IP_TABLE)
+    assert list(result.index) == [10, 3, 7, 1]
+    assert list(result['country']) == ['United States', 'Australia', 'Unknown', 'China']
@@ -0,0 +1,40 @@
+import importlib.util
+import json
+import os
+
+import pytest
+
+SPEC = importlib.util.spec_from_file_location(
+    "load_test", os.path.join(os.path.dirname(__file__), "..", "benchmarks", "load_test.py"))
+load_test = importlib.util.module_from_spec(SPEC)
+SPEC.loader.exec_module(load_test)
+
+
+@pytest.fixture
+def target(client):
+    import serve_model
+    return load_test.InProcessTarget(serve_model.app)
+
+
+def test_closed_loop_report(target):
+    # the test client scores with a pass-through transform, so send encoded codes
+    traffic = [(path, {**payload, "browser": 1, "source": 0, "sex": 1})
+               for path, payload in load_test.synthetic_traffic(50)]
+    report = load_test.run_closed_loop(target, traffic, concurrency=4, n_requests=40, duration=None)
+    assert report["requests"] == 40
+    assert report["error_rate"] == 0.0
+    assert report["latency_ms"]["p50"] <= report["latency_ms"]["p99"] <= report["latency_ms"]["max"]
+
+
+def test_open_loop_replays_traffic_file(target, tmp_path):
+    path = tmp_path / "traffic.jsonl"
+    lines = [{"purchase_value": 20, "age": 33},
+             {"path": "/predict", "payload": {"purchase_value": 99, "age": 61}},
+             {"path": "/predict", "payload": {"age": "old"}}]
+    path.write_text("\n".join(json.dumps(line) for line in lines))
+
+    traffic = load_test.load_traffic(str(path))
+    report = load_test.run_open_loop(target, traffic, rate=200, duration=0.15)
+    assert report["requests"] == 30
+    assert report["status_counts"] == {"200": 20, "400": 10}
+    assert report["error_rate"] == pytest.approx(1 / 3, abs=1e-3)
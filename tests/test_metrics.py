@@ -0,0 +1,49 @@
+from src.async_logging import Sampler
+from src.metrics import MetricsRegistry, timed
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    hist = registry.histogram("latency_seconds", "Latency.", ["stage"], buckets=(0.01, 0.1))
+    hist.observe(0.005, stage="predict")
+    hist.observe(0.05, stage="predict")
+    hist.observe(5.0, stage="predict")
+
+    text = registry.render()
+    assert '# TYPE latency_seconds histogram' in text
+    assert 'latency_seconds_bucket{stage="predict",le="0.01"} 1' in text
+    assert 'latency_seconds_bucket{stage="predict",le="0.1"} 2' in text
+    assert 'latency_seconds_bucket{stage="predict",le="+Inf"} 3' in text
+    assert 'latency_seconds_count{stage="predict"} 3' in text
+
+
+def test_timed_observes_even_when_block_raises():
+    registry = MetricsRegistry()
+    hist = registry.histogram("t", "T.", ["stage"])
+    try:
+        with timed(hist, stage="decode"):
+            raise ValueError("bad payload")
+    except ValueError:
+        pass
+    assert hist.count(stage="decode") == 1
+
+
+def test_sampler_bounds():
+    assert not any(Sampler(0.0)() for _ in range(100))
+    assert all(Sampler(1.0)() for _ in range(100))
+
+
+def test_metrics_endpoint_reports_stages_and_counters(client):
+    payload = {"purchase_value": 50, "age": 30, "browser": 1, "source": 0, "sex": 1}
+    assert client.post("/predict", json=payload).status_code == 200
+    assert client.post("/predict", data="not json", content_type="application/json").status_code == 400
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.content_type.startswith("text/plain; version=0.0.4")
+    text = response.get_data(as_text=True)
+    for stage in ("decode", "transform", "predict", "serialize"):
+        assert f'endpoint="/predict",stage="{stage}"' in text
+    assert 'fraud_guard_requests_total{endpoint="/predict",status="200"}' in text
+    assert 'fraud_guard_errors_total{endpoint="/predict",status="400"}' in text
+    assert 'fraud_guard_model_info{model_version=' in text
@@ -0,0 +1,154 @@
+import threading
+
+import joblib
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from src.feature_transform import FeatureTransform
+from src.forest_inference import compile_forest, save_forest_arrays
+from src.model_reload import ModelReloader, ReloadError, ServingModel, check_feature_parity, warm_up
+
+
+@pytest.fixture
+def watched(client, forest, tmp_path, monkeypatch):
+    """Serve a compiled forest from tmp_path through a reloader watching that directory."""
+    import serve_model
+    model_dir = tmp_path / 'compiled'
+    save_forest_arrays(compile_forest(forest), str(model_dir))
+    monkeypatch.setattr(serve_model, "COMPILED_MODEL_DIR", str(model_dir))
+    monkeypatch.setattr(serve_model, "FEATURE_TRANSFORM_PATH", str(tmp_path / 'missing.pkl'))
+    monkeypatch.setattr(serve_model, "MODEL_MODE", "mmap")
+    serve_model.activate(serve_model.build_serving_model())
+    reloader = ModelReloader(serve_model.build_serving_model, serve_model.watched_version,
+                             lambda: serve_model.active, serve_model.activate, interval=0.05)
+    monkeypatch.setattr(serve_model, "reloader", reloader)
+    return serve_model, model_dir
+
+
+def retrained(training_frame, columns=None, seed=7):
+    X, y = training_frame
+    X = X[columns] if columns else X
+    return RandomForestClassifier(n_estimators=9, max_depth=4, random_state=seed).fit(X, y)
+
+
+def test_new_artifact_is_validated_warmed_and_swapped(watched, client, training_frame):
+    serve_model, model_dir = watched
+    old_version = client.get("/health").get_json()["model_version"]
+    assert serve_model.reloader.check()["status"] == "unchanged"
+
+    new_model = retrained(training_frame)
+    save_forest_arrays(compile_forest(new_model), str(model_dir))
+    result = serve_model.reloader.check()
+    assert result["status"] == "reloaded" and result["warm_up"]["batch_ms"] >= 0
+
+    health = client.get("/health").get_json()
+    assert health["model_version"] != old_version and health["model_reload"]["reloads"] == 1
+    X, _ = training_frame
+    body = client.post("/predict/batch", json=X.head(10).to_dict(orient="records")).get_json()
+    np.testing.assert_allclose([r["fraud_probability"] for r in body["results"]],
+                               new_model.predict_proba(X.head(10))[:, 1].round(4))
+
+
+def test_cached_scores_are_not_served_after_a_reload(watched, client, training_frame, monkeypatch):
+    serve_model, model_dir = watched
+    # a pinned version label must not keep the old model's cache entries alive
+    monkeypatch.setenv("FRAUD_GUARD_MODEL_VERSION", "pinned")
+    serve_model.activate(serve_model.build_serving_model())
+    X, _ = training_frame
+    record = {**X.iloc[0].to_dict(), "request_id": "txn-1"}
+    client.post("/predict", json=record)
+    assert client.post("/predict", json=record).get_json() == client.post("/predict", json=record).get_json()
+    assert client.get("/health").get_json()["prediction_cache"]["hits"] == 2
+
+    new_model = retrained(training_frame, seed=11)
+    save_forest_arrays(compile_forest(new_model), str(model_dir))
+    assert serve_model.reloader.check()["status"] == "reloaded"
+    assert serve_model.active.version == "pinned"
+
+    body = client.post("/predict", json=record).get_json()
+    assert body["fraud_probability"] == round(float(new_model.predict_proba(X.iloc[[0]])[0, 1]), 4)
+    stats = client.get("/health").get_json()["prediction_cache"]
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (2, 2, 2)
+
+
+def test_transform_is_published_with_the_arrays(watched, client, training_frame):
+    serve_model, model_dir = watched
+    X, _ = training_frame
+    new_model = retrained(training_frame)
+    transform = FeatureTransform({}, {'purchase_value': 1.0}, {'purchase_value': 2.0})
+    save_forest_arrays(compile_forest(new_model), str(model_dir), transform)
+    assert serve_model.reloader.check()["status"] == "reloaded"
+
+    # main.py writes the standalone copy afterwards; the bundled one is already serving
+    joblib.dump(FeatureTransform.identity(), serve_model.FEATURE_TRANSFORM_PATH)
+    assert serve_model.reloader.check()["status"] == "unchanged"
+    record = X.iloc[0].to_dict()
+    scaled = X.iloc[[0]].assign(purchase_value=(record["purchase_value"] - 1.0) / 2.0)
+    assert client.post("/predict", json=record).get_json()["fraud_probability"] == \
+        round(float(new_model.predict_proba(scaled)[0, 1]), 4)
+
+
+def test_feature_mismatch_is_rejected_and_old_model_kept(watched, client, training_frame):
+    serve_model, model_dir = watched
+    version = serve_model.active.version
+    X, _ = training_frame
+    save_forest_arrays(compile_forest(retrained(training_frame, list(X.columns[:-1]))), str(model_dir))
+
+    result = serve_model.reloader.check()
+    assert result["status"] == "rejected" and "missing ['user_transaction_count']" in result["error"]
+    assert serve_model.active.version == version
+    assert client.get("/health").get_json()["model_reload"]["rejected"] == 1
+    assert client.post("/predict", json=X.iloc[0].to_dict()).status_code == 200
+
+
+def test_requests_keep_succeeding_while_the_watcher_reloads(watched, client, training_frame):
+    serve_model, model_dir = watched
+    X, _ = training_frame
+    statuses = []
+    stop = threading.Event()
+
+    def traffic():
+        while not stop.is_set():
+            statuses.append(client.post("/predict", json=X.iloc[len(statuses) % 50].to_dict()).status_code)
+
+    serve_model.reloader.start()
+    thread = threading.Thread(target=traffic)
+    thread.start()
+    try:
+        for seed in range(3):
+            save_forest_arrays(compile_forest(retrained(training_frame, seed=seed)), str(model_dir))
+            while serve_model.reloader.reloads <= seed:
+                stop.wait(0.01)
+    finally:
+        stop.set()
+        thread.join()
+        serve_model.reloader.stop()
+    assert statuses and set(statuses) == {200}
+
+
+def test_reload_endpoint_requires_token(watched, client, monkeypatch):
+    serve_model, _ = watched
+    assert client.post("/admin/reload").status_code == 404
+    monkeypatch.setattr(serve_model, "RELOAD_TOKEN", "secret")
+    assert client.post("/admin/reload", headers={"X-Reload-Token": "nope"}).status_code == 403
+    response = client.post("/admin/reload?force=1", headers={"X-Reload-Token": "secret"})
+    assert response.status_code == 200 and response.get_json()["status"] == "reloaded"
+
+
+def test_parity_and_warm_up_checks(forest, training_frame):
+    X, _ = training_frame
+    candidate = ServingModel(forest, compile_forest(forest), None)
+    check_feature_parity(candidate, list(X.columns))
+    with pytest.raises(ReloadError, match="order"):
+        check_feature_parity(candidate, list(X.columns[::-1]))
+
+    class Broken:
+        classes_ = np.array([0, 1])
+        feature_names_in_ = np.array(X.columns)
+
+        def predict_proba(self, X):
+            return np.full((len(X), 2), np.nan)
+
+    with pytest.raises(ReloadError, match="invalid probabilities"):
+        warm_up(ServingModel(Broken(), None, None))
@@ -0,0 +1,65 @@
+import json
+import os
+
+import numpy as np
+from sklearn.model_selection import StratifiedKFold, cross_val_score
+
+from src import model_search
+from src.model_search import cross_validate, share_arrays, successive_halving
+
+
+def test_cross_validate_matches_serial_sklearn(forest, training_frame, tmp_path):
+    X, y = training_frame
+    scores = cross_validate(forest, X, y, k=3, n_jobs=2, data_dir=str(tmp_path))
+    expected = cross_val_score(forest, X.to_numpy(), y, scoring='f1',
+                               cv=StratifiedKFold(n_splits=3, shuffle=True, random_state=42))
+    np.testing.assert_allclose(scores, expected)
+
+
+def test_successive_halving_drops_candidates_and_resumes(training_frame, tmp_path):
+    X, y = training_frame
+    space = {'max_depth': [2, 6], 'min_samples_leaf': [1, 50]}
+    kwargs = dict(search_space=space, n_splits=3, min_estimators=5, max_estimators=20,
+                  eta=2, n_jobs=2, search_dir=str(tmp_path))
+
+    result = successive_halving(X, y, **kwargs)
+    assert [len(r['results']) for r in result['rungs']] == [4, 2, 1]
+    assert result['best_params']['n_estimators'] == 20
+    assert result['n_fits'] == (4 + 2 + 1) * 3
+
+    # Simulate an interrupted run: drop the last rung's fits, then resume
+    trials_path = next(os.path.join(root, 'trials.jsonl') for root, _, files in os.walk(tmp_path)
+                       if 'trials.jsonl' in files)
+    with open(trials_path) as f:
+        trials = [json.loads(line) for line in f]
+    with open(trials_path, 'w') as f:
+        f.writelines(json.dumps(t) + '\n' for t in trials if t['n_estimators'] != 20)
+
+    resumed = successive_halving(X, y, **kwargs)
+    assert resumed['resumed_fits'] == 18
+    assert resumed['best_params'] == result['best_params']
+    assert resumed['best_score'] == result['best_score']
+    with open(trials_path) as f:
+        assert all(line.strip() for line in f)  # resuming a cleanly ended file adds no blank line
+
+
+def test_shared_array_copies_are_evicted_least_recently_used(training_frame, tmp_path, monkeypatch):
+    X, y = training_frame
+    monkeypatch.setattr(model_search, 'SHARED_DATA_MAX_BYTES', 1)
+    first = share_arrays(X, y, str(tmp_path / 'a'), n_splits=3)
+    second = share_arrays(X.iloc[:100], y.iloc[:100], str(tmp_path / 'b'), n_splits=3)
+    assert not os.path.exists(first) and os.path.exists(os.path.join(second, 'folds.npy'))
+
+
+def test_single_threaded_copies_keep_fitted_state(forest, training_frame):
+    from sklearn.base import clone
+    from sklearn.pipeline import make_pipeline
+    from sklearn.preprocessing import StandardScaler
+
+    X, y = training_frame
+    pipeline = make_pipeline(StandardScaler(), clone(forest).set_params(n_jobs=-1)).fit(X, y)
+    copy = model_search._single_threaded(pipeline, fitted=True)
+    assert copy.get_params()['randomforestclassifier__n_jobs'] == 1 and pipeline[-1].n_jobs == -1
+    np.testing.assert_allclose(copy.predict_proba(X), pipeline.predict_proba(X))
+    # unfitted (search) copies are clones
+    assert not hasattr(model_search._single_threaded(pipeline)[-1], 'estimators_')
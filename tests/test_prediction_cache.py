@@ -0,0 +1,90 @@
+import time
+
+import numpy as np
+
+from src.prediction_cache import PredictionCache, SharedPredictionStore, feature_key, payload_key
+
+SAMPLE = {"purchase_value": 50, "age": 30, "browser": 0, "sex": 0, "source": 0, "time_diff": 100,
+          "user_id": 7, "device_id": "DEV", "ip_address": 1000.0, "purchase_time": "2015-03-01 10:00:00"}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_keys_are_canonical_and_versioned():
+    row = np.array([0.0, 1.5, 2.0])
+    assert feature_key(row, "v1") == feature_key(np.array([-0.0, 1.5, 2.0], dtype=np.float32), "v1")
+    assert feature_key(row, "v1") != feature_key(row, "v2")
+    assert payload_key({"a": 1, "request_id": "r1"}, "v1") == payload_key({"request_id": "r1", "a": 1}, "v1")
+    assert payload_key({"a": float("nan"), "request_id": "r1"}, "v1") is None
+    # without a purchase_time or request_id an identical payload may be a new transaction
+    assert payload_key({"a": 1, "b": 2}, "v1") is None
+
+
+def test_lru_ttl_and_counters():
+    clock = Clock()
+    cache = PredictionCache(max_entries=2, ttl_seconds=10, clock=clock)
+    cache.put(b"a", (0, 0.1))
+    cache.put(b"b", (1, 0.9))
+    assert cache.get(b"a") == (0, 0.1)  # a is now most recently used
+    cache.put(b"c", (0, 0.2))  # evicts b
+    assert cache.get(b"b") is None and cache.get(b"c") == (0, 0.2)
+    clock.now += 11
+    assert cache.get(b"a") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"], stats["expirations"]) == (2, 2, 1, 1)
+    # a probe that another lookup will settle does not count its miss
+    assert cache.get(b"d", final=False) is None and cache.stats()["misses"] == 2
+
+
+def test_shared_store_is_visible_across_caches(tmp_path):
+    clock = Clock()
+    path = str(tmp_path / "shm" / "predictions")
+    worker_a = PredictionCache(ttl_seconds=10, shared=SharedPredictionStore(path, slots=64, clock=clock))
+    worker_b = PredictionCache(ttl_seconds=10, shared=SharedPredictionStore(path, slots=64, clock=clock))
+    key = feature_key(np.ones(3), "v1")
+    worker_a.put(key, (1, 0.75))
+    assert worker_b.get(key) == (1, 0.75) and worker_b.stats()["shared_hits"] == 1
+
+    # A torn record fails its checksum and reads as a miss
+    store = SharedPredictionStore(path, slots=64, clock=clock)
+    slot = [i for i in store._bucket(key) if store._table[i]["check"]][0]
+    store._table[slot]["probability"] = 0.5
+    assert store.get(key) is None
+    clock.now += 11
+    assert worker_b.shared.get(feature_key(np.ones(3), "v1")) is None
+
+
+def test_retried_payload_is_served_from_cache(client):
+    import serve_model
+    first = client.post("/predict", json=SAMPLE).get_json()
+    second = client.post("/predict", json=dict(reversed(list(SAMPLE.items())))).get_json()
+    assert first == second
+    # the retry was not recorded as a second transaction
+    assert serve_model.velocity_store.peek({"user_id": 7}, 1425204000.0)["user_txn_1h"] == 1.0
+    stats = client.get("/health").get_json()["prediction_cache"]
+    # one outcome per request: the first missed both lookups, the retry hit the payload key
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 2)
+
+    # a new model does not reuse the old scores
+    serve_model.active.cache_namespace = "test-2"
+    client.post("/predict", json=SAMPLE)
+    stats = client.get("/health").get_json()["prediction_cache"]
+    assert (stats["hits"], stats["misses"]) == (1, 2)
+
+
+
+def test_repeats_without_transaction_identity_are_counted(client):
+    import serve_model
+    payload = {k: v for k, v in SAMPLE.items() if k != "purchase_time"}
+    assert client.post("/predict", json=payload).status_code == 200
+    assert client.post("/predict", json=payload).status_code == 200
+    # both were recorded, and the second was scored with the first in its velocity features
+    assert serve_model.velocity_store.peek({"user_id": 7}, time.time())["user_txn_1h"] == 2.0
+    stats = client.get("/health").get_json()["prediction_cache"]
+    assert (stats["hits"], stats["misses"]) == (0, 2)
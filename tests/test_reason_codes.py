@@ -0,0 +1,52 @@
+import numpy as np
+
+from src.forest_inference import compile_forest
+from src.reason_codes import PATH_APPROX, TREE_SHAP, ReasonCodeExplainer, path_attributions
+from src.velocity import VelocityStore
+
+
+def test_path_attributions_add_up_to_probability(forest, training_frame):
+    X, _ = training_frame
+    contributions, base_value = path_attributions(compile_forest(forest), X.to_numpy()[:50])
+    np.testing.assert_allclose(base_value + contributions.sum(axis=1),
+                               forest.predict_proba(X.iloc[:50])[:, 1], atol=1e-9)
+
+
+def test_tree_shap_explanations_are_cached(forest, training_frame):
+    X, _ = training_frame
+    explainer = ReasonCodeExplainer(compile_forest(forest), forest)
+    first = explainer.explain(X.to_numpy()[:3], top_k=2)
+    second = explainer.explain(X.to_numpy()[:3], top_k=2)
+
+    assert [e["method"] for e in first] == [TREE_SHAP] * 3
+    assert not any(e["cached"] for e in first) and all(e["cached"] for e in second)
+    assert len(first[0]["top_features"]) == 2
+    np.testing.assert_allclose([e["fraud_probability"] for e in first],
+                               forest.predict_proba(X.iloc[:3])[:, 1], atol=1e-3)
+
+
+def test_exhausted_budget_falls_back_to_path_attributions(forest, training_frame):
+    X, _ = training_frame
+    explainer = ReasonCodeExplainer(compile_forest(forest), forest)
+    results = explainer.explain(X.to_numpy()[100:110], budget_ms=0)
+    assert {e["method"] for e in results} == {PATH_APPROX}
+    assert explainer.stats()["cache_entries"] == 0
+
+
+def test_velocity_peek_does_not_record():
+    store = VelocityStore()
+    store.update({"user_id": 1}, 1000.0)
+    peeked = store.peek({"user_id": 1}, 1010.0)
+    assert peeked["user_txn_1h"] == 1.0 and peeked["user_secs_since_last"] == 10.0
+    assert store.update({"user_id": 1}, 1010.0) == peeked
+
+
+def test_explain_endpoint_single_and_batch(client):
+    payload = {"purchase_value": 50, "age": 30, "browser": 1, "source": 0, "sex": 1}
+    single = client.post("/explain?top_k=2", json=payload)
+    assert single.status_code == 200
+    assert len(single.get_json()["top_features"]) == 2
+
+    batch = client.post("/explain", json=[payload, {**payload, "age": 60}])
+    assert batch.status_code == 200
+    assert len(batch.get_json()["results"]) == 2
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.rollups import DIMENSIONS, RollupStore, latest_day, refresh_rollups, summarize
+
+
+def make_scores(n=300, seed=0, start=0):
+    rng = np.random.default_rng(seed)
+    prediction = rng.integers(0, 2, n)
+    return pd.DataFrame({
+        'row': np.arange(start, start + n),
+        'purchase_time': (pd.Timestamp('2015-03-01') + pd.to_timedelta(rng.integers(0, 30 * 86400, n), unit='s')
+                          ).astype(str),
+        'purchase_value': rng.integers(9, 150, n),
+        'country': rng.choice(['Japan', 'China', 'United States', None], n),
+        'source': rng.choice(['SEO', 'Ads', 'Direct'], n),
+        'browser': rng.choice(['Chrome', 'Safari', 'IE'], n),
+        'fraud_probability': np.where(prediction == 1, 0.9, 0.1),
+        'prediction': prediction,
+        'error': '',
+    })
+
+
+def test_appended_batches_match_full_recompute(tmp_path):
+    scores = make_scores()
+    store = RollupStore(str(tmp_path / 'rollups.pkl'))
+    for start in range(0, len(scores), 70):
+        store.append(scores.iloc[start:start + 70])
+    for dim in DIMENSIONS:
+        pd.testing.assert_frame_equal(store.tables[dim], summarize(scores, dim), check_dtype=False)
+
+    totals = store.totals()
+    assert totals['transactions'] == 300 and totals['flagged'] == scores['prediction'].sum()
+    assert totals['value_at_risk'] == scores.loc[scores['prediction'] == 1, 'purchase_value'].sum()
+    assert 'Unknown' in store.table('country').index
+    assert store.table('source')['fraud_rate'].between(0, 1).all()
+
+
+def test_latest_day_skips_unknown_bucket():
+    scores = make_scores(n=50)
+    scores.loc[45:, 'purchase_time'] = 'not a time'
+    days = summarize(scores, 'day')
+    assert days.loc['Unknown', 'transactions'] == 5 and days['transactions'].sum() == 50
+    assert days.index[-1] == 'Unknown'
+    key, row = latest_day(days)
+    assert key == pd.to_datetime(scores['purchase_time'], errors='coerce').max().strftime('%Y-%m-%d')
+    assert row['transactions'] == days.loc[key, 'transactions']
+    assert latest_day(days.loc[['Unknown']]) is None
+
+
+def test_refresh_reads_only_appended_rows(tmp_path, monkeypatch):
+    monkeypatch.setattr('src.rollups.READ_BLOCK_BYTES', 1000)  # several blocks per refresh
+    csv = tmp_path / 'scores.csv'
+    store_path = str(tmp_path / 'rollups.pkl')
+    first, second = make_scores(200, seed=1), make_scores(100, seed=2, start=200)
+    first.to_csv(csv, index=False)
+    # A partly written last line is left for the next refresh
+    line = second.iloc[:1].to_csv(index=False, header=False)
+    with open(csv, 'a') as f:
+        f.write(line[:10])
+    assert refresh_rollups(str(csv), store_path).sources[str(csv)]['rows'] == 200
+
+    with open(csv, 'a') as f:
+        f.write(line[10:] + second.iloc[1:].to_csv(index=False, header=False))
+    store = refresh_rollups(str(csv), store_path)
+    assert store.sources[str(csv)]['rows'] == 300
+    assert store.refresh(str(csv)) == 0
+
+    expected = pd.concat([first, second], ignore_index=True)
+    reloaded = RollupStore.load(store_path)
+    for dim in DIMENSIONS:
+        pd.testing.assert_frame_equal(reloaded.tables[dim], summarize(expected, dim), check_dtype=False)
+
+    first.to_csv(csv, index=False)
+    with pytest.raises(ValueError, match="rebuild"):
+        refresh_rollups(str(csv), store_path)
+    assert refresh_rollups(str(csv), store_path, rebuild=True).totals()['transactions'] == 200
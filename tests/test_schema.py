@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+
+from src.feature_engineering import create_time_features, create_transaction_velocity
+from src.preprocessing import clean_data, map_ip_to_country, scale_and_encode
+from src.feature_store import stream_preprocess
+from src.schema import MemoryReport, drop_merge_only, frame_memory_mb, read_fraud_csv
+from tests.test_feature_store import IP_TABLE, make_raw
+
+
+def run_pipeline(df):
+    df = clean_data(df)
+    df['signup_time'] = pd.to_datetime(df['signup_time'])
+    df['purchase_time'] = pd.to_datetime(df['purchase_time'])
+    df = map_ip_to_country(df, IP_TABLE.copy())
+    df = drop_merge_only(create_time_features(df), 'create_time_features')
+    return scale_and_encode(create_transaction_velocity(df))
+
+
+def test_declared_schema_is_smaller_and_yields_same_features(tmp_path):
+    csv = tmp_path / 'Fraud_Data.csv'
+    make_raw(n=500).to_csv(csv, index=False)
+
+    typed = read_fraud_csv(csv)
+    plain = pd.read_csv(csv)
+    assert isinstance(typed['browser'].dtype, pd.CategoricalDtype)
+    assert clean_data(typed.copy())['age'].dtype == np.int8
+    assert frame_memory_mb(typed) < frame_memory_mb(plain) / 2
+
+    typed_out, plain_out = run_pipeline(typed), run_pipeline(plain)
+    assert 'signup_time' not in typed_out.columns
+    for col in ['source_encoded', 'browser_encoded', 'sex_encoded', 'country_encoded',
+                'purchase_value', 'time_since_signup', 'user_transaction_count', 'device_txn_24h']:
+        np.testing.assert_allclose(typed_out[col].to_numpy(dtype=float),
+                                   plain_out[col].to_numpy(dtype=float), err_msg=col)
+
+
+def test_rows_with_missing_ids_and_ages_are_cleaned_not_rejected(tmp_path):
+    raw = make_raw(n=60)
+    raw['user_id'] = raw['user_id'].astype(object)
+    raw.loc[3, 'user_id'] = None
+    raw.loc[30, 'age'] = None  # in a later chunk than the first when streamed
+    csv = tmp_path / 'Fraud_Data.csv'
+    raw.to_csv(csv, index=False)
+
+    typed = read_fraud_csv(csv)
+    assert typed['user_id'].isna().sum() == 1 and typed['age'].isna().sum() == 1
+    cleaned = clean_data(typed)
+    assert len(cleaned) == 59
+    assert cleaned['user_id'].dtype == np.int32 and cleaned['class'].dtype == np.int8
+    assert cleaned['age'].dtype == np.float64 and cleaned['age'].isna().sum() == 1
+
+    store = stream_preprocess(str(csv), IP_TABLE, str(tmp_path / 'store'), chunksize=16)
+    assert len(store) == 59 and store.columns['user_id']['dtype'] == 'int32'
+    np.testing.assert_array_equal(np.asarray(store.array('age')), cleaned['age'].to_numpy())
+
+
+def test_memory_report_records_each_stage(tmp_path):
+    report = MemoryReport()
+    df = pd.DataFrame({'a': np.arange(100_000)})
+    assert report.record('load', df) is df
+    report.record('next', df.assign(b='x'))
+    report.save(str(tmp_path / 'memory.json'))
+
+    frame = report.to_frame()
+    assert list(frame['stage']) == ['load', 'next']
+    assert frame['frame_mb'].iloc[1] > frame['frame_mb'].iloc[0]
@@ -0,0 +1,99 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+SAMPLE = {
+    "purchase_value": 50,
+    "age": 30,
+    "browser": 0,
+    "sex": 0,
+    "source": 0,
+    "time_diff": 100,
+    "user_transaction_count": 1
+}
+
+
+def test_predict_single(client):
+    response = client.post("/predict", json=SAMPLE)
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["status"] == "success"
+    assert 0.0 <= body["fraud_probability"] <= 1.0
+
+
+def test_batch_matches_sklearn(client, forest, training_frame):
+    X, _ = training_frame
+    rows = X.head(25).to_dict(orient="records")
+    response = client.post("/predict/batch", json=rows)
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["n_succeeded"] == 25 and body["status"] == "success"
+
+    expected = forest.predict(X.head(25))
+    got = [r["prediction"] for r in body["results"]]
+    np.testing.assert_array_equal(got, expected)
+
+
+def test_batch_ndjson_partial_failure(client):
+    lines = [
+        json.dumps(SAMPLE),
+        "{not json",
+        json.dumps({**SAMPLE, "age": "thirty"}),
+        json.dumps([1, 2, 3]),
+        json.dumps(SAMPLE),
+    ]
+    response = client.post("/predict/batch", data="\n".join(lines),
+                           content_type="application/x-ndjson")
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["status"] == "partial"
+    assert [r["status"] for r in body["results"]] == ["success", "error", "error", "error", "success"]
+    assert "age" in body["results"][2]["error"]
+
+
+def test_batch_rejects_malformed_body(client):
+    response = client.post("/predict/batch", data="[1, 2", content_type="application/json")
+    assert response.status_code == 400
+
+
+def test_predict_updates_velocity_store(client):
+    payload = {**SAMPLE, "user_id": 7, "purchase_time": "2015-04-18 02:47:11"}
+    assert client.post("/predict", json=payload).status_code == 200
+    assert client.post("/predict", json=payload).status_code == 200
+    assert client.get("/health").get_json()["velocity_keys"] == 1
+
+
+def test_rejected_rows_are_not_recorded(client):
+    import serve_model
+    payload = {**SAMPLE, "user_id": 5, "device_id": "D5", "purchase_time": "2015-04-18 02:47:11"}
+    response = client.post("/predict/batch", json=[
+        {**payload, "purchase_value": "abc"},
+        {**SAMPLE, "user_id": [5]},
+        {**SAMPLE, "device_id": {"id": 1}},
+    ])
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["n_failed"] == 3 and "user_id must be a string or a number" in body["results"][1]["error"]
+    assert serve_model.velocity_store.peek({"user_id": 5}, 1429325231.0)["user_txn_1h"] == 0.0
+    assert serve_model.entity_links.peek({"device_id": "D5"})["users_per_device"] == 0.0
+
+    # the corrected resend is counted once
+    assert client.post("/predict/batch", json=[payload]).get_json()["n_succeeded"] == 1
+    assert serve_model.velocity_store.peek({"user_id": 5}, 1429325231.0)["user_txn_1h"] == 1.0
+
+
+def test_forced_mmap_mode_does_not_fall_back_to_the_pickle(forest, tmp_path, monkeypatch):
+    import joblib
+    import serve_model
+    broken = tmp_path / 'compiled'
+    broken.mkdir()
+    (broken / 'forest.json').write_text('{"version": -1}')
+    joblib.dump(forest, tmp_path / 'model.pkl')
+    monkeypatch.setattr(serve_model, "COMPILED_MODEL_DIR", str(broken))
+    monkeypatch.setattr(serve_model, "MODEL_PATH", str(tmp_path / 'model.pkl'))
+
+    monkeypatch.setattr(serve_model, "MODEL_MODE", "mmap")
+    assert serve_model.load_model() is None
+    monkeypatch.setattr(serve_model, "MODEL_MODE", "auto")
+    assert serve_model.load_model() is not None
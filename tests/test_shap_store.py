@@ -0,0 +1,87 @@
+import json
+
+import joblib
+import numpy as np
+import shap
+
+from src.feature_transform import FeatureTransform
+from src.shap_store import ShapStore, explain_file, explain_frame
+
+
+def test_store_matches_tree_explainer(forest, training_frame, tmp_path):
+    X, y = training_frame
+    X = X.set_index(X.index + 1000)
+    store = explain_frame(forest, X, str(tmp_path / 'store'), y=y.to_numpy(), chunksize=90, n_jobs=2)
+
+    expected = shap.TreeExplainer(forest).shap_values(X, check_additivity=False)[:, :, 1]
+    np.testing.assert_allclose(store.values, expected, atol=1e-5)
+    assert store.row_ids.tolist() == X.index.tolist()
+    np.testing.assert_allclose(store.probabilities, forest.predict_proba(X)[:, 1], atol=1e-6)
+    np.testing.assert_allclose(store.base_value + store.values.sum(axis=1), store.probabilities, atol=1e-4)
+
+    cases = store.find_cases()
+    predicted = forest.predict(X)
+    np.testing.assert_array_equal(store.predictions, predicted)
+    assert y.iloc[cases['True_Positive']] == 1 and predicted[cases['True_Positive']] == 1
+    assert store.mean_abs().index[0] in ('time_since_signup', 'purchase_value')
+
+
+def test_cases_use_serving_labels_at_the_boundary(tmp_path):
+    import pandas as pd
+    from sklearn.ensemble import RandomForestClassifier
+
+    # identical rows with both labels: their leaf scores exactly 0.5, which argmax assigns to class 0
+    X = pd.DataFrame({'f': [0.0, 0.0, 1.0, 1.0]})
+    y = np.array([0, 1, 1, 0])
+    model = RandomForestClassifier(n_estimators=3, bootstrap=False, random_state=0).fit(X, np.array([0, 1, 1, 1]))
+    store = explain_frame(model, X, str(tmp_path / 'store'), y=y, n_jobs=1)
+
+    assert store.probabilities[0] == 0.5 and store.predictions[0] == 0
+    assert store.find_cases() == {'True_Positive': 2, 'False_Positive': 3, 'False_Negative': 1}
+
+
+def test_interrupted_job_resumes_missing_chunks(forest, training_frame, tmp_path):
+    X, y = training_frame
+    store_dir = tmp_path / 'store'
+    full = np.array(explain_frame(forest, X, str(store_dir), y=y, chunksize=100, n_jobs=1).values)
+
+    # Simulate a crash after the first two chunks
+    meta = json.loads((store_dir / 'meta.json').read_text())
+    meta['chunks_done'], meta['complete'] = [0, 100], False
+    (store_dir / 'meta.json').write_text(json.dumps(meta))
+    values = np.memmap(store_dir / 'values.bin', dtype=np.float32, mode='r+', shape=full.shape)
+    values[:100] = 7.0
+    values[200:] = 0.0
+    values.flush()
+
+    store = explain_frame(forest, X, str(store_dir), y=y, chunksize=100, n_jobs=1)
+    assert np.all(store.values[:100] == 7.0)  # completed chunks are not recomputed
+    np.testing.assert_allclose(store.values[100:], full[100:])
+
+
+def test_explain_file_uses_input_row_numbers(forest, training_frame, tmp_path):
+    X, y = training_frame
+    rows = X.iloc[:120].copy()
+    rows['class'] = y.iloc[:120]
+    rows.loc[5, 'age'] = np.nan  # unexplainable row is left out
+    rows.to_csv(tmp_path / 'rows.csv', index=False)
+    joblib.dump(forest, tmp_path / 'model.pkl')
+
+    store = explain_file(str(tmp_path / 'rows.csv'), str(tmp_path / 'store'), model_path=str(tmp_path / 'model.pkl'),
+                         transform_path=None, ip_index_path=None, chunksize=50, read_chunksize=40, n_jobs=1)
+    assert len(store) == 119 and 5 not in store.row_ids.tolist()
+    assert store.labels.tolist() == y.iloc[:120].drop(5).tolist()
+    assert len(ShapStore(str(tmp_path / 'store'))) == 119
+
+    # a retrained transform at the same path, or another velocity flag, rebuilds the features
+    transform_path = tmp_path / 'feature_transform.pkl'
+    joblib.dump(FeatureTransform({}, {'purchase_value': 1.0}, {'purchase_value': 2.0}), transform_path)
+    store = explain_file(str(tmp_path / 'rows.csv'), str(tmp_path / 'store'), model_path=str(tmp_path / 'model.pkl'),
+                         transform_path=str(transform_path), ip_index_path=None, chunksize=50, read_chunksize=40,
+                         n_jobs=1)
+    np.testing.assert_allclose(store.data[:, 0], (rows['purchase_value'].drop(5) - 1.0) / 2.0)
+    assert store.meta['settings']['velocity'] is True
+    store = explain_file(str(tmp_path / 'rows.csv'), str(tmp_path / 'store'), model_path=str(tmp_path / 'model.pkl'),
+                         transform_path=str(transform_path), ip_index_path=None, chunksize=50, read_chunksize=40,
+                         n_jobs=1, velocity=False)
+    assert store.meta['settings']['velocity'] is False
@@ -0,0 +1,46 @@
+import os
+
+import pandas as pd
+
+from src.feature_engineering import create_time_features
+from src.stage_cache import StageCache
+
+
+def make_frame(minutes=5):
+    return pd.DataFrame({
+        'signup_time': pd.to_datetime(['2015-01-01 00:00', '2015-01-02 00:00']),
+        'purchase_time': pd.to_datetime(['2015-01-01 00:00', '2015-01-03 00:00']) + pd.Timedelta(minutes=minutes),
+    })
+
+
+def test_hit_miss_and_force(tmp_path):
+    cache = StageCache(str(tmp_path))
+    first = cache.run('create_time_features', create_time_features, make_frame())
+    second = cache.run('create_time_features', create_time_features, make_frame())
+    pd.testing.assert_frame_equal(first, second)
+    assert cache.misses == ['create_time_features'] and cache.hits == ['create_time_features']
+
+    # different input -> different key
+    cache.run('create_time_features', create_time_features, make_frame(minutes=6))
+    assert len(cache.misses) == 2
+
+    forced = StageCache(str(tmp_path), force=['create_time_features'])
+    forced.run('create_time_features', create_time_features, make_frame())
+    assert forced.misses == ['create_time_features'] and not forced.hits
+
+
+def test_size_based_eviction(tmp_path, caplog):
+    cache = StageCache(str(tmp_path), max_bytes=1)
+    cache.run('create_time_features', create_time_features, make_frame(1))
+    cache.run('create_time_features', create_time_features, make_frame(2))
+    # older entries go, but never the one just written, even when it alone is over budget
+    assert len([n for n in os.listdir(tmp_path) if n.endswith('.pkl')]) == 1
+    assert 'alone exceeds' in caplog.text
+    cache.run('create_time_features', create_time_features, make_frame(2))
+    assert cache.hits == ['create_time_features']
+
+
+def test_disabled_cache_writes_nothing(tmp_path):
+    cache = StageCache(str(tmp_path / 'off'), enabled=False)
+    cache.run('create_time_features', create_time_features, make_frame())
+    assert not os.path.exists(tmp_path / 'off')
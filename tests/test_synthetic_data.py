@@ -0,0 +1,50 @@
+import importlib.util
+import json
+import os
+
+import pandas as pd
+
+from src.preprocessing import map_ip_to_country
+from src.schema import read_fraud_csv, read_ip_csv
+from src.synthetic_data import BLOCK_ROWS, generate_fraud_data, generate_ip_ranges, write_dataset
+
+SPEC = importlib.util.spec_from_file_location(
+    "bench_pipeline", os.path.join(os.path.dirname(__file__), "..", "benchmarks", "bench_pipeline.py"))
+bench_pipeline = importlib.util.module_from_spec(SPEC)
+SPEC.loader.exec_module(bench_pipeline)
+
+
+def test_seeded_data_is_deterministic_and_block_invariant():
+    ip_ranges = generate_ip_ranges(n_ranges=500)
+    a = generate_fraud_data(BLOCK_ROWS + 50, fraud_rate=0.2, seed=3, ip_ranges=ip_ranges)
+    b = generate_fraud_data(BLOCK_ROWS + 50, fraud_rate=0.2, seed=3, ip_ranges=ip_ranges)
+    pd.testing.assert_frame_equal(a, b)
+    assert a['user_id'].is_unique
+    assert abs(a['class'].mean() - 0.2) < 0.01
+    # fraud rings share devices, so fraud rows have far fewer distinct devices
+    fraud = a[a['class'] == 1]
+    assert fraud['device_id'].nunique() < len(fraud) / 2
+    assert not a.equals(generate_fraud_data(BLOCK_ROWS + 50, fraud_rate=0.2, seed=4, ip_ranges=ip_ranges))
+
+
+def test_written_dataset_matches_pipeline_schema(tmp_path):
+    fraud_path, ip_path = write_dataset(str(tmp_path), 2000, fraud_rate=0.1, seed=1, n_ranges=1000)
+    df = read_fraud_csv(fraud_path)
+    ip_df = read_ip_csv(ip_path)
+    assert list(df.columns) == ['user_id', 'signup_time', 'purchase_time', 'purchase_value', 'device_id',
+                                'source', 'browser', 'sex', 'age', 'ip_address', 'class']
+    assert ip_df['lower_bound_ip_address'].is_monotonic_increasing
+    mapped = map_ip_to_country(df, ip_df)
+    assert (mapped['country'] != 'Unknown').mean() > 0.5
+
+
+def test_pipeline_benchmark_report(tmp_path):
+    output = tmp_path / "report.json"
+    report = bench_pipeline.main(["--sizes", "1000,2000", "--data-dir", str(tmp_path / "data"),
+                                  "--stages", "load,map_ip_to_country,create_transaction_velocity",
+                                  "--imbalance", "none", "--in-process", "--output", str(output)])
+    assert json.loads(output.read_text())["config"]["sizes"] == [1000, 2000]
+    assert {r["stage"] for r in report["results"]} == {"load", "map_ip_to_country", "create_transaction_velocity"}
+    assert all(r["peak_rss_mb"] > 0 for r in report["results"])
+    velocity = next(s for s in report["scaling"] if s["stage"] == "create_transaction_velocity")
+    assert velocity["exponents"][0]["to_rows"] == 2000
@@ -0,0 +1,68 @@
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from src.feature_engineering import create_transaction_velocity
+from src.velocity import VelocityStore, replay_velocity
+
+
+def make_transactions(n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp('2015-01-01')
+    return pd.DataFrame({
+        'user_id': rng.integers(0, 20, n),
+        'device_id': rng.choice(['A', 'B', 'C', 'D'], n),
+        'ip_address': rng.integers(0, 50, n).astype(float),
+        # whole minutes so one-minute buckets give exact window counts
+        'purchase_time': start + pd.to_timedelta(rng.integers(0, 14 * 24 * 60, n), unit='min'),
+    })
+
+
+def brute_force_count(df, column, seconds):
+    times = df['purchase_time']
+    counts = []
+    for idx, row in df.iterrows():
+        earlier = (df[column] == row[column]) & (times < row['purchase_time']) & \
+                  (times > row['purchase_time'] - pd.Timedelta(seconds=seconds))
+        counts.append(earlier.sum())
+    return np.array(counts, dtype=float)
+
+
+def test_replay_matches_brute_force_and_keeps_order():
+    df = make_transactions().drop_duplicates('purchase_time')
+    store = VelocityStore(windows=(('1h', 3600), ('24h', 86400)), buckets_per_window=1440)
+    # fine buckets: 1h window uses 2.5s buckets, 24h window uses 60s buckets
+    result = replay_velocity(df, store)
+
+    assert list(result.index) == list(df.index)
+    np.testing.assert_array_equal(result['user_txn_24h'], brute_force_count(df, 'user_id', 86400))
+    np.testing.assert_array_equal(result['device_txn_1h'], brute_force_count(df, 'device_id', 3600))
+
+
+def test_serving_updates_continue_training_replay():
+    df = make_transactions().sort_values('purchase_time')
+    train, live = df.iloc[:200], df.iloc[200:]
+
+    full = create_transaction_velocity(df.copy())
+    store = VelocityStore()
+    create_transaction_velocity(train.copy(), store)
+    store = pickle.loads(pickle.dumps(store))
+
+    seconds = (live['purchase_time'] - pd.Timestamp(0)).dt.total_seconds()
+    for (idx, row), ts in zip(live.iterrows(), seconds):
+        features = store.update(row.to_dict(), ts)
+        for name, value in features.items():
+            assert full.loc[idx, name] == value
+
+
+def test_idle_keys_are_evicted_and_size_bounded():
+    store = VelocityStore(max_keys=5)
+    for i in range(20):
+        store.update({'user_id': i}, float(i))
+    assert len(store) == 5
+
+    features = store.update({'user_id': 19}, 30 * 86400.0)
+    assert len(store) == 1
+    assert features['user_txn_7d'] == 0.0
+    assert features['device_secs_since_last'] == -1.0